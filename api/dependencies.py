@@ -3,13 +3,18 @@ API Dependencies
 API 依賴注入模組
 """
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional, Any
 import sys
 import os
+import hmac
 import logging
 
+from executor import BrokerExecutor
+from metrics import instrument_broker
+from tracing import span, trace_broker
+
 logger = logging.getLogger(__name__)
 
 # 添加 src 目錄到路徑
@@ -24,15 +29,143 @@ try:
 except ImportError:
     logger.warning("fubon-neo SDK not installed, only Mock mode available")
 
-# 全局 broker 實例存儲
-_broker_instances: dict = {}
+from sessions import SessionRegistry, BrokerSession
+from src.brokers.fubon.account_cache import AccountCache
+from src.brokers.fubon.rate_limiter import RequestScheduler, DEFAULT_LIMITS, DEFAULT_GLOBAL_LIMIT
+from src.brokers.fubon.recorder import EventRecorder, DEFAULT_SEGMENT_BYTES
+
+# SDK 呼叫額度: SDK_RATE_<CATEGORY> (每秒次數) / SDK_BURST_<CATEGORY> (突發次數)
+SDK_RATE_LIMITS = {
+    category: (
+        float(os.getenv(f"SDK_RATE_{category.upper()}", rate)),
+        int(os.getenv(f"SDK_BURST_{category.upper()}", burst))
+    )
+    for category, (rate, burst) in DEFAULT_LIMITS.items()
+}
+SDK_GLOBAL_LIMIT = (
+    float(os.getenv("SDK_RATE_GLOBAL", DEFAULT_GLOBAL_LIMIT[0])),
+    int(os.getenv("SDK_BURST_GLOBAL", DEFAULT_GLOBAL_LIMIT[1]))
+)
+
+# 報價與委託事件錄製目錄 (未設定時不錄製)、區段大小 (MB) 與保留區段數 (0 表示不刪除)
+EVENT_RECORDER_DIR = os.getenv("EVENT_RECORDER_DIR", "")
+EVENT_RECORDER_SEGMENT_MB = float(
+    os.getenv("EVENT_RECORDER_SEGMENT_MB", DEFAULT_SEGMENT_BYTES / 1024 / 1024)
+)
+EVENT_RECORDER_MAX_SEGMENTS = int(os.getenv("EVENT_RECORDER_MAX_SEGMENTS", "0"))
+
+# Mock 模式模擬的 SDK 呼叫延遲 (毫秒) 與隨機增量上限，用於壓力測試
+MOCK_SDK_LATENCY_MS = float(os.getenv("MOCK_SDK_LATENCY_MS", "0"))
+MOCK_SDK_LATENCY_JITTER_MS = float(os.getenv("MOCK_SDK_LATENCY_JITTER_MS", "0"))
+
+# 所有會話共用的事件錄製器
+event_recorder: Optional[EventRecorder] = None
+if EVENT_RECORDER_DIR:
+    event_recorder = EventRecorder(
+        EVENT_RECORDER_DIR,
+        segment_bytes=int(EVENT_RECORDER_SEGMENT_MB * 1024 * 1024),
+        max_segments=EVENT_RECORDER_MAX_SEGMENTS or None
+    )
+    logger.info("Recording quote and order events to %s", EVENT_RECORDER_DIR)
+
+# 管理端點 (/debug、/sessions) 的存取權杖，未設定時管理端點一律拒絕存取
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 security = HTTPBearer()
 
 
+def _create_broker(use_mock: bool) -> Any:
+    """
+    依模式建立 Broker 實例
+
+    Args:
+        use_mock: 是否使用 Mock 模式
+
+    Returns:
+        FubonBroker: Broker 實例（Mock 或 Real）
+
+    Raises:
+        HTTPException: 當正式環境要求但 SDK 未安裝時
+    """
+    # 如果要求使用真實 SDK 但未安裝，拋出錯誤
+    if not use_mock and not FUBON_NEO_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="正式環境需要安裝 fubon-neo SDK。請執行: pip install fubon-neo"
+        )
+
+    # 根據模式選擇 Broker
+    if use_mock:
+        from src.brokers.fubon.broker_mock import FubonBroker
+        logger.info("Creating Mock FubonBroker")
+    else:
+        from src.brokers.fubon.broker import FubonBroker
+        logger.info("Creating Real FubonBroker")
+        return instrument_broker(trace_broker(FubonBroker(
+            scheduler=RequestScheduler(limits=SDK_RATE_LIMITS, global_limit=SDK_GLOBAL_LIMIT),
+            recorder=event_recorder
+        )))
+
+    # Mock 模式套用相同的 SDK 呼叫額度，壓力測試時的限流行為與正式環境一致
+    return instrument_broker(trace_broker(FubonBroker(
+        scheduler=RequestScheduler(limits=SDK_RATE_LIMITS, global_limit=SDK_GLOBAL_LIMIT),
+        recorder=event_recorder,
+        latency=MOCK_SDK_LATENCY_MS / 1000,
+        latency_jitter=MOCK_SDK_LATENCY_JITTER_MS / 1000
+    )))
+
+
+# 全局會話註冊表 (有容量上限並會回收閒置會話)
+session_registry = SessionRegistry(_create_broker)
+
+
+def open_session(session_id: str = "default", use_mock: bool = True) -> BrokerSession:
+    """
+    取得會話，不存在時建立 (僅供登入流程使用)
+
+    Args:
+        session_id: 會話 ID，用於支援多用戶
+        use_mock: 是否使用 Mock 模式
+
+    Returns:
+        BrokerSession: 會話物件
+
+    Raises:
+        HTTPException: 當正式環境要求但 SDK 未安裝時
+    """
+    return session_registry.get(session_id, use_mock)
+
+
+def get_session(
+    session_id: str = "default",
+    use_mock: Optional[bool] = None
+) -> BrokerSession:
+    """
+    取得已登入的會話 (不建立)
+
+    Args:
+        session_id: 會話 ID，用於支援多用戶
+        use_mock: 是否使用 Mock 模式，未指定時沿用該會話已登入的模式
+
+    Returns:
+        BrokerSession: 會話物件
+
+    Raises:
+        HTTPException: 沒有已登入的會話時拋出 401 錯誤
+    """
+    with span("dependency.get_session"):
+        session = session_registry.resolve(session_id, use_mock)
+        if session is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not logged in. Please login first."
+            )
+        return session
+
+
 def get_broker_instance(session_id: str = "default", use_mock: bool = True) -> Any:
     """
-    取得 Broker 實例
+    取得 Broker 實例，會話不存在時建立 (僅供登入流程使用)
     
     Args:
         session_id: 會話 ID，用於支援多用戶
@@ -44,40 +177,70 @@ def get_broker_instance(session_id: str = "default", use_mock: bool = True) -> A
     Raises:
         HTTPException: 當正式環境要求但 SDK 未安裝時
     """
-    # 生成帶模式標記的 session key
-    session_key = f"{session_id}_{'mock' if use_mock else 'real'}"
-    
-    if session_key not in _broker_instances:
-        # 如果要求使用真實 SDK 但未安裝，拋出錯誤
-        if not use_mock and not FUBON_NEO_AVAILABLE:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="正式環境需要安裝 fubon-neo SDK。請執行: pip install fubon-neo"
-            )
-        
-        # 根據模式選擇 Broker
-        if use_mock or not FUBON_NEO_AVAILABLE:
-            from src.brokers.fubon.broker_mock import FubonBroker
-            logger.info(f"Creating Mock FubonBroker for session {session_id}")
-        else:
-            from src.brokers.fubon.broker import FubonBroker
-            logger.info(f"Creating Real FubonBroker for session {session_id}")
-        
-        _broker_instances[session_key] = FubonBroker()
-    
-    return _broker_instances[session_key]
+    return open_session(session_id, use_mock).broker
+
+
+def get_broker_executor(
+    session_id: str = "default",
+    use_mock: Optional[bool] = None
+) -> BrokerExecutor:
+    """
+    取得會話專屬的 SDK 呼叫執行器
+
+    Args:
+        session_id: 會話 ID
+        use_mock: 是否使用 Mock 模式
+
+    Returns:
+        BrokerExecutor: 該會話的執行器
+    """
+    return get_session(session_id, use_mock).executor
+
+
+def get_order_executor(
+    session_id: str = "default",
+    use_mock: Optional[bool] = None
+) -> BrokerExecutor:
+    """
+    取得會話專屬的委託執行器 (下單/刪單/改單)
+
+    Args:
+        session_id: 會話 ID
+        use_mock: 是否使用 Mock 模式
+
+    Returns:
+        BrokerExecutor: 該會話的委託執行器
+    """
+    return get_session(session_id, use_mock).order_executor
+
+
+def get_account_cache(
+    session_id: str = "default",
+    use_mock: Optional[bool] = None
+) -> AccountCache:
+    """
+    取得會話專屬的帳戶查詢快取
+
+    Args:
+        session_id: 會話 ID
+        use_mock: 是否使用 Mock 模式
+
+    Returns:
+        AccountCache: 該會話的帳戶快取
+    """
+    return get_session(session_id, use_mock).account_cache
 
 
 def get_authenticated_broker(
     session_id: str = "default",
-    use_mock: bool = True
+    use_mock: Optional[bool] = None
 ) -> Any:
     """
     取得已認證的 Broker 實例
     
     Args:
         session_id: 會話 ID
-        use_mock: 是否使用 Mock 模式
+        use_mock: 是否使用 Mock 模式，未指定時沿用該會話已登入的模式
     
     Returns:
         FubonBroker: 已登入的 Broker 實例
@@ -85,21 +248,37 @@ def get_authenticated_broker(
     Raises:
         HTTPException: 未登入時拋出 401 錯誤
     """
-    broker = get_broker_instance(session_id, use_mock)
-    
-    if not broker.is_logged_in:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not logged in. Please login first."
-        )
-    
-    return broker
+    with span("dependency.get_authenticated_broker"):
+        return get_session(session_id, use_mock).broker
+
+
+def cleanup_broker_instance(session_id: str = "default", use_mock: Optional[bool] = None):
+    """
+    清理 Broker 實例
 
+    登出仍在線的 broker 並釋放其執行器與快取。
 
-def cleanup_broker_instance(session_id: str = "default"):
-    """清理 Broker 實例"""
-    if session_id in _broker_instances:
-        broker = _broker_instances[session_id]
-        if broker.is_logged_in:
-            broker.logout()
-        del _broker_instances[session_id]
+    Args:
+        session_id: 會話 ID
+        use_mock: 指定模式，None 表示同時清理 Mock 與正式環境
+    """
+    session_registry.remove(session_id, use_mock)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """
+    檢查管理端點的存取權杖 (X-Admin-Token 標頭)
+
+    Raises:
+        HTTPException: 未設定 ADMIN_TOKEN 或權杖不符時拋出 403 錯誤
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="未設定 ADMIN_TOKEN，管理端點已停用"
+        )
+    if not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="管理端點需要有效的 X-Admin-Token"
+        )
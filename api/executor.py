@@ -0,0 +1,203 @@
+"""
+Broker Call Executor
+券商 SDK 呼叫執行層
+
+FubonBroker 的方法皆為同步阻塞呼叫，直接在 async 路由中執行會卡住整個
+event loop。此模組為每個會話提供獨立且有上限的執行緒池，並在佇列滿載時
+回應 503，避免單一使用者的慢查詢拖累其他使用者的下單延遲。
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+
+from tracing import queued
+
+logger = logging.getLogger(__name__)
+
+# 每個會話的工作執行緒數量
+BROKER_EXECUTOR_WORKERS = int(os.getenv("BROKER_EXECUTOR_WORKERS", "4"))
+# 每個會話允許排隊等待的呼叫數量 (不含執行中)
+BROKER_EXECUTOR_MAX_QUEUE = int(os.getenv("BROKER_EXECUTOR_MAX_QUEUE", "32"))
+
+
+class BrokerExecutor:
+    """
+    會話專屬的券商呼叫執行器
+
+    以固定大小的執行緒池執行同步的 SDK 呼叫，並限制排隊深度。
+    當執行中與排隊中的呼叫總數達到上限時，直接拒絕新的呼叫 (503)，
+    讓前端可以稍後重試，而不是無限制地堆積請求。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = BROKER_EXECUTOR_WORKERS,
+        max_queue: int = BROKER_EXECUTOR_MAX_QUEUE
+    ):
+        """
+        初始化執行器
+
+        Args:
+            name: 執行器名稱 (通常為 session key)，用於執行緒命名
+            max_workers: 工作執行緒數量
+            max_queue: 最大排隊數量
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=f"broker-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._closed = False
+
+    @property
+    def capacity(self) -> int:
+        """執行中加排隊中的呼叫總上限"""
+        return self.max_workers + self.max_queue
+
+    @property
+    def pending(self) -> int:
+        """目前執行中與排隊中的呼叫數量"""
+        return self._pending
+
+    def _acquire_slot(self) -> None:
+        """取得一個執行名額，滿載時拋出 503"""
+        with self._lock:
+            if self._closed:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="會話已關閉，請重新登入"
+                )
+            if self._pending >= self.capacity:
+                self._rejected += 1
+                logger.warning(
+                    "Broker executor %s saturated (%d pending), rejecting call",
+                    self.name, self._pending
+                )
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="券商連線忙碌中，請稍後再試"
+                )
+            self._pending += 1
+
+    def _release_slot(self, _future=None) -> None:
+        """釋放執行名額"""
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        在執行緒池中執行同步函式並等待結果
+
+        Args:
+            func: 要執行的同步函式 (通常為 broker 方法)
+            *args: 位置參數
+            **kwargs: 關鍵字參數
+
+        Returns:
+            Any: 函式回傳值
+
+        Raises:
+            HTTPException: 執行器滿載或已關閉時拋出 503
+        """
+        self._acquire_slot()
+        try:
+            # 複製 context，讓工作執行緒中的 broker 呼叫記錄在原請求的 trace
+            future = self._pool.submit(
+                contextvars.copy_context().run, queued(functools.partial(func, *args, **kwargs))
+            )
+        except RuntimeError:
+            self._release_slot()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="會話已關閉，請重新登入"
+            )
+        # 名額在工作真正結束時才釋放，即使呼叫端已取消等待
+        future.add_done_callback(self._release_slot)
+        return await asyncio.wrap_future(future)
+
+    async def map(
+        self,
+        func: Callable,
+        items: Iterable[Any],
+        max_in_flight: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        並行地對每個項目呼叫同步函式 (fan-out)，回傳逐項結果
+
+        同時執行的呼叫數量受 max_in_flight 限制，且不會超過執行器容量，
+        因此大量項目不會觸發自身的 503。單一項目逾時或失敗只影響該項目。
+
+        Args:
+            func: 以單一項目為參數的同步函式
+            items: 項目列表 (例如股票代號)
+            max_in_flight: 同時執行的最大呼叫數
+            timeout: 單一項目的逾時秒數
+
+        Returns:
+            List[Dict]: 與輸入順序相同的結果，每項包含
+                item / success / result / error / elapsed_ms
+        """
+        limit = min(max_in_flight or self.capacity, self.capacity)
+        semaphore = asyncio.Semaphore(max(limit, 1))
+
+        async def _call(item: Any) -> Dict[str, Any]:
+            async with semaphore:
+                started = time.perf_counter()
+                outcome: Dict[str, Any] = {"item": item, "success": False}
+                try:
+                    outcome["result"] = await asyncio.wait_for(
+                        self.run(func, item), timeout
+                    )
+                    outcome["success"] = True
+                except asyncio.TimeoutError:
+                    outcome["error"] = f"逾時 ({timeout:g} 秒)"
+                except HTTPException as e:
+                    outcome["error"] = e.detail
+                except Exception as e:
+                    outcome["error"] = str(e)
+                outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                return outcome
+
+        return await asyncio.gather(*(_call(item) for item in items))
+
+    def stats(self) -> Dict[str, Any]:
+        """取得執行器統計資訊"""
+        return {
+            "name": self.name,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "closed": self._closed
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """關閉執行器，已排隊的呼叫仍會執行完畢"""
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait)
+        logger.info("Broker executor %s shut down", self.name)
@@ -0,0 +1,264 @@
+"""
+Logging Setup
+日誌設定
+
+以 QueueHandler 將日誌記錄放入有上限的佇列，由背景執行緒 (QueueListener)
+負責格式化與寫出，下單與報價回調的執行緒只付出放入佇列的成本。
+
+- LOG_FORMAT=json 時每筆日誌輸出為一行 JSON，並帶有請求編號 (X-Request-ID)
+- LOG_RATE_LIMITS 可針對高頻模組 (例如報價) 限制每秒筆數，WARNING 以上不受限
+- 佇列滿載時直接丟棄並計數，不會阻塞呼叫端
+"""
+
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from enum import Enum
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional, Tuple
+
+from tracing import current_request_id
+
+# 日誌等級
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 輸出格式: text / json
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+# 佇列上限 (筆)，滿載時丟棄
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 各模組每秒筆數上限，格式: logger 名稱前綴=筆數，以逗號分隔
+LOG_RATE_LIMITS = os.getenv(
+    "LOG_RATE_LIMITS",
+    "src.brokers.fubon.broker=50,src.brokers.fubon.broker_mock=50,routers.market=50"
+)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 可延後到背景執行緒才格式化的參數型別 (不可變)
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None), Decimal, Enum, bytes)
+
+# LogRecord 內建欄位，其餘欄位 (extra=...) 會輸出到 JSON
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """
+    解析 LOG_RATE_LIMITS
+
+    Args:
+        spec: 例如 "routers.market=20,src.brokers.fubon.broker=50"
+
+    Returns:
+        Dict[str, float]: logger 名稱前綴 -> 每秒筆數
+    """
+    limits: Dict[str, float] = {}
+    for item in spec.split(','):
+        name, sep, rate = item.strip().partition('=')
+        if not sep or not name:
+            continue
+        limits[name.strip()] = float(rate)
+    return limits
+
+
+class RequestContextFilter(logging.Filter):
+    """在產生日誌的執行緒記下目前的請求編號 (背景執行緒無法取得 contextvars)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    依 logger 名稱前綴限制每秒筆數的 token bucket
+
+    只限制 WARNING 以下的等級；被略過的筆數會附在該 logger 下一筆
+    通過的日誌上 (suppressed 欄位)，並累計於 dropped。
+    """
+
+    def __init__(self, limits: Dict[str, float], clock=time.monotonic):
+        """
+        初始化過濾器
+
+        Args:
+            limits: logger 名稱前綴 -> 每秒筆數 (0 表示全部略過)
+            clock: 時間來源 (測試用)
+        """
+        super().__init__()
+        # 較長的前綴優先比對
+        self._limits: List[Tuple[str, float]] = sorted(limits.items(), key=lambda item: -len(item[0]))
+        self._clock = clock
+        self._lock = threading.Lock()
+        # logger 名稱 -> [tokens, updated, suppressed]
+        self._buckets: Dict[str, List[float]] = {}
+        self._rates: Dict[str, Optional[float]] = {}
+        self.dropped = 0
+
+    def _rate_for(self, name: str) -> Optional[float]:
+        rate = self._rates.get(name, -1.0)
+        if rate == -1.0:
+            rate = None
+            for prefix, limit in self._limits:
+                if name == prefix or name.startswith(prefix + '.'):
+                    rate = limit
+                    break
+            self._rates[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record.name)
+        if rate is None:
+            return True
+
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [max(rate, 1.0), now, 0]
+            bucket[0] = min(max(rate, 1.0), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                self.dropped += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        if suppressed:
+            record.suppressed = int(suppressed)
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    不阻塞的 QueueHandler
+
+    參數皆為不可變型別時保留 msg/args，由背景執行緒才組成訊息
+    (標準 QueueHandler 會在呼叫端執行緒先格式化)；佇列滿載時丟棄。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # traceback 需在原執行緒展開，frame 之後可能已被釋放
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        args = record.args
+        if args and not (
+            isinstance(args, tuple) and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)
+        ):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """每筆日誌輸出為一行 JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LoggingPipeline:
+    """非同步日誌管線 (佇列、過濾器與背景寫出執行緒)"""
+
+    def __init__(
+        self,
+        level: str = LOG_LEVEL,
+        fmt: str = LOG_FORMAT,
+        queue_size: int = LOG_QUEUE_SIZE,
+        rate_limits: Optional[Dict[str, float]] = None,
+        stream=None
+    ):
+        """
+        初始化管線
+
+        Args:
+            level: 日誌等級
+            fmt: 輸出格式 (text / json)
+            queue_size: 佇列上限
+            rate_limits: logger 名稱前綴 -> 每秒筆數 (預設讀取 LOG_RATE_LIMITS)
+            stream: 輸出串流 (預設 stderr)
+        """
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        output = logging.StreamHandler(stream or sys.stderr)
+        output.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        self.rate_limit = RateLimitFilter(
+            parse_rate_limits(LOG_RATE_LIMITS) if rate_limits is None else rate_limits
+        )
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.rate_limit)
+        self.handler.addFilter(RequestContextFilter())
+        self.listener = QueueListener(self.queue, output, respect_handler_level=True)
+
+    def install(self) -> 'LoggingPipeline':
+        """取代 root logger 的 handler 並啟動背景寫出執行緒"""
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+        return self
+
+    def stop(self) -> None:
+        """寫出佇列中剩餘的日誌並停止背景執行緒"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        """取得管線統計資訊"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_dropped': self.handler.dropped,
+            'rate_limited': self.rate_limit.dropped
+        }
+
+
+def setup_logging(**kwargs) -> LoggingPipeline:
+    """
+    建立並安裝非同步日誌管線
+
+    Args:
+        **kwargs: 傳給 LoggingPipeline 的參數
+
+    Returns:
+        LoggingPipeline: 已啟動的管線
+    """
+    return LoggingPipeline(**kwargs).install()
@@ -5,19 +5,21 @@ FastAPI Main Application
 
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+import asyncio
 import logging
 from typing import Dict, Any
 from datetime import datetime
 
-from routers import auth, market, order, account
-from dependencies import get_broker_instance
+from routers import auth, market, order, account, stream, debug
+from dependencies import get_broker_instance, require_admin, session_registry, event_recorder
+from sessions import SESSION_SWEEP_INTERVAL
+from metrics import MetricsMiddleware, registry as metrics_registry, session_collector, logging_collector
+from tracing import TracingMiddleware
+from logging_setup import setup_logging
 
-# 配置日誌
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# 配置日誌 (背景執行緒寫出)
+logging_pipeline = setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -39,11 +41,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 請求延遲與狀態碼指標
+app.add_middleware(MetricsMiddleware)
+# 請求追蹤 (X-Request-ID)
+app.add_middleware(TracingMiddleware)
+metrics_registry.add_collector(session_collector(session_registry, event_recorder))
+metrics_registry.add_collector(logging_collector(logging_pipeline))
+
 # 註冊路由
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["認證"])
 app.include_router(market.router, prefix="/api/v1/market", tags=["市場行情"])
 app.include_router(order.router, prefix="/api/v1/order", tags=["交易下單"])
 app.include_router(account.router, prefix="/api/v1/account", tags=["帳戶管理"])
+app.include_router(stream.router, tags=["即時推播"])
+app.include_router(debug.router, prefix="/debug", tags=["除錯"])
 
 
 @app.get("/", tags=["系統"])
@@ -67,6 +78,52 @@ async def health_check():
     }
 
 
+@app.get("/sessions", tags=["系統"], dependencies=[Depends(require_admin)])
+async def session_stats(detail: bool = False):
+    """會話統計 (存活數量、淘汰次數、每個會話的記憶體用量)，需 X-Admin-Token"""
+    return {
+        "success": True,
+        "stats": session_registry.stats(include_sessions=detail),
+        "recorder": event_recorder.stats() if event_recorder else None
+    }
+
+
+@app.get("/metrics", tags=["系統"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 格式的服務指標 (請求延遲、SDK 呼叫延遲與錯誤、會話與佇列狀態)"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+async def _sweep_idle_sessions():
+    """定期回收閒置會話"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            session_registry.sweep_idle()
+        except Exception as e:
+            logger.error("Idle session sweep error: %s", e)
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """啟動閒置會話回收工作"""
+    app.state.session_sweeper = asyncio.create_task(_sweep_idle_sessions())
+
+
+@app.on_event("shutdown")
+async def close_sessions():
+    """關閉所有會話並釋放 SDK 連線"""
+    app.state.session_sweeper.cancel()
+    for session in session_registry.find_all():
+        session_registry.remove(session.session_id, session.use_mock)
+    if event_recorder is not None:
+        event_recorder.close()
+    logging_pipeline.stop()
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """HTTP 異常處理"""
@@ -83,7 +140,7 @@ async def http_exception_handler(request, exc):
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """一般異常處理"""
-    logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
@@ -0,0 +1,503 @@
+"""
+Metrics
+Prometheus 格式的服務指標
+
+提供 Counter / Gauge / Histogram 與文字格式輸出 (/metrics)。
+熱路徑上的紀錄只寫入目前執行緒的分片 (不取鎖)，直方圖另加一次 bisect；
+會話、佇列深度、快取命中率等狀態則在抓取時才由 collector 從各元件的
+stats() 讀出，不增加請求路徑的成本。
+"""
+
+import functools
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 延遲直方圖預設的桶上界 (秒)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 計時並統計錯誤的 broker 方法 (存在於 broker 上者才會包裝)
+SDK_METHODS = (
+    'login', 'logout', 'subscribe_quote', 'unsubscribe_quote',
+    'get_quote', 'get_historical_data', 'get_intraday_data',
+    'place_order', 'cancel_order', 'modify_order', 'get_orders', 'get_order',
+    'get_account_info', 'get_balance', 'get_buying_power', 'get_positions',
+    'get_position', 'get_settlements', 'get_profit_loss', 'get_margin_info'
+)
+
+# collector 回傳的指標: (名稱, 類型, 說明, [(標籤, 數值)])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _ShardOwner:
+    """執行緒分片的擁有者，隨執行緒的 threading.local 一起釋放"""
+
+    __slots__ = ('__weakref__',)
+
+
+class _ShardedChild:
+    """
+    以執行緒分片保存數值的子指標
+
+    每個執行緒只寫入自己的分片，紀錄時不需取鎖 (GIL 下單一寫入者不會遺失更新)；
+    抓取時才加總所有分片。執行緒結束時其分片併入 _retired 後移除，
+    分片數只與存活的執行緒數相關，計數也不會倒退。
+    """
+
+    __slots__ = ('_local', '_shards', '_retired', '_lock')
+
+    size = 1
+
+    def __init__(self):
+        self._local = threading.local()
+        # id(分片) -> 分片 (list 以值比較，不能用 list.remove)
+        self._shards: Dict[int, List[float]] = {}
+        self._retired: List[float] = [0] * self.size
+        # 分片的回收可能在持有鎖時由 GC 觸發，使用可重入鎖
+        self._lock = threading.RLock()
+
+    def _new_shard(self) -> List[float]:
+        shard = [0] * self.size
+        owner = _ShardOwner()
+        with self._lock:
+            self._shards[id(shard)] = shard
+        # 執行緒結束時 threading.local 釋放 owner，觸發分片合併
+        weakref.finalize(owner, self._retire, shard).atexit = False
+        self._local.shard = shard
+        self._local.owner = owner
+        return shard
+
+    def _retire(self, shard: List[float]) -> None:
+        with self._lock:
+            if self._shards.pop(id(shard), None) is None:
+                return
+            for index, value in enumerate(shard):
+                self._retired[index] += value
+
+    def _totals(self) -> List[float]:
+        with self._lock:
+            totals = list(self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class _CounterChild(_ShardedChild):
+    __slots__ = ()
+
+    def inc(self, amount: float = 1) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[0] += amount
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+        return [(name, labels, self._totals()[0])]
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.inc(-amount)
+
+
+class _HistogramChild(_ShardedChild):
+    __slots__ = ('_bounds', 'size')
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # 各桶計數 (最後一桶為 +Inf) 之後接著總和
+        self.size = len(bounds) + 2
+        super().__init__()
+
+    def observe(self, value: float) -> None:
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+        totals = self._totals()
+        result = []
+        cumulative = 0
+        for bound, count in zip(self._bounds + (float('inf'),), totals):
+            cumulative += count
+            result.append((f'{name}_bucket', dict(labels, le=_format_value(float(bound))), cumulative))
+        result.append((f'{name}_sum', labels, totals[-1]))
+        result.append((f'{name}_count', labels, cumulative))
+        return result
+
+
+class _Metric:
+    """具名指標，依標籤值保存子指標"""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """
+        取得標籤值對應的子指標 (不存在時建立)
+
+        Args:
+            *values: 依 labelnames 順序的標籤值
+
+        Returns:
+            子指標 (inc / dec / observe)
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def collect(self) -> List[Tuple[str, Dict[str, str], float]]:
+        samples = []
+        for values, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, dict(zip(self.labelnames, values))))
+        return samples
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    type_name = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """可增可減的數值"""
+
+    type_name = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    """固定桶的分布統計"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+
+class MetricsRegistry:
+    """指標註冊表，負責輸出 Prometheus 文字格式"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """
+        註冊抓取時才執行的 collector
+
+        Args:
+            collector: 回傳 (名稱, 類型, 說明, [(標籤, 數值)]) 列表的函式
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """輸出 Prometheus 文字格式"""
+        lines: List[str] = []
+
+        def family(name: str, type_name: str, documentation: str,
+                   samples: Iterable[Tuple[str, Dict[str, str], float]]) -> None:
+            lines.append(f'# HELP {name} {_escape(documentation)}')
+            lines.append(f'# TYPE {name} {type_name}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+
+        for metric in list(self._metrics.values()):
+            family(metric.name, metric.type_name, metric.documentation, metric.collect())
+        for collector in self._collectors:
+            for name, type_name, documentation, samples in collector():
+                family(name, type_name, documentation, ((name, labels, value) for labels, value in samples))
+        return '\n'.join(lines) + '\n'
+
+
+# 服務共用的註冊表與指標
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    'fubon_api_http_request_duration_seconds', 'HTTP request latency by route template',
+    ('method', 'route')
+)
+HTTP_REQUESTS = registry.counter(
+    'fubon_api_http_requests_total', 'HTTP requests by route template and status code',
+    ('method', 'route', 'status')
+)
+HTTP_IN_FLIGHT = registry.gauge('fubon_api_http_requests_in_flight', 'HTTP requests currently being served')
+
+SDK_CALL_DURATION = registry.histogram(
+    'fubon_api_sdk_call_duration_seconds', 'Broker SDK call latency by method', ('method',)
+)
+SDK_CALL_ERRORS = registry.counter(
+    'fubon_api_sdk_call_errors_total', 'Broker SDK calls that raised, by method', ('method',)
+)
+SDK_IN_FLIGHT = registry.gauge('fubon_api_sdk_calls_in_flight', 'Broker SDK calls currently running', ('method',))
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """取得路由樣板 (例如 /api/v1/order/detail/{order_id})，避免路徑參數造成標籤爆量"""
+    route = scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: 依路由樣板記錄 HTTP 請求延遲、狀態碼與進行中數量
+
+    直接實作 ASGI 介面 (不經 BaseHTTPMiddleware)，不額外建立 Request 物件與背景工作。
+    WebSocket 等非 HTTP 連線直接放行。
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            route = _route_template(scope)
+            method = scope['method']
+            HTTP_REQUEST_DURATION.labels(method, route).observe(elapsed)
+            HTTP_REQUESTS.labels(method, route, str(status_code)).inc()
+
+
+def _timed_call(name: str, func: Callable) -> Callable:
+    duration = SDK_CALL_DURATION.labels(name)
+    errors = SDK_CALL_ERRORS.labels(name)
+    in_flight = SDK_IN_FLIGHT.labels(name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+            in_flight.dec()
+
+    return wrapper
+
+
+def instrument_broker(broker: Any) -> Any:
+    """
+    為 broker 實例的 SDK 方法加上計時與錯誤統計
+
+    以實例屬性覆寫綁定方法，Mock 與正式 broker 皆適用，且不論由路由、
+    帳戶快取或背景同步呼叫都會被統計。
+
+    Args:
+        broker: FubonBroker 實例
+
+    Returns:
+        同一個 broker 實例
+    """
+    for name in SDK_METHODS:
+        method = getattr(broker, name, None)
+        if callable(method):
+            setattr(broker, name, _timed_call(name, method))
+    return broker
+
+
+def session_collector(session_registry: Any, recorder: Optional[Any] = None) -> Callable[[], List[Family]]:
+    """
+    建立會話相關狀態的 collector (抓取時彙總所有會話)
+
+    Args:
+        session_registry: SessionRegistry
+        recorder: EventRecorder (選填)
+
+    Returns:
+        Callable: 供 MetricsRegistry.add_collector 使用的函式
+    """
+    def collect() -> List[Family]:
+        sessions = session_registry.find_all()
+        registry_stats = session_registry.stats(include_sessions=False)
+
+        executors = [e.stats() for s in sessions for e in (s.executor, s.order_executor)]
+        caches = [s.account_cache.stats() for s in sessions]
+        quote_hubs = [s.quote_hub.stats() for s in sessions if s.quote_hub]
+        order_hubs = [s.order_hub.stats() for s in sessions if s.order_hub]
+
+        def total(items: List[Dict[str, Any]], key: str) -> float:
+            return sum(item.get(key, 0) or 0 for item in items)
+
+        def peak(items: List[Dict[str, Any]], key: str) -> float:
+            return max((item.get(key, 0) or 0 for item in items), default=0)
+
+        families: List[Family] = [
+            ('fubon_api_sessions', 'gauge', 'Live broker sessions', [
+                ({'state': 'live'}, registry_stats['live_sessions']),
+                ({'state': 'logged_in'}, registry_stats['logged_in_sessions'])
+            ]),
+            ('fubon_api_session_evictions_total', 'counter', 'Sessions evicted by reason', [
+                ({'reason': reason}, count) for reason, count in registry_stats['evictions'].items()
+            ]),
+            ('fubon_api_executor_pending', 'gauge', 'Broker calls running or queued across sessions', [
+                ({}, total(executors, 'pending'))
+            ]),
+            ('fubon_api_executor_rejected_total', 'counter', 'Broker calls rejected because the executor was full', [
+                ({}, total(executors, 'rejected'))
+            ]),
+            ('fubon_api_account_cache_lookups_total', 'counter', 'Account cache lookups by result', [
+                ({'result': result}, total(caches, result)) for result in ('hits', 'stale_hits', 'misses')
+            ]),
+            ('fubon_api_quote_hub_clients', 'gauge', 'Quote WebSocket clients', [
+                ({}, total(quote_hubs, 'clients'))
+            ]),
+            ('fubon_api_quote_hub_max_client_depth', 'gauge', 'Deepest pending quote queue of any client', [
+                ({}, peak(quote_hubs, 'max_client_depth'))
+            ]),
+            ('fubon_api_quote_hub_dropped_total', 'counter', 'Quotes dropped for slow clients', [
+                ({}, total(quote_hubs, 'dropped'))
+            ]),
+            ('fubon_api_order_hub_clients', 'gauge', 'Order event WebSocket clients', [
+                ({}, total(order_hubs, 'clients'))
+            ]),
+            ('fubon_api_order_hub_max_client_depth', 'gauge', 'Deepest pending order event queue of any client', [
+                ({}, peak(order_hubs, 'max_client_depth'))
+            ])
+        ]
+
+        lookups = sum(total(caches, key) for key in ('hits', 'stale_hits', 'misses'))
+        hits = total(caches, 'hits') + total(caches, 'stale_hits')
+        families.append(('fubon_api_account_cache_hit_ratio', 'gauge', 'Account cache hit ratio across sessions', [
+            ({}, round(hits / lookups, 4) if lookups else 0.0)
+        ]))
+
+        if recorder is not None:
+            stats = recorder.stats()
+            families.append(('fubon_api_event_recorder_queue_depth', 'gauge', 'Events waiting to be written', [
+                ({}, stats['queue_depth'])
+            ]))
+            families.append(('fubon_api_event_recorder_dropped_total', 'counter', 'Events dropped by the recorder', [
+                ({}, stats['dropped'])
+            ]))
+        return families
+
+    return collect
+
+
+def logging_collector(pipeline: Any) -> Callable[[], List[Family]]:
+    """
+    建立日誌管線狀態的 collector
+
+    Args:
+        pipeline: LoggingPipeline
+
+    Returns:
+        Callable: 供 MetricsRegistry.add_collector 使用的函式
+    """
+    def collect() -> List[Family]:
+        stats = pipeline.stats()
+        return [
+            ('fubon_api_log_queue_depth', 'gauge', 'Log records waiting to be written', [
+                ({}, stats['queue_depth'])
+            ]),
+            ('fubon_api_log_dropped_total', 'counter', 'Log records dropped by reason', [
+                ({'reason': 'queue_full'}, stats['queue_dropped']),
+                ({'reason': 'rate_limited'}, stats['rate_limited'])
+            ])
+        ]
+
+    return collect
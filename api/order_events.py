@@ -0,0 +1,131 @@
+"""
+Order Event Hub
+委託/成交事件推播中樞
+
+將 broker 的委託回調 (於 SDK 執行緒觸發) 編上遞增序號後分派給各個
+WebSocket 連線，並保留最近的事件供斷線重連時從指定序號續傳。
+委託事件不可合併或略過，因此處理過慢的連線會被要求以序號重新連線。
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 保留供續傳的事件數量
+ORDER_EVENT_BUFFER = int(os.getenv("ORDER_EVENT_BUFFER", "1000"))
+# 每個連線最多暫存的待送事件數量
+ORDER_CLIENT_MAX_PENDING = int(os.getenv("ORDER_CLIENT_MAX_PENDING", "256"))
+
+
+class OrderEventSubscriber:
+    """單一 WebSocket 連線的事件佇列"""
+
+    def __init__(self, max_pending: int = ORDER_CLIENT_MAX_PENDING):
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_pending)
+        self.lagging = False
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """放入事件；佇列已滿時標記為落後，由連線端要求客戶端續傳"""
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagging = True
+            # 喚醒等待中的送出迴圈，讓其偵測落後狀態
+            self.queue.get_nowait()
+            self.queue.put_nowait({"type": "lagging"})
+
+
+class OrderEventHub:
+    """
+    會話專屬的委託事件中樞
+
+    建立時向 broker 註冊單一委託回調，關閉時移除。
+    """
+
+    def __init__(self, broker: Any, loop: asyncio.AbstractEventLoop, buffer_size: int = ORDER_EVENT_BUFFER):
+        """
+        初始化中樞
+
+        Args:
+            broker: broker 實例
+            loop: 分派事件使用的 event loop
+            buffer_size: 保留供續傳的事件數量
+        """
+        self.broker = broker
+        self.loop = loop
+        self.sequence = 0
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[OrderEventSubscriber] = set()
+        self.broker.set_order_callback(self._on_order_event)
+
+    def _on_order_event(self, event: Any) -> None:
+        """SDK 執行緒上的委託回調，轉交給 event loop"""
+        received_at = datetime.now().isoformat()
+        try:
+            self.loop.call_soon_threadsafe(self._publish, event, received_at)
+        except RuntimeError:
+            # event loop 已關閉 (伺服器停止中)
+            pass
+
+    def _publish(self, event: Any, received_at: str) -> None:
+        """於 event loop 上編號並分派事件 (序號只在此處遞增，確保順序一致)"""
+        self.sequence += 1
+        envelope = {
+            "type": "order",
+            "seq": self.sequence,
+            "timestamp": received_at,
+            "data": event
+        }
+        self._buffer.append(envelope)
+        for subscriber in self._subscribers:
+            subscriber.offer(envelope)
+
+    def subscribe(
+        self,
+        since: Optional[int] = None
+    ) -> Tuple[OrderEventSubscriber, List[Dict[str, Any]], bool]:
+        """
+        註冊連線並取得續傳事件
+
+        Args:
+            since: 客戶端最後收到的序號，None 表示不續傳
+
+        Returns:
+            tuple: (訂閱者, 需補送的事件, 是否有遺漏而需重新載入完整委託列表)
+        """
+        subscriber = OrderEventSubscriber()
+        self._subscribers.add(subscriber)
+
+        if since is None:
+            return subscriber, [], False
+
+        oldest = self._buffer[0]["seq"] if self._buffer else self.sequence + 1
+        gap = since < oldest - 1 or since > self.sequence
+        replay = [e for e in self._buffer if e["seq"] > since] if not gap else []
+        return subscriber, replay, gap
+
+    def unsubscribe(self, subscriber: OrderEventSubscriber) -> None:
+        """移除連線"""
+        self._subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """移除 broker 上的回調"""
+        remove = getattr(self.broker, 'remove_order_callback', None)
+        if remove:
+            remove(self._on_order_event)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得中樞統計資訊"""
+        return {
+            "sequence": self.sequence,
+            "buffered": len(self._buffer),
+            "clients": len(self._subscribers),
+            "max_client_depth": max((s.queue.qsize() for s in self._subscribers), default=0)
+        }
@@ -0,0 +1,215 @@
+"""
+Sampling Profiler
+取樣式效能分析
+
+在執行中的服務內以固定間隔讀取所有執行緒 (含 SDK 回調執行緒) 的呼叫堆疊
+(sys._current_frames)，統計各堆疊出現的次數，輸出 flamegraph.pl /
+speedscope 可讀取的 collapsed stack 格式。
+
+只有在分析期間才有取樣執行緒運作，未分析時沒有任何額外成本；
+同一時間只允許一個分析進行。
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# 預設取樣間隔 (秒) 與單次分析的最長秒數
+DEFAULT_INTERVAL = 0.005
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+# 視為閒置等待的最內層函式 (檔名, 函式名)，預設不列入結果
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('thread.py', '_worker'),
+}
+
+_active = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """已有分析進行中"""
+
+
+def _frame_label(code, lineno: Optional[int]) -> str:
+    parts = code.co_filename.replace('\\', '/').rsplit('/', 2)
+    filename = '/'.join(parts[-2:])
+    if lineno is None:
+        return f"{code.co_name} ({filename})"
+    return f"{code.co_name} ({filename}:{lineno})"
+
+
+class ProfileResult:
+    """分析結果"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.threads: Counter = Counter()
+        self.duration = 0.0
+        self.overruns = 0
+
+    def collapsed(self) -> str:
+        """collapsed stack 格式: 每行為「根;...;葉 次數」"""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 30) -> List[Dict[str, Any]]:
+        """
+        依 self (位於最內層) 與 total (出現在堆疊中) 次數排序的函式
+
+        Args:
+            limit: 筆數
+
+        Returns:
+            List[Dict]: function / self / total / self_pct
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack[1:]):
+                total[frame] += count
+        busy = sum(self.stacks.values()) or 1
+        return [
+            {
+                'function': frame,
+                'self': count,
+                'total': total[frame],
+                'self_pct': round(count / busy * 100, 2)
+            }
+            for frame, count in own.most_common(limit)
+        ]
+
+    def summary(self, limit: int = 30) -> Dict[str, Any]:
+        return {
+            'duration_seconds': round(self.duration, 3),
+            'interval_ms': round(self.interval * 1000, 3),
+            'samples': self.samples,
+            'idle_samples': self.idle_samples,
+            'overruns': self.overruns,
+            'threads': dict(self.threads.most_common()),
+            'top_functions': self.top_functions(limit)
+        }
+
+
+class SamplingProfiler:
+    """
+    取樣式分析器
+
+    每個取樣週期讀取所有執行緒的目前堆疊 (不含分析器本身)，
+    堆疊以「執行緒名稱;最外層;...;最內層」累計次數。
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL,
+        include_idle: bool = False,
+        include_lines: bool = False,
+        by_thread: bool = True,
+        max_depth: int = 128
+    ):
+        """
+        初始化分析器
+
+        Args:
+            interval: 取樣間隔秒數
+            include_idle: 是否包含閒置等待中的執行緒 (IDLE_FRAMES)
+            include_lines: 堆疊是否區分行號
+            by_thread: 是否以執行緒名稱作為堆疊根
+            max_depth: 堆疊最大深度
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.include_idle = include_idle
+        self.include_lines = include_lines
+        self.by_thread = by_thread
+        self.max_depth = max_depth
+        self._labels: Dict[Tuple[Any, Optional[int]], str] = {}
+
+    def _label(self, frame) -> str:
+        key = (frame.f_code, frame.f_lineno if self.include_lines else None)
+        label = self._labels.get(key)
+        if label is None:
+            label = self._labels[key] = _frame_label(*key)
+        return label
+
+    def _is_idle(self, frame) -> bool:
+        filename = os.path.basename(frame.f_code.co_filename)
+        return (filename, frame.f_code.co_name) in IDLE_FRAMES
+
+    def _sample(self, result: ProfileResult, own_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            result.samples += 1
+            if not self.include_idle and self._is_idle(frame):
+                result.idle_samples += 1
+                continue
+            stack = []
+            depth = 0
+            while frame is not None and depth < self.max_depth:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+                depth += 1
+            name = names.get(ident, f"thread-{ident}")
+            result.threads[name] += 1
+            if self.by_thread:
+                stack.append(name)
+            stack.reverse()
+            result.stacks[tuple(stack)] += 1
+
+    def run(self, duration: float) -> ProfileResult:
+        """
+        於目前執行緒取樣 duration 秒 (阻塞)
+
+        Args:
+            duration: 分析秒數 (不超過 PROFILER_MAX_SECONDS)
+
+        Returns:
+            ProfileResult: 分析結果
+
+        Raises:
+            ProfilerBusyError: 已有分析進行中
+        """
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+        try:
+            duration = min(max(duration, self.interval), PROFILER_MAX_SECONDS)
+            result = ProfileResult(self.interval)
+            own_ident = threading.get_ident()
+            started = time.perf_counter()
+            deadline = started + duration
+            next_sample = started
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if now < next_sample:
+                    time.sleep(next_sample - now)
+                    continue
+                self._sample(result, own_ident)
+                next_sample += self.interval
+                # 取樣本身跟不上間隔時略過錯過的週期，不連續補取樣
+                if time.perf_counter() > next_sample:
+                    result.overruns += 1
+                    next_sample = time.perf_counter() + self.interval
+            result.duration = time.perf_counter() - started
+            return result
+        finally:
+            self._labels.clear()
+            _active.release()
+
+
+def is_running() -> bool:
+    """是否有分析進行中"""
+    return _active.locked()
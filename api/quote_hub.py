@@ -0,0 +1,275 @@
+"""
+Quote Hub
+即時報價推播中樞
+
+將 SDK 的報價回調 (於 SDK 執行緒觸發) 橋接到 asyncio，分派給各個
+WebSocket 連線。每檔股票不論有多少連線訂閱，都只向券商訂閱一次
+(引用計數)；每個連線只保留各檔股票的最新報價 (conflation)，
+處理較慢的客戶端只會略過過時的報價，而不會無限制地累積緩衝。
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from executor import BrokerExecutor
+from src.brokers.fubon.replay import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+# 每個連線最多暫存的待送股票數量
+QUOTE_CLIENT_MAX_PENDING = int(os.getenv("QUOTE_CLIENT_MAX_PENDING", "500"))
+
+
+class QuoteSubscriber:
+    """
+    單一 WebSocket 連線的報價緩衝
+
+    以股票代號為鍵只保留最新一筆報價；待送股票數量超過上限時，
+    捨棄最久未送出的股票報價。
+    """
+
+    def __init__(self, max_pending: int = QUOTE_CLIENT_MAX_PENDING):
+        self.max_pending = max_pending
+        self.symbols: Set[str] = set()
+        self._pending: "OrderedDict[str, Any]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.conflated = 0
+        self.dropped = 0
+
+    def offer(self, symbol: str, quote: Any) -> None:
+        """放入一筆報價 (於 event loop 執行)"""
+        if symbol in self._pending:
+            self.conflated += 1
+            self._pending[symbol] = quote
+        else:
+            if len(self._pending) >= self.max_pending:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+            self._pending[symbol] = quote
+        self._ready.set()
+
+    async def next_batch(self) -> List[Dict[str, Any]]:
+        """等待並取出目前所有待送的報價"""
+        await self._ready.wait()
+        self._ready.clear()
+        batch = [
+            {"symbol": symbol, "quote": quote}
+            for symbol, quote in self._pending.items()
+        ]
+        self._pending.clear()
+        self.delivered += len(batch)
+        return batch
+
+    @property
+    def depth(self) -> int:
+        """目前待送的股票數量"""
+        return len(self._pending)
+
+
+class _RestHold:
+    """
+    REST /market/subscribe 的訂閱持有者
+
+    與 WebSocket 連線共用引用計數，但不緩衝報價 (REST 客戶端以 /quote、
+    /intraday、/ticks 取得資料)。
+    """
+
+    def __init__(self):
+        self.symbols: Set[str] = set()
+
+    def offer(self, symbol: str, quote: Any) -> None:
+        pass
+
+
+class QuoteHub:
+    """
+    會話專屬的報價推播中樞
+
+    負責向 broker 訂閱/取消訂閱 (引用計數)，並將 SDK 執行緒上的報價
+    轉交給 event loop 分派。WebSocket 連線與 REST 訂閱 (hold / release)
+    共用同一組引用計數，每檔股票在 broker 上只有中樞的一個回調。
+    """
+
+    def __init__(self, broker: Any, executor: BrokerExecutor, loop: asyncio.AbstractEventLoop):
+        """
+        初始化中樞
+
+        Args:
+            broker: 已登入的 broker 實例
+            executor: 會話專屬的執行器 (用於訂閱/取消訂閱)
+            loop: 分派報價使用的 event loop
+        """
+        self.broker = broker
+        self.executor = executor
+        self.loop = loop
+        self._subscribers: Dict[str, Set[Any]] = {}
+        # 各股票向 broker 註冊的回調 (取消訂閱時只移除自己的回調)
+        self._callbacks: Dict[str, Callable[[Any], None]] = {}
+        self._rest = _RestHold()
+        self._lock = asyncio.Lock()
+        self._listeners: List[Callable[[str, Any], None]] = []
+        self.ticks_received = 0
+        # 重播報價 (帶 replay_ts) 從送出到推送給客戶端的延遲
+        self.replay_latency = LatencyRecorder()
+
+    def add_listener(self, listener: Callable[[str, Any], None]) -> None:
+        """
+        加入報價監聽者 (例如 K 線聚合)，於 SDK 執行緒上以 (股票代號, 報價) 呼叫
+
+        Args:
+            listener: 監聽函式，需快速返回且不可阻塞
+        """
+        self._listeners.append(listener)
+
+    def _on_quote(self, symbol: str, quote: Any) -> None:
+        """SDK 執行緒上的報價回調，轉交給 event loop"""
+        self.ticks_received += 1
+        for listener in self._listeners:
+            try:
+                listener(symbol, quote)
+            except Exception as e:
+                logger.error("Quote listener error for %s: %s", symbol, e)
+        try:
+            self.loop.call_soon_threadsafe(self._dispatch, symbol, quote)
+        except RuntimeError:
+            # event loop 已關閉 (伺服器停止中)
+            pass
+
+    def _dispatch(self, symbol: str, quote: Any) -> None:
+        """於 event loop 上分派報價給訂閱者"""
+        for subscriber in self._subscribers.get(symbol, ()):
+            subscriber.offer(symbol, quote)
+
+    def record_delivery(self, batch: List[Dict[str, Any]]) -> None:
+        """記錄已推送批次中重播報價的 tick 到客戶端延遲"""
+        now = time.time()
+        for item in batch:
+            quote = item["quote"]
+            if isinstance(quote, dict) and "replay_ts" in quote:
+                self.replay_latency.record(now - quote["replay_ts"])
+
+    def _subscribe_upstream(self, symbol: str) -> Callable[[Any], None]:
+        """向 broker 訂閱並註冊中樞的回調 (於執行緒池執行)"""
+        callback = functools.partial(self._on_quote, symbol)
+        if not self.broker.subscribe_quote(symbol, callback):
+            raise RuntimeError("訂閱失敗")
+        return callback
+
+    async def subscribe(
+        self,
+        subscriber: Any,
+        symbols: Iterable[str],
+        max_in_flight: Optional[int] = None
+    ) -> Dict[str, str]:
+        """
+        為連線訂閱股票 (尚未向券商訂閱的股票並行訂閱)
+
+        Args:
+            subscriber: 連線的報價緩衝
+            symbols: 股票代號列表
+            max_in_flight: 同時向券商訂閱的最大數量
+
+        Returns:
+            Dict[str, str]: 訂閱失敗的股票與錯誤訊息
+        """
+        errors: Dict[str, str] = {}
+        async with self._lock:
+            wanted = [s for s in dict.fromkeys(symbols) if s not in subscriber.symbols]
+            upstream = [s for s in wanted if s not in self._subscribers]
+            if upstream:
+                outcomes = await self.executor.map(
+                    self._subscribe_upstream, upstream, max_in_flight=max_in_flight
+                )
+                for outcome in outcomes:
+                    symbol = outcome["item"]
+                    if not outcome["success"]:
+                        errors[symbol] = outcome.get("error") or "訂閱失敗"
+                        continue
+                    self._callbacks[symbol] = outcome["result"]
+                    self._subscribers[symbol] = set()
+                    logger.info("Upstream quote subscription opened: %s", symbol)
+            for symbol in wanted:
+                if symbol in errors:
+                    continue
+                self._subscribers[symbol].add(subscriber)
+                subscriber.symbols.add(symbol)
+        return errors
+
+    async def unsubscribe(self, subscriber: QuoteSubscriber, symbols: Iterable[str]) -> None:
+        """
+        取消連線的股票訂閱，最後一個訂閱者離開時才向券商取消訂閱
+
+        Args:
+            subscriber: 連線的報價緩衝
+            symbols: 股票代號列表
+        """
+        async with self._lock:
+            for symbol in list(symbols):
+                if symbol not in subscriber.symbols:
+                    continue
+                subscriber.symbols.discard(symbol)
+                subscribers = self._subscribers.get(symbol)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[symbol]
+                    callback = self._callbacks.pop(symbol, None)
+                    try:
+                        await self.executor.run(self.broker.unsubscribe_quote, symbol, callback)
+                        logger.info("Upstream quote subscription closed: %s", symbol)
+                    except Exception as e:
+                        logger.warning("Upstream unsubscribe failed for %s: %s", symbol, e)
+
+    async def disconnect(self, subscriber: QuoteSubscriber) -> None:
+        """連線中斷時取消其所有訂閱"""
+        await self.unsubscribe(subscriber, list(subscriber.symbols))
+
+    async def hold(self, symbols: Iterable[str], max_in_flight: Optional[int] = None) -> Dict[str, str]:
+        """
+        REST 訂閱股票 (佔用一份引用計數，直到 release)
+
+        Args:
+            symbols: 股票代號列表
+            max_in_flight: 同時向券商訂閱的最大數量
+
+        Returns:
+            Dict[str, str]: 訂閱失敗的股票與錯誤訊息
+        """
+        return await self.subscribe(self._rest, symbols, max_in_flight)
+
+    async def release(self, symbols: Iterable[str]) -> List[str]:
+        """
+        取消 REST 訂閱；仍有 WebSocket 連線訂閱的股票不會向券商取消
+
+        Args:
+            symbols: 股票代號列表
+
+        Returns:
+            List[str]: 原本由 REST 訂閱而被取消的股票
+        """
+        released = [symbol for symbol in symbols if symbol in self._rest.symbols]
+        await self.unsubscribe(self._rest, released)
+        return released
+
+    def stats(self) -> Dict[str, Any]:
+        """取得中樞統計資訊"""
+        clients = {
+            s for subs in self._subscribers.values() for s in subs if s is not self._rest
+        }
+        return {
+            "upstream_symbols": len(self._subscribers),
+            "rest_symbols": len(self._rest.symbols),
+            "clients": len(clients),
+            "ticks_received": self.ticks_received,
+            "max_client_depth": max((c.depth for c in clients), default=0),
+            "conflated": sum(c.conflated for c in clients),
+            "dropped": sum(c.dropped for c in clients),
+            "replay_latency": self.replay_latency.summary()
+        }
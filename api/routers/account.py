@@ -5,24 +5,70 @@ Account Router
 
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Dict, Any
+import asyncio
 import logging
+import time
 
 from schemas import (
     AccountInfoResponse, BalanceResponse, PositionsResponse,
     PositionRequest, SettlementsResponse, ProfitLossResponse,
     MarginResponse
 )
-from dependencies import get_authenticated_broker
+from dependencies import (
+    get_authenticated_broker, get_broker_executor, get_account_cache
+)
+from executor import BrokerExecutor
 from src.brokers.fubon.broker import FubonBroker
+from src.brokers.fubon.account_cache import AccountCache
+from tracing import TracedRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+
+def _to_records(data: Any) -> List[Dict[str, Any]]:
+    """將 DataFrame 或列表統一轉為字典列表"""
+    if data is None:
+        return []
+    return data.to_dict('records') if hasattr(data, 'to_dict') else list(data)
+
+
+async def _cached_read(
+    cache: AccountCache,
+    executor: BrokerExecutor,
+    resource: str
+) -> Any:
+    """優先由快取讀取帳戶資料，未命中時才於執行緒池中查詢 SDK"""
+    usable, value = cache.lookup(resource)
+    if usable:
+        return value
+    return await executor.run(cache.get, resource)
+
+
+async def _timed_read(
+    cache: AccountCache,
+    executor: BrokerExecutor,
+    resource: str
+) -> Dict[str, Any]:
+    """執行單一查詢並記錄耗時，錯誤以值的形式回傳而不中斷其他查詢"""
+    started = time.perf_counter()
+    value, error = None, None
+    try:
+        value = await _cached_read(cache, executor, resource)
+    except Exception as e:
+        error = e
+    return {
+        "value": value,
+        "error": error,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
 
 
 @router.get("/info", response_model=AccountInfoResponse, summary="取得帳戶資訊")
 async def get_account_info(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor)
 ):
     """
     取得帳戶基本資訊
@@ -30,7 +76,7 @@ async def get_account_info(
     包含帳戶狀態、帳號等資訊
     """
     try:
-        info = broker.get_account_info()
+        info = await executor.run(broker.get_account_info)
         
         if info:
             return AccountInfoResponse(
@@ -43,8 +89,10 @@ async def get_account_info(
                 data=None
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get account info error: {str(e)}")
+        logger.error("Get account info error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得帳戶資訊錯誤: {str(e)}"
@@ -53,7 +101,9 @@ async def get_account_info(
 
 @router.get("/balance", response_model=BalanceResponse, summary="取得帳戶餘額")
 async def get_balance(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得帳戶餘額資訊
@@ -61,7 +111,7 @@ async def get_balance(
     包含現金餘額、可用餘額等
     """
     try:
-        balance = broker.get_balance()
+        balance = await _cached_read(cache, executor, 'balance')
         
         if balance:
             return BalanceResponse(
@@ -75,8 +125,10 @@ async def get_balance(
                 success=False
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get balance error: {str(e)}")
+        logger.error("Get balance error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得餘額錯誤: {str(e)}"
@@ -85,7 +137,8 @@ async def get_balance(
 
 @router.get("/buying-power", summary="取得可用購買力")
 async def get_buying_power(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor)
 ):
     """
     取得可用購買力
@@ -93,7 +146,7 @@ async def get_buying_power(
     計算當前可用於購買股票的金額
     """
     try:
-        buying_power = broker.get_buying_power()
+        buying_power = await executor.run(broker.get_buying_power)
         
         return {
             "success": True,
@@ -101,8 +154,10 @@ async def get_buying_power(
             "formatted": f"NT$ {buying_power:,.0f}" if buying_power else "N/A"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get buying power error: {str(e)}")
+        logger.error("Get buying power error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得購買力錯誤: {str(e)}"
@@ -111,7 +166,9 @@ async def get_buying_power(
 
 @router.get("/positions", response_model=PositionsResponse, summary="取得持股部位")
 async def get_positions(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得所有持股部位
@@ -119,7 +176,7 @@ async def get_positions(
     包含股票代號、持股數量、成本、市值等
     """
     try:
-        positions = broker.get_positions()
+        positions = await _cached_read(cache, executor, 'positions')
         
         if positions is not None:
             # 轉換為列表格式
@@ -137,8 +194,10 @@ async def get_positions(
                 total_count=0
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get positions error: {str(e)}")
+        logger.error("Get positions error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得持股部位錯誤: {str(e)}"
@@ -148,7 +207,8 @@ async def get_positions(
 @router.post("/position", summary="取得單一持股")
 async def get_position(
     request: PositionRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor)
 ):
     """
     取得特定股票的持股資訊
@@ -156,7 +216,7 @@ async def get_position(
     - **stock_code**: 股票代號
     """
     try:
-        position = broker.get_position(request.stock_code)
+        position = await executor.run(broker.get_position, request.stock_code)
         
         if position:
             return {
@@ -170,8 +230,10 @@ async def get_position(
                 "message": f"無持股資訊: {request.stock_code}"
             }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get position error: {str(e)}")
+        logger.error("Get position error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得持股錯誤: {str(e)}"
@@ -180,7 +242,9 @@ async def get_position(
 
 @router.get("/settlements", response_model=SettlementsResponse, summary="取得交割資訊")
 async def get_settlements(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得交割資訊
@@ -188,7 +252,7 @@ async def get_settlements(
     包含應收應付款項、交割日期等
     """
     try:
-        settlements = broker.get_settlements()
+        settlements = await _cached_read(cache, executor, 'settlements')
         
         if settlements is not None:
             settlements_list = settlements.to_dict('records') if hasattr(settlements, 'to_dict') else settlements
@@ -203,8 +267,10 @@ async def get_settlements(
                 settlements=[]
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get settlements error: {str(e)}")
+        logger.error("Get settlements error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得交割資訊錯誤: {str(e)}"
@@ -213,7 +279,9 @@ async def get_settlements(
 
 @router.get("/profit-loss", response_model=ProfitLossResponse, summary="取得損益資訊")
 async def get_profit_loss(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得帳戶損益資訊
@@ -221,7 +289,7 @@ async def get_profit_loss(
     包含已實現損益、未實現損益等
     """
     try:
-        profit_loss = broker.get_profit_loss()
+        profit_loss = await _cached_read(cache, executor, 'profit_loss')
         
         if profit_loss:
             return ProfitLossResponse(
@@ -233,8 +301,10 @@ async def get_profit_loss(
                 success=False
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get profit/loss error: {str(e)}")
+        logger.error("Get profit/loss error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得損益資訊錯誤: {str(e)}"
@@ -243,7 +313,9 @@ async def get_profit_loss(
 
 @router.get("/margin", response_model=MarginResponse, summary="取得融資融券資訊")
 async def get_margin_info(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得融資融券資訊
@@ -251,7 +323,7 @@ async def get_margin_info(
     包含融資額度、融券額度、已用額度等
     """
     try:
-        margin_info = broker.get_margin_info()
+        margin_info = await _cached_read(cache, executor, 'margin_info')
         
         if margin_info:
             return MarginResponse(
@@ -263,8 +335,10 @@ async def get_margin_info(
                 success=False
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get margin info error: {str(e)}")
+        logger.error("Get margin info error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得融資融券資訊錯誤: {str(e)}"
@@ -273,41 +347,73 @@ async def get_margin_info(
 
 @router.get("/summary", summary="取得帳戶摘要")
 async def get_account_summary(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    include_margin: bool = False,
+    include_settlements: bool = False,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取得帳戶完整摘要
     
-    包含餘額、持股、損益等所有資訊的摘要
+    包含餘額、持股、損益等所有資訊的摘要，各項查詢並行發出
+    
+    - **include_margin**: 是否一併查詢融資融券資訊
+    - **include_settlements**: 是否一併查詢交割資訊
     """
     try:
-        # 取得各項資訊
-        balance = broker.get_balance()
-        positions = broker.get_positions()
-        profit_loss = broker.get_profit_loss()
+        resources = ["balance", "positions", "profit_loss"]
+        if include_margin:
+            resources.append("margin_info")
+        if include_settlements:
+            resources.append("settlements")
         
-        # 計算持股數量
-        position_count = len(positions) if positions is not None else 0
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(
+            *(_timed_read(cache, executor, resource) for resource in resources)
+        )
+        components = dict(zip(resources, outcomes))
         
-        # 計算總市值
-        total_market_value = 0
-        if positions is not None and hasattr(positions, 'to_dict'):
-            positions_list = positions.to_dict('records')
-            total_market_value = sum(p.get('market_value', 0) for p in positions_list)
+        # 核心項目失敗時整體視為失敗，選填項目僅回報錯誤
+        for name in ("balance", "positions", "profit_loss"):
+            if components[name]["error"] is not None:
+                raise components[name]["error"]
+        
+        positions_list = _to_records(components["positions"]["value"])
+        total_market_value = sum(p.get('market_value', 0) or 0 for p in positions_list)
+        
+        summary = {
+            "balance": components["balance"]["value"],
+            "position_count": len(positions_list),
+            "total_market_value": total_market_value,
+            "profit_loss": components["profit_loss"]["value"],
+            "user_id": broker.user_id
+        }
+        if include_margin:
+            summary["margin_info"] = components["margin_info"]["value"]
+        if include_settlements:
+            summary["settlements"] = _to_records(components["settlements"]["value"])
         
         return {
             "success": True,
-            "summary": {
-                "balance": balance,
-                "position_count": position_count,
-                "total_market_value": total_market_value,
-                "profit_loss": profit_loss,
-                "user_id": broker.user_id
+            "summary": summary,
+            "timing": {
+                "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                "components": {
+                    name: {
+                        "elapsed_ms": c["elapsed_ms"],
+                        "success": c["error"] is None,
+                        "error": None if c["error"] is None else str(c["error"])
+                    }
+                    for name, c in components.items()
+                }
             }
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get account summary error: {str(e)}")
+        logger.error("Get account summary error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取得帳戶摘要錯誤: {str(e)}"
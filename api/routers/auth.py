@@ -6,16 +6,18 @@ Authentication Router
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 from uuid import uuid4
 
 from fastapi import APIRouter, HTTPException, status, UploadFile, File
 
 from schemas import LoginRequest, LoginResponse, SuccessResponse
-from dependencies import get_broker_instance, cleanup_broker_instance
+from dependencies import open_session, cleanup_broker_instance, session_registry
+from tracing import TracedRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
 
 CERT_UPLOAD_DIR = Path(
     os.getenv(
@@ -80,15 +82,18 @@ async def login(
     - **use_mock**: 是否使用 Mock 模式 (True=測試環境, False=正式環境)
     """
     try:
-        # 根據 use_mock 參數獲取對應的 broker
-        broker = get_broker_instance(session_id, use_mock=request.use_mock)
+        # 根據 use_mock 參數獲取對應的會話 (只有登入會建立會話)
+        session = open_session(session_id, use_mock=request.use_mock)
+        broker = session.broker
+        executor = session.executor
         
         # 如果已經登入，先登出
         if broker.is_logged_in:
-            broker.logout()
+            await executor.run(broker.logout)
         
-        # 執行登入
-        success = broker.login(
+        # 執行登入 (SDK 登入需建立連線，於執行緒池中進行)
+        success = await executor.run(
+            broker.login,
             user_id=request.user_id,
             password=request.password,
             cert_path=request.cert_path,
@@ -96,6 +101,9 @@ async def login(
             cert_pass=request.cert_password or ""
         )
         
+        # 避免沿用前一次登入的帳戶快取
+        session.account_cache.invalidate()
+        
         mode_text = "Mock 模式（測試環境）" if request.use_mock else "真實 SDK（正式環境）"
         
         if success:
@@ -116,7 +124,7 @@ async def login(
         # 重新拋出 HTTPException（如 SDK 未安裝的 503 錯誤）
         raise
     except Exception as e:
-        logger.error(f"Login error: {str(e)}")
+        logger.error("Login error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"登入錯誤: {str(e)}"
@@ -124,23 +132,28 @@ async def login(
 
 
 @router.post("/logout", response_model=SuccessResponse, summary="登出")
-async def logout(session_id: str = "default"):
+async def logout(session_id: str = "default", use_mock: Optional[bool] = None):
     """
     登出富邦證券帳戶
+    
+    - **use_mock**: 指定登出的模式 (選填，未指定時登出該會話所有模式)
     """
     try:
-        broker = get_broker_instance(session_id)
+        sessions = session_registry.find(session_id, use_mock)
+        logged_in = [s for s in sessions if s.broker.is_logged_in]
         
-        if not broker.is_logged_in:
+        if not logged_in:
+            cleanup_broker_instance(session_id, use_mock)
             return SuccessResponse(
                 success=True,
                 message="尚未登入"
             )
         
-        success = broker.logout()
+        results = [await s.executor.run(s.broker.logout) for s in logged_in]
+        success = all(results)
         
         if success:
-            cleanup_broker_instance(session_id)
+            cleanup_broker_instance(session_id, use_mock)
             return SuccessResponse(
                 success=True,
                 message="登出成功"
@@ -151,8 +164,10 @@ async def logout(session_id: str = "default"):
                 detail="登出失敗"
             )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Logout error: {str(e)}")
+        logger.error("Logout error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"登出錯誤: {str(e)}"
@@ -160,22 +175,28 @@ async def logout(session_id: str = "default"):
 
 
 @router.get("/status", summary="檢查登入狀態")
-async def check_status(session_id: str = "default"):
+async def check_status(session_id: str = "default", use_mock: Optional[bool] = None):
     """
     檢查當前登入狀態
     """
     try:
-        broker = get_broker_instance(session_id)
+        # 僅查詢既有會話，不為狀態查詢建立新會話
+        logged_in = [
+            s for s in session_registry.find(session_id, use_mock)
+            if s.broker.is_logged_in
+        ]
+        broker = logged_in[0].broker if logged_in else None
         
         return {
             "success": True,
-            "is_logged_in": broker.is_logged_in,
-            "user_id": broker.user_id if broker.is_logged_in else None,
+            "is_logged_in": broker is not None,
+            "user_id": broker.user_id if broker is not None else None,
+            "use_mock": logged_in[0].use_mock if logged_in else None,
             "session_id": session_id
         }
     
     except Exception as e:
-        logger.error(f"Status check error: {str(e)}")
+        logger.error("Status check error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"狀態檢查錯誤: {str(e)}"
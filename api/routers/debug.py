@@ -0,0 +1,127 @@
+"""
+Debug Router
+除錯與效能診斷 API 端點
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from dependencies import require_admin
+from profiler import DEFAULT_INTERVAL, PROFILER_MAX_SECONDS, ProfilerBusyError, SamplingProfiler
+from tracing import trace_buffer
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# trace 匯出目錄
+TRACE_EXPORT_DIR = Path(
+    os.getenv(
+        "TRACE_EXPORT_DIR",
+        Path(__file__).resolve().parent.parent / "data" / "traces"
+    )
+)
+
+
+@router.get("/traces/slow", summary="最慢的請求")
+async def get_slow_traces(
+    limit: int = Query(20, gt=0, le=500, description="筆數"),
+    min_ms: float = Query(0, ge=0, description="只列出超過此毫秒數的請求"),
+    route: Optional[str] = Query(None, description="路由樣板 (例如 /api/v1/order/place)")
+):
+    """
+    列出近期最慢的請求與各區段耗時
+
+    breakdown_ms 依區段分類加總扣除子區段後的時間：http 為框架本身
+    (參數驗證、序列化)、dependency 為依賴解析、endpoint 為路由函式、
+    executor 為執行緒池排隊、broker 為包裝層、sdk 為 SDK 呼叫、
+    callback 為委託回調。
+    """
+    traces = trace_buffer.slowest(limit=limit, min_ms=min_ms, route=route)
+    return {
+        "success": True,
+        "count": len(traces),
+        "buffer": trace_buffer.stats(),
+        "traces": [trace.to_dict() for trace in traces]
+    }
+
+
+@router.get("/traces/{request_id}", summary="查詢單筆請求追蹤")
+async def get_trace(request_id: str):
+    """
+    依 X-Request-ID 查詢請求追蹤
+    """
+    trace = trace_buffer.get(request_id)
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"找不到請求追蹤: {request_id}"
+        )
+    return {"success": True, "trace": trace.to_dict()}
+
+
+@router.post("/traces/export", summary="匯出請求追蹤")
+async def export_traces():
+    """
+    將緩衝中的請求追蹤以 JSON Lines 匯出至 trace 匯出目錄
+    """
+    try:
+        path = TRACE_EXPORT_DIR / f"traces-{datetime.now():%Y%m%d-%H%M%S}.jsonl"
+        count = trace_buffer.export(str(path))
+        return {"success": True, "path": str(path), "count": count}
+    except Exception as e:
+        logger.error("Export traces error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"匯出請求追蹤錯誤: {str(e)}"
+        )
+
+
+@router.post("/profile", summary="取樣式效能分析")
+async def profile(
+    seconds: float = Query(10, gt=0, le=PROFILER_MAX_SECONDS, description="分析秒數"),
+    interval_ms: float = Query(DEFAULT_INTERVAL * 1000, ge=1, le=1000, description="取樣間隔 (毫秒)"),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$", description="輸出格式 (collapsed / json)"),
+    include_idle: bool = Query(False, description="包含閒置等待中的執行緒"),
+    include_lines: bool = Query(False, description="堆疊區分行號"),
+    by_thread: bool = Query(True, description="以執行緒名稱作為堆疊根")
+):
+    """
+    對執行中的服務進行取樣式效能分析
+
+    於分析期間以固定間隔取樣所有執行緒 (含 SDK 回調執行緒) 的呼叫堆疊，
+    分析結束後才回應。collapsed 格式可直接交給 flamegraph.pl 或
+    speedscope 產生火焰圖；json 格式回傳取樣統計與最常出現的函式。
+    同一時間只允許一個分析。
+    """
+    profiler = SamplingProfiler(
+        interval=interval_ms / 1000,
+        include_idle=include_idle,
+        include_lines=include_lines,
+        by_thread=by_thread
+    )
+    try:
+        result = await asyncio.to_thread(profiler.run, seconds)
+    except ProfilerBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="已有效能分析進行中"
+        )
+    except Exception as e:
+        logger.error("Profile error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"效能分析錯誤: {str(e)}"
+        )
+
+    logger.info("Profile finished: %s samples in %.1fs", result.samples, result.duration)
+    if format == "json":
+        return {"success": True, "profile": result.summary()}
+    return PlainTextResponse(result.collapsed())
@@ -6,46 +6,125 @@ Market Data Router
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Dict, Any
 import logging
+import os
+import time
+from datetime import datetime
 
 from schemas import (
-    QuoteRequest, HistoricalDataRequest, IntradayDataRequest,
-    SuccessResponse
+    QuoteRequest, HistoricalDataRequest, IntradayDataRequest, TickDataRequest,
+    IndicatorRequest, IndicatorSourceEnum, ReplayRequest, SuccessResponse
 )
-from dependencies import get_authenticated_broker
+from dependencies import get_authenticated_broker, get_broker_executor, get_session
+from executor import BrokerExecutor
+from sessions import BrokerSession
 from src.brokers.fubon.broker import FubonBroker
+from src.brokers.fubon.bar_store import BarStore
+from src.brokers.fubon.bar_builder import normalize_interval
+from src.brokers.fubon import indicators
+from src.brokers.fubon.replay import TickReplayer, open_source
+from tracing import TracedRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+# 多檔股票並行查詢設定
+QUOTE_FANOUT_MAX_IN_FLIGHT = int(os.getenv("QUOTE_FANOUT_MAX_IN_FLIGHT", "8"))
+QUOTE_FANOUT_TIMEOUT = float(os.getenv("QUOTE_FANOUT_TIMEOUT", "5"))
+
+# 歷史 K 線本地儲存目錄 (Mock 與正式環境分開存放)
+HISTORICAL_CACHE_DIR = os.getenv(
+    "HISTORICAL_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'cache', 'bars')
+)
+bar_stores = {
+    True: BarStore(os.path.join(HISTORICAL_CACHE_DIR, 'mock')),
+    False: BarStore(os.path.join(HISTORICAL_CACHE_DIR, 'real'))
+}
+
+# 日線以上的週期 (回傳日期而非時間)
+DAILY_INTERVALS = {'D', '1D', 'W', '1W', 'M', '1M'}
+
+# tick 重播檔案目錄
+REPLAY_DATA_DIR = os.getenv(
+    "REPLAY_DATA_DIR",
+    os.path.join(os.path.dirname(__file__), '..', 'data', 'ticks')
+)
+
+# 技術指標單次請求的最大股票數量
+INDICATOR_MAX_SYMBOLS = int(os.getenv("INDICATOR_MAX_SYMBOLS", "50"))
+
+
+def _validate_date(value):
+    """檢查日期格式 (YYYY-MM-DD)，錯誤時回傳 400"""
+    try:
+        if value:
+            datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"日期格式錯誤: {value}"
+        )
+
+
+async def _fan_out(
+    executor: BrokerExecutor,
+    func,
+    request: QuoteRequest
+) -> List[Dict[str, Any]]:
+    """依請求設定 (不超過伺服器上限) 並行處理多檔股票"""
+    max_in_flight = min(
+        request.max_in_flight or QUOTE_FANOUT_MAX_IN_FLIGHT,
+        QUOTE_FANOUT_MAX_IN_FLIGHT
+    )
+    timeout = min(request.timeout or QUOTE_FANOUT_TIMEOUT, QUOTE_FANOUT_TIMEOUT)
+    # 去除重複代號但保留原始順序
+    stock_codes = list(dict.fromkeys(request.stock_codes))
+    return await executor.map(
+        func, stock_codes, max_in_flight=max_in_flight, timeout=timeout
+    )
 
 
 @router.post("/subscribe", summary="訂閱即時報價")
 async def subscribe_quote(
     request: QuoteRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    session: BrokerSession = Depends(get_session)
 ):
     """
-    訂閱股票即時報價
+    訂閱股票即時報價 (訂閱期間的報價會聚合為盤中 K 線，見 /intraday)
     
     - **stock_codes**: 股票代號列表 (例如: ["2330", "2317"])
     """
     try:
-        results = []
-        for stock_code in request.stock_codes:
-            success = broker.subscribe_quote(stock_code)
-            results.append({
-                "stock_code": stock_code,
-                "success": success
-            })
+        started = time.perf_counter()
+        # 經由報價中樞訂閱，與 WebSocket 連線共用引用計數
+        stock_codes = list(dict.fromkeys(request.stock_codes))
+        max_in_flight = min(
+            request.max_in_flight or QUOTE_FANOUT_MAX_IN_FLIGHT,
+            QUOTE_FANOUT_MAX_IN_FLIGHT
+        )
+        errors = await session.get_quote_hub().hold(stock_codes, max_in_flight)
+        results = [
+            {
+                "stock_code": code,
+                "success": code not in errors,
+                "error": errors.get(code)
+            }
+            for code in stock_codes
+        ]
         
         return {
             "success": True,
             "message": "訂閱請求已處理",
+            "failed": sum(1 for r in results if not r["success"]),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
             "results": results
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Subscribe quote error: {str(e)}")
+        logger.error("Subscribe quote error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"訂閱報價錯誤: {str(e)}"
@@ -55,30 +134,38 @@ async def subscribe_quote(
 @router.post("/unsubscribe", summary="取消訂閱即時報價")
 async def unsubscribe_quote(
     request: QuoteRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    session: BrokerSession = Depends(get_session)
 ):
     """
-    取消訂閱股票即時報價
+    取消訂閱股票即時報價 (仍有 WebSocket 連線訂閱的股票會繼續接收報價)
     
     - **stock_codes**: 股票代號列表
     """
     try:
-        results = []
-        for stock_code in request.stock_codes:
-            success = broker.unsubscribe_quote(stock_code)
-            results.append({
-                "stock_code": stock_code,
-                "success": success
-            })
+        started = time.perf_counter()
+        stock_codes = list(dict.fromkeys(request.stock_codes))
+        released = set(await session.get_quote_hub().release(stock_codes))
+        results = [
+            {
+                "stock_code": code,
+                "success": code in released,
+                "error": None if code in released else "未透過 REST 訂閱此股票"
+            }
+            for code in stock_codes
+        ]
         
         return {
             "success": True,
             "message": "取消訂閱請求已處理",
+            "failed": sum(1 for r in results if not r["success"]),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
             "results": results
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Unsubscribe quote error: {str(e)}")
+        logger.error("Unsubscribe quote error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取消訂閱錯誤: {str(e)}"
@@ -88,28 +175,50 @@ async def unsubscribe_quote(
 @router.post("/quote", summary="查詢即時報價")
 async def get_quote(
     request: QuoteRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_broker_executor)
 ):
     """
     查詢股票即時報價
     
     - **stock_codes**: 股票代號列表
+    - **max_in_flight**: 同時查詢的最大數量 (選填)
+    - **timeout**: 單一股票的逾時秒數 (選填)
+    
+    各股票並行查詢，個別失敗或逾時不影響其他股票，結果列於 results
     """
     try:
+        started = time.perf_counter()
+        outcomes = await _fan_out(executor, broker.get_quote, request)
+        
         quotes = []
-        for stock_code in request.stock_codes:
-            quote = broker.get_quote(stock_code)
+        results = []
+        for o in outcomes:
+            quote = o.get("result")
             if quote:
                 quotes.append(quote)
+            elif o["success"]:
+                o["error"] = "無報價資料"
+            results.append({
+                "stock_code": o["item"],
+                "success": bool(quote),
+                "error": o.get("error"),
+                "elapsed_ms": o["elapsed_ms"]
+            })
         
         return {
             "success": True,
             "count": len(quotes),
-            "quotes": quotes
+            "failed": len(results) - len(quotes),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "quotes": quotes,
+            "results": results
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get quote error: {str(e)}")
+        logger.error("Get quote error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢報價錯誤: {str(e)}"
@@ -119,43 +228,54 @@ async def get_quote(
 @router.post("/historical", summary="查詢歷史行情")
 async def get_historical_data(
     request: HistoricalDataRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
 ):
     """
     查詢歷史行情資料
     
+    資料保存於本地 K 線儲存，只向券商查詢本地缺少的日期區間。
+    
     - **stock_code**: 股票代號
     - **interval**: 時間間隔 (D=日線, 1=1分鐘, 5=5分鐘, 15=15分鐘, 30=30分鐘, 60=60分鐘)
-    - **start_date**: 開始日期 (YYYY-MM-DD)
-    - **end_date**: 結束日期 (YYYY-MM-DD)
+    - **start_date**: 開始日期 (YYYY-MM-DD，未指定時為一年前)
+    - **end_date**: 結束日期 (YYYY-MM-DD，未指定時為今日)
     """
     try:
-        data = broker.get_historical_data(
-            stock_code=request.stock_code,
-            interval=request.interval,
-            start_date=request.start_date,
-            end_date=request.end_date
+        for value in (request.start_date, request.end_date):
+            _validate_date(value)
+        
+        def fetch(start_date: str, end_date: str):
+            return broker.get_historical_data(
+                stock_code=request.stock_code,
+                interval=request.interval,
+                start_date=start_date,
+                end_date=end_date
+            )
+        
+        records, cache_info = await session.executor.run(
+            bar_stores[session.use_mock].get_range,
+            request.stock_code,
+            request.interval,
+            request.start_date,
+            request.end_date,
+            fetch,
+            daily=request.interval.upper() in DAILY_INTERVALS
         )
         
-        if data is not None:
-            # 將 DataFrame 轉換為字典列表
-            records = data.to_dict('records') if hasattr(data, 'to_dict') else data
-            
-            return {
-                "success": True,
-                "stock_code": request.stock_code,
-                "interval": request.interval,
-                "count": len(records),
-                "data": records
-            }
-        else:
-            return {
-                "success": False,
-                "message": "無法取得歷史資料"
-            }
+        return {
+            "success": True,
+            "stock_code": request.stock_code,
+            "interval": request.interval,
+            "count": len(records),
+            "data": records,
+            "cache": cache_info
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get historical data error: {str(e)}")
+        logger.error("Get historical data error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢歷史行情錯誤: {str(e)}"
@@ -165,20 +285,47 @@ async def get_historical_data(
 @router.post("/intraday", summary="查詢盤中即時資料")
 async def get_intraday_data(
     request: IntradayDataRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
 ):
     """
     查詢股票盤中即時資料
     
+    已訂閱報價的股票由即時 tick 聚合的 K 線回應，並回傳 cursor；
+    下次帶入 since=cursor 只會取回新增或更新過的 K 線。
+    尚未訂閱的股票則向券商查詢整日資料。
+    
     - **stock_code**: 股票代號
+    - **interval**: K 線週期 (1m/5m/15m/30m/1h，預設 1m)
+    - **since**: 上次回應的 cursor (選填)
     """
     try:
-        data = broker.get_intraday_data(request.stock_code)
+        builder = session.bar_builder
+        if builder.has_symbol(request.stock_code):
+            try:
+                bars, cursor = builder.bars(request.stock_code, request.interval, request.since)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"不支援的週期: {request.interval}"
+                )
+            return {
+                "success": True,
+                "stock_code": request.stock_code,
+                "source": "live",
+                "interval": request.interval,
+                "cursor": cursor,
+                "count": len(bars),
+                "data": bars
+            }
+        
+        data = await session.executor.run(broker.get_intraday_data, request.stock_code)
         
         if data:
             return {
                 "success": True,
                 "stock_code": request.stock_code,
+                "source": "broker",
                 "data": data
             }
         else:
@@ -187,36 +334,308 @@ async def get_intraday_data(
                 "message": "無法取得盤中資料"
             }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get intraday data error: {str(e)}")
+        logger.error("Get intraday data error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢盤中資料錯誤: {str(e)}"
         )
 
 
+@router.post("/ticks", summary="查詢即時成交明細")
+async def get_ticks(
+    request: TickDataRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    查詢訂閱期間保留的最近成交 (欄式格式)
+    
+    - **stock_code**: 股票代號 (需已訂閱報價)
+    - **limit**: 最近筆數 (選填)
+    """
+    try:
+        if request.stock_code not in session.tick_store:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"尚未收到成交資料，請先訂閱報價: {request.stock_code}"
+            )
+        
+        window = session.tick_store.window(request.stock_code, request.limit)
+        
+        return {
+            "success": True,
+            "stock_code": request.stock_code,
+            "count": len(window["ts"]),
+            "data": {name: values.tolist() for name, values in window.items()}
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Get ticks error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"查詢成交明細錯誤: {str(e)}"
+        )
+
+
+@router.post("/indicators", summary="計算技術指標")
+async def get_indicators(
+    request: IndicatorRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    一次計算多檔股票的多項技術指標
+    
+    每檔股票只讀取一次 K 線並轉為欄式資料，所有指標在同一批資料上計算，
+    各股票並行處理。指標序列與 time 對齊，暖機期間為 null。
+    
+    - **stock_codes**: 股票代號列表
+    - **indicators**: 指標規格 (sma:20, ema:12, rsi:14, macd:12:26:9, bbands:20:2, atr:14, vwap, rolling:20)
+    - **source**: historical (歷史 K 線，經本地儲存) 或 intraday (訂閱報價聚合的盤中 K 線)
+    - **interval**: K 線週期 (歷史預設 D，盤中預設 1m)
+    - **start_date** / **end_date**: 歷史資料日期區間 (YYYY-MM-DD)
+    - **limit**: 只回傳最近筆數 (計算仍使用完整資料以避免暖機誤差)
+    """
+    try:
+        stock_codes = list(dict.fromkeys(request.stock_codes))
+        if len(stock_codes) > INDICATOR_MAX_SYMBOLS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"股票數量超過上限: {len(stock_codes)} > {INDICATOR_MAX_SYMBOLS}"
+            )
+        specs = list(dict.fromkeys(spec.strip().lower() for spec in request.indicators))
+        empty = indicators.columns_from_records([])
+        for spec in specs:
+            try:
+                indicators.compute(spec, empty)
+            except ValueError as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"指標規格錯誤: {str(e)}"
+                )
+        
+        intraday = request.source == IndicatorSourceEnum.INTRADAY
+        if intraday:
+            interval = normalize_interval(request.interval or "1m")
+            if interval not in session.bar_builder.intervals:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"不支援的週期: {interval}"
+                )
+        else:
+            interval = request.interval or "D"
+            _validate_date(request.start_date)
+            _validate_date(request.end_date)
+        daily = interval.upper() in DAILY_INTERVALS
+        bar_store = bar_stores[session.use_mock]
+        
+        def load_bars(code: str):
+            if intraday:
+                if not session.bar_builder.has_symbol(code):
+                    raise ValueError("尚未收到成交資料，請先訂閱報價")
+                return session.bar_builder.bars(code, interval)[0]
+            
+            def fetch(start_date: str, end_date: str):
+                return broker.get_historical_data(
+                    stock_code=code,
+                    interval=interval,
+                    start_date=start_date,
+                    end_date=end_date
+                )
+            
+            return bar_store.get_range(
+                code, interval, request.start_date, request.end_date, fetch, daily=daily
+            )[0]
+        
+        def calculate(code: str) -> Dict[str, Any]:
+            bars = load_bars(code)
+            columns = indicators.columns_from_records(bars)
+            values = {spec: indicators.compute(spec, columns) for spec in specs}
+            start = max(len(bars) - request.limit, 0) if request.limit else 0
+            time_key = "time" if intraday else ("date" if daily else "datetime")
+            return {
+                "count": len(bars) - start,
+                "time": [bar.get(time_key) for bar in bars[start:]],
+                "close": columns["close"][start:].tolist(),
+                "indicators": {
+                    spec: (
+                        {name: series[start:] for name, series in value.items()}
+                        if isinstance(value, dict) else value[start:]
+                    )
+                    for spec, value in values.items()
+                }
+            }
+        
+        started = time.perf_counter()
+        outcomes = await session.executor.map(
+            calculate, stock_codes, max_in_flight=QUOTE_FANOUT_MAX_IN_FLIGHT
+        )
+        
+        data = {}
+        results = []
+        for o in outcomes:
+            if o["success"]:
+                data[o["item"]] = o["result"]
+            results.append({
+                "stock_code": o["item"],
+                "success": o["success"],
+                "error": o.get("error"),
+                "elapsed_ms": o["elapsed_ms"]
+            })
+        
+        return {
+            "success": True,
+            "source": request.source.value,
+            "interval": interval,
+            "indicators": specs,
+            "failed": len(results) - len(data),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "data": data,
+            "results": results
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Get indicators error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"計算技術指標錯誤: {str(e)}"
+        )
+
+
+def _replay_path(name: str) -> str:
+    """解析重播檔案路徑 (限定於重播資料目錄內)"""
+    root = os.path.realpath(REPLAY_DATA_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"檔案路徑無效: {name}"
+        )
+    if not os.path.exists(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"找不到重播檔案: {name}"
+        )
+    return path
+
+
+@router.post("/replay", summary="開始重播 tick 資料")
+async def start_replay(
+    request: ReplayRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    將錄製的 tick 檔依時間合併後送入報價回調 (僅 Mock 模式)
+    
+    已訂閱的股票 (REST /subscribe 或 WebSocket) 會如同即時行情般收到報價，
+    每筆報價帶有 replay_ts，可於 /replay 狀態與 /sessions 統計中查看
+    分派延遲與推送到 WebSocket 客戶端的延遲。
+    
+    - **files**: 重播資料目錄中的 tick 檔或事件錄製目錄名稱
+    - **speed**: 播放倍速 (1=原始速度，0=最快速度)
+    """
+    try:
+        if not session.use_mock:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="僅 Mock 模式可重播 tick 資料"
+            )
+        if session.replayer is not None and session.replayer.running:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="重播進行中，請先停止"
+            )
+        paths = [_replay_path(name) for name in request.files]
+        
+        session.replayer = TickReplayer(
+            broker._dispatch_quote,
+            [open_source(path) for path in paths],
+            speed=request.speed
+        )
+        session.replayer.start()
+        logger.info("Tick replay started: %s x%s", request.files, request.speed)
+        
+        return {
+            "success": True,
+            "message": "重播已開始",
+            "files": request.files,
+            "speed": request.speed
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Start replay error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"開始重播錯誤: {str(e)}"
+        )
+
+
+@router.get("/replay", summary="查詢 tick 重播狀態")
+async def get_replay_status(
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    查詢重播進度與延遲統計
+    """
+    if session.replayer is None:
+        return {"success": True, "replay": None}
+    hub = session.quote_hub
+    return {
+        "success": True,
+        "replay": session.replayer.stats(),
+        "client_latency": hub.replay_latency.summary() if hub else None
+    }
+
+
+@router.post("/replay/stop", summary="停止 tick 重播")
+async def stop_replay(
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    停止進行中的重播
+    """
+    if session.replayer is None:
+        return {"success": False, "message": "沒有進行中的重播"}
+    await session.executor.run(session.replayer.stop, 5)
+    return {
+        "success": True,
+        "message": "重播已停止",
+        "replay": session.replayer.stats()
+    }
+
+
 @router.post("/quote/callback", summary="設定報價回調")
 async def set_quote_callback(
     stock_code: str,
     broker: FubonBroker = Depends(get_authenticated_broker)
 ):
     """
-    設定報價更新回調函數 (需要配合 WebSocket 使用)
+    設定報價更新回調函數
+
+    即時報價改由 WebSocket `/ws/quotes` 推送，此端點回傳連線方式供舊客戶端參考
     
     - **stock_code**: 股票代號
     """
     try:
-        # 這裡可以實作 WebSocket 推送邏輯
-        # 目前僅返回成功訊息
-        
         return {
             "success": True,
-            "message": f"已設定 {stock_code} 的報價回調",
-            "stock_code": stock_code
+            "message": f"請透過 WebSocket 訂閱 {stock_code} 的即時報價",
+            "stock_code": stock_code,
+            "websocket": f"/ws/quotes?symbols={stock_code}"
         }
     
     except Exception as e:
-        logger.error(f"Set quote callback error: {str(e)}")
+        logger.error("Set quote callback error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"設定回調錯誤: {str(e)}"
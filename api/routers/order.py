@@ -3,26 +3,74 @@ Order Router
 交易下單相關 API 端點
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from typing import List, Dict, Any, Optional
 import logging
+import os
+import time
 
 from schemas import (
-    PlaceOrderRequest, CancelOrderRequest, ModifyOrderRequest,
-    QueryOrdersRequest, SuccessResponse
+    PlaceOrderRequest, BatchPlaceOrderRequest, CancelOrderRequest,
+    BatchCancelOrderRequest, CancelAllOrdersRequest, ModifyOrderRequest,
+    QueryOrdersRequest, OrderStatusEnum, PriceTypeEnum, SuccessResponse
 )
-from dependencies import get_authenticated_broker
+from dependencies import (
+    get_authenticated_broker, get_order_executor, get_account_cache, get_session
+)
+from executor import BrokerExecutor
+from sessions import BrokerSession
 from src.brokers.fubon.broker import FubonBroker
+from src.brokers.fubon.account_cache import AccountCache
+from src.brokers.fubon.constants import OrderStatus
+from tracing import TracedRoute
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TracedRoute)
+
+# 單一批次最多的委託筆數
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", "100"))
+# 批次委託同時送出的最大筆數
+ORDER_BATCH_MAX_IN_FLIGHT = int(os.getenv("ORDER_BATCH_MAX_IN_FLIGHT", "4"))
+
+# 可取消的委託狀態 (全部取消未指定狀態時使用)
+CANCELLABLE_STATUSES = (OrderStatus.PENDING, OrderStatus.SUBMITTED, OrderStatus.PARTIALLY_FILLED)
+
+
+def _order_kwargs(request: PlaceOrderRequest) -> Dict[str, Any]:
+    """將下單請求轉為 broker.place_order 參數"""
+    return {
+        "stock_code": request.stock_code,
+        "action": request.action.value,
+        "price": request.price,
+        "quantity": request.quantity,
+        "price_type": request.price_type.value,
+        "order_type": request.order_type.value,
+        "order_condition": request.order_condition.value
+    }
+
+
+def _validate_order(request: PlaceOrderRequest) -> Optional[str]:
+    """
+    檢查 schema 無法表達的委託規則
+
+    Args:
+        request: 下單請求
+
+    Returns:
+        str: 錯誤訊息，通過時回傳 None
+    """
+    if request.price_type == PriceTypeEnum.LIMIT and not request.price:
+        return "限價單必須指定價格"
+    return None
 
 
 @router.post("/place", summary="下單")
 async def place_order(
     request: PlaceOrderRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_order_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     下單交易
@@ -38,15 +86,11 @@ async def place_order(
     ⚠️ **風險提醒**: 此為實際下單，請謹慎操作！
     """
     try:
-        result = broker.place_order(
-            stock_code=request.stock_code,
-            action=request.action.value,
-            price=request.price,
-            quantity=request.quantity,
-            price_type=request.price_type.value,
-            order_type=request.order_type.value,
-            order_condition=request.order_condition.value
-        )
+        try:
+            result = await executor.run(broker.place_order, **_order_kwargs(request))
+        finally:
+            # 委託可能已異動資金與部位，使帳戶快取失效
+            cache.invalidate()
         
         if result and result.get('success'):
             return {
@@ -68,17 +112,116 @@ async def place_order(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Place order error: {str(e)}")
+        logger.error("Place order error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"下單錯誤: {str(e)}"
         )
 
 
+@router.post("/batch", summary="批次下單")
+async def place_batch_orders(
+    request: BatchPlaceOrderRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    批次下單 (例如一籃子調整)
+    
+    所有委託先統一驗證，再依速率限制並行送出，回傳逐筆結果。
+    已送出的委託不設逾時，以免結果未知時重複下單。
+    
+    - **orders**: 委託列表，欄位同 /order/place
+    - **all_or_nothing**: 任一筆驗證失敗時全部不送出 (預設 false，僅略過失敗者)
+    - **max_in_flight**: 同時送出的最大筆數 (選填)
+    
+    ⚠️ **風險提醒**: 此為實際下單，請謹慎操作！
+    """
+    try:
+        started = time.perf_counter()
+        if len(request.orders) > ORDER_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"單一批次最多 {ORDER_BATCH_MAX_SIZE} 筆委託"
+            )
+        
+        errors = {i: _validate_order(order) for i, order in enumerate(request.orders)}
+        errors = {i: error for i, error in errors.items() if error}
+        if errors and request.all_or_nothing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "message": "批次委託驗證失敗，未送出任何委託",
+                    "errors": [{"index": i, "error": error} for i, error in errors.items()]
+                }
+            )
+        validated = time.perf_counter()
+        
+        valid = [i for i in range(len(request.orders)) if i not in errors]
+        max_in_flight = min(
+            request.max_in_flight or ORDER_BATCH_MAX_IN_FLIGHT,
+            ORDER_BATCH_MAX_IN_FLIGHT
+        )
+        try:
+            outcomes = await session.order_executor.map(
+                lambda i: broker.place_order(**_order_kwargs(request.orders[i])),
+                valid,
+                max_in_flight=max_in_flight
+            )
+        finally:
+            if valid:
+                session.account_cache.invalidate()
+        submitted = time.perf_counter()
+        
+        results: List[Dict[str, Any]] = [None] * len(request.orders)
+        for i, error in errors.items():
+            results[i] = {"index": i, "success": False, "submitted": False, "error": error}
+        for outcome in outcomes:
+            i = outcome["item"]
+            result = outcome.get("result") or {}
+            ok = bool(outcome["success"] and result.get("success"))
+            results[i] = {
+                "index": i,
+                "success": ok,
+                "submitted": True,
+                "order_id": result.get("order_id"),
+                "error": None if ok else (outcome.get("error") or result.get("message", "下單失敗")),
+                "elapsed_ms": outcome["elapsed_ms"]
+            }
+        for i, order in enumerate(request.orders):
+            results[i].update(stock_code=order.stock_code, action=order.action.value)
+        
+        failed = sum(1 for r in results if not r["success"])
+        return {
+            "success": failed == 0,
+            "message": "批次下單完成" if failed == 0 else f"批次下單完成，{failed} 筆失敗",
+            "total": len(results),
+            "submitted": len(valid),
+            "failed": failed,
+            "results": results,
+            "timing": {
+                "validation_ms": round((validated - started) * 1000, 2),
+                "submit_ms": round((submitted - validated) * 1000, 2),
+                "total_ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Batch place order error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批次下單錯誤: {str(e)}"
+        )
+
+
 @router.post("/cancel", summary="取消委託")
 async def cancel_order(
     request: CancelOrderRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_order_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     取消委託
@@ -86,7 +229,10 @@ async def cancel_order(
     - **order_id**: 委託編號
     """
     try:
-        result = broker.cancel_order(request.order_id)
+        try:
+            result = await executor.run(broker.cancel_order, request.order_id)
+        finally:
+            cache.invalidate()
         
         if result and result.get('success'):
             return {
@@ -104,17 +250,154 @@ async def cancel_order(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Cancel order error: {str(e)}")
+        logger.error("Cancel order error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"取消委託錯誤: {str(e)}"
         )
 
 
+async def _cancel_many(
+    broker: FubonBroker,
+    session: BrokerSession,
+    order_ids: List[str],
+    max_in_flight: Optional[int]
+) -> Dict[str, Any]:
+    """
+    依速率限制並行取消多筆委託
+
+    Args:
+        broker: broker 實例
+        session: 會話 (提供委託執行器與帳戶快取)
+        order_ids: 委託編號列表
+        max_in_flight: 同時送出的最大筆數
+
+    Returns:
+        Dict: 逐筆結果與耗時
+    """
+    started = time.perf_counter()
+    limit = min(max_in_flight or ORDER_BATCH_MAX_IN_FLIGHT, ORDER_BATCH_MAX_IN_FLIGHT)
+    try:
+        outcomes = await session.order_executor.map(
+            broker.cancel_order,
+            order_ids,
+            max_in_flight=limit
+        )
+    finally:
+        if order_ids:
+            session.account_cache.invalidate()
+    
+    results = []
+    for outcome in outcomes:
+        result = outcome.get("result") or {}
+        ok = bool(outcome["success"] and result.get("success"))
+        results.append({
+            "order_id": outcome["item"],
+            "success": ok,
+            "error": None if ok else (outcome.get("error") or result.get("message", "取消委託失敗")),
+            "elapsed_ms": outcome["elapsed_ms"]
+        })
+    
+    failed = sum(1 for r in results if not r["success"])
+    return {
+        "success": failed == 0,
+        "message": "批次取消完成" if failed == 0 else f"批次取消完成，{failed} 筆失敗",
+        "total": len(results),
+        "cancelled": len(results) - failed,
+        "failed": failed,
+        "results": results,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+@router.post("/cancel-batch", summary="批次取消委託")
+async def cancel_batch_orders(
+    request: BatchCancelOrderRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    批次取消委託
+    
+    - **order_ids**: 委託編號列表
+    - **max_in_flight**: 同時送出的最大筆數 (選填)
+    """
+    try:
+        order_ids = list(dict.fromkeys(request.order_ids))
+        if len(order_ids) > ORDER_BATCH_MAX_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"單一批次最多 {ORDER_BATCH_MAX_SIZE} 筆委託"
+            )
+        return await _cancel_many(broker, session, order_ids, request.max_in_flight)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Batch cancel order error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"批次取消委託錯誤: {str(e)}"
+        )
+
+
+@router.post("/cancel-all", summary="全部取消委託")
+async def cancel_all_orders(
+    request: CancelAllOrdersRequest,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
+):
+    """
+    取消所有符合條件的委託
+    
+    先以單次 get_orders 與委託索引對帳，再由索引篩選出目標委託並行取消。
+    
+    - **stock_code**: 股票代號 (選填)
+    - **action**: 買賣動作 (選填)
+    - **status**: 委託狀態 (選填，預設為所有未完成委託)
+    - **dry_run**: 只回傳將被取消的委託，不實際送出
+    - **max_in_flight**: 同時送出的最大筆數 (選填)
+    
+    ⚠️ **風險提醒**: 將實際取消委託，請謹慎操作！
+    """
+    try:
+        store = session.order_store
+        await session.executor.run(store.sync, broker.get_orders)
+        
+        statuses = [request.status.value] if request.status else CANCELLABLE_STATUSES
+        targets = [
+            order
+            for order_status in statuses
+            for order in store.query(status=order_status, symbol=request.stock_code)
+            if request.action is None or order.get('action') == request.action.value
+        ]
+        order_ids = [str(order['order_id']) for order in targets]
+        
+        if request.dry_run:
+            return {
+                "success": True,
+                "message": "預覽模式，未送出取消",
+                "total": len(order_ids),
+                "orders": targets
+            }
+        return await _cancel_many(broker, session, order_ids, request.max_in_flight)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Cancel all orders error: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"全部取消委託錯誤: {str(e)}"
+        )
+
+
 @router.post("/modify", summary="修改委託")
 async def modify_order(
     request: ModifyOrderRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    executor: BrokerExecutor = Depends(get_order_executor),
+    cache: AccountCache = Depends(get_account_cache)
 ):
     """
     修改委託
@@ -124,11 +407,15 @@ async def modify_order(
     - **quantity**: 新數量 (選填)
     """
     try:
-        result = broker.modify_order(
-            order_id=request.order_id,
-            price=request.price,
-            quantity=request.quantity
-        )
+        try:
+            result = await executor.run(
+                broker.modify_order,
+                order_id=request.order_id,
+                price=request.price,
+                quantity=request.quantity
+            )
+        finally:
+            cache.invalidate()
         
         if result and result.get('success'):
             return {
@@ -146,7 +433,7 @@ async def modify_order(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Modify order error: {str(e)}")
+        logger.error("Modify order error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"修改委託錯誤: {str(e)}"
@@ -156,10 +443,11 @@ async def modify_order(
 @router.post("/query", summary="查詢委託")
 async def query_orders(
     request: QueryOrdersRequest,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
 ):
     """
-    查詢委託列表
+    查詢委託列表 (由會話的委託索引篩選，不需每次向券商查詢)
     
     - **status**: 委託狀態篩選 (選填)
     - **stock_code**: 股票代號篩選 (選填)
@@ -167,29 +455,22 @@ async def query_orders(
     - **end_date**: 結束日期 (選填)
     """
     try:
-        orders = broker.get_orders(
+        store = await session.synced_order_store()
+        orders_list = store.query(
             status=request.status.value if request.status else None,
-            stock_code=request.stock_code
+            symbol=request.stock_code
         )
         
-        if orders is not None:
-            # 轉換為列表格式
-            orders_list = orders.to_dict('records') if hasattr(orders, 'to_dict') else orders
-            
-            return {
-                "success": True,
-                "count": len(orders_list),
-                "orders": orders_list
-            }
-        else:
-            return {
-                "success": True,
-                "count": 0,
-                "orders": []
-            }
+        return {
+            "success": True,
+            "count": len(orders_list),
+            "orders": orders_list
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Query orders error: {str(e)}")
+        logger.error("Query orders error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢委託錯誤: {str(e)}"
@@ -199,7 +480,8 @@ async def query_orders(
 @router.get("/detail/{order_id}", summary="查詢單筆委託")
 async def get_order_detail(
     order_id: str,
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
 ):
     """
     查詢單筆委託詳細資訊
@@ -207,7 +489,13 @@ async def get_order_detail(
     - **order_id**: 委託編號
     """
     try:
-        order = broker.get_order(order_id)
+        store = await session.synced_order_store()
+        order = store.get(order_id)
+        if order is None:
+            # 索引中沒有 (例如由其他管道下的單)，向券商查詢並補入索引
+            order = await session.executor.run(broker.get_order, order_id)
+            if order:
+                store.apply_event(order)
         
         if order:
             return {
@@ -223,7 +511,7 @@ async def get_order_detail(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Get order detail error: {str(e)}")
+        logger.error("Get order detail error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢委託詳情錯誤: {str(e)}"
@@ -232,31 +520,34 @@ async def get_order_detail(
 
 @router.get("/today", summary="查詢當日委託")
 async def get_today_orders(
-    broker: FubonBroker = Depends(get_authenticated_broker)
+    status_filter: Optional[OrderStatusEnum] = Query(None, alias="status", description="委託狀態篩選"),
+    stock_code: Optional[str] = None,
+    broker: FubonBroker = Depends(get_authenticated_broker),
+    session: BrokerSession = Depends(get_session)
 ):
     """
-    查詢當日所有委託
+    查詢當日委託
+    
+    - **status**: 委託狀態篩選 (選填)
+    - **stock_code**: 股票代號篩選 (選填)
     """
     try:
-        orders = broker.get_orders()
+        store = await session.synced_order_store()
+        orders_list = store.query(
+            status=status_filter.value if status_filter else None,
+            symbol=stock_code
+        )
         
-        if orders is not None:
-            orders_list = orders.to_dict('records') if hasattr(orders, 'to_dict') else orders
-            
-            return {
-                "success": True,
-                "count": len(orders_list),
-                "orders": orders_list
-            }
-        else:
-            return {
-                "success": True,
-                "count": 0,
-                "orders": []
-            }
+        return {
+            "success": True,
+            "count": len(orders_list),
+            "orders": orders_list
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Get today orders error: {str(e)}")
+        logger.error("Get today orders error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"查詢當日委託錯誤: {str(e)}"
@@ -0,0 +1,206 @@
+"""
+Streaming Router
+即時推播 (WebSocket) 端點
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from dependencies import session_registry
+from quote_hub import QuoteSubscriber
+from sessions import BrokerSession
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# WebSocket 自訂關閉代碼
+WS_CLOSE_UNAUTHORIZED = 4401
+WS_CLOSE_LAGGING = 4409
+
+
+def _find_logged_in_session(session_id: str, use_mock: Optional[bool]) -> Optional[BrokerSession]:
+    """僅回傳既有且已登入的會話，不為推播連線建立新會話"""
+    for session in session_registry.find(session_id, use_mock):
+        if session.broker.is_logged_in:
+            return session
+    return None
+
+
+def _parse_symbols(value) -> list:
+    """將逗號分隔字串或列表轉為去重後的股票代號列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return list(dict.fromkeys(str(v).strip() for v in value if str(v).strip()))
+
+
+@router.websocket("/ws/quotes")
+async def quote_stream(
+    websocket: WebSocket,
+    session_id: str = "default",
+    use_mock: Optional[bool] = None,
+    symbols: Optional[str] = None
+):
+    """
+    即時報價推播
+
+    連線參數:
+    - **session_id**: 會話 ID
+    - **use_mock**: 是否使用 Mock 模式 (選填)
+    - **symbols**: 連線後立即訂閱的股票代號，逗號分隔 (選填)
+
+    客戶端訊息:
+    - `{"action": "subscribe", "symbols": ["2330"]}`
+    - `{"action": "unsubscribe", "symbols": ["2330"]}`
+
+    伺服器訊息:
+    - `{"type": "subscribed", "symbols": [...], "errors": {...}}`
+    - `{"type": "quotes", "data": [{"symbol": "2330", "quote": {...}}]}`
+      (同一檔股票只推送最新報價)
+    """
+    await websocket.accept()
+
+    session = _find_logged_in_session(session_id, use_mock)
+    if session is None:
+        await websocket.close(code=WS_CLOSE_UNAUTHORIZED, reason="Not logged in")
+        return
+
+    hub = session.get_quote_hub()
+    subscriber = QuoteSubscriber()
+
+    async def handle_subscription(action: str, requested: list) -> None:
+        if action == "subscribe":
+            errors = await hub.subscribe(subscriber, requested)
+        else:
+            await hub.unsubscribe(subscriber, requested)
+            errors = {}
+        await websocket.send_json({
+            "type": "subscribed",
+            "symbols": sorted(subscriber.symbols),
+            "errors": errors
+        })
+
+    async def receive_loop() -> None:
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action")
+            if action not in ("subscribe", "unsubscribe"):
+                await websocket.send_json({
+                    "type": "error",
+                    "error": f"Unknown action: {action}"
+                })
+                continue
+            await handle_subscription(action, _parse_symbols(message.get("symbols")))
+
+    async def send_loop() -> None:
+        while True:
+            batch = await subscriber.next_batch()
+            session.touch()
+            await websocket.send_json({"type": "quotes", "data": batch})
+            hub.record_delivery(batch)
+
+    tasks = []
+    try:
+        initial = _parse_symbols(symbols)
+        if initial:
+            await handle_subscription("subscribe", initial)
+
+        tasks = [
+            asyncio.create_task(receive_loop()),
+            asyncio.create_task(send_loop())
+        ]
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("Quote stream error: %s", e)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await hub.disconnect(subscriber)
+
+
+@router.websocket("/ws/orders")
+async def order_stream(
+    websocket: WebSocket,
+    session_id: str = "default",
+    use_mock: Optional[bool] = None,
+    since: Optional[int] = None
+):
+    """
+    委託/成交事件推播
+
+    連線參數:
+    - **session_id**: 會話 ID
+    - **use_mock**: 是否使用 Mock 模式 (選填)
+    - **since**: 最後收到的事件序號，重連時由此續傳 (選填)
+
+    伺服器訊息:
+    - `{"type": "hello", "seq": 目前序號, "reset": 是否需重新載入委託列表}`
+    - `{"type": "order", "seq": 序號, "timestamp": ..., "data": {...}}`
+    - `{"type": "lagging", "seq": 最後送出序號}` 後關閉連線 (代碼 4409)，
+      客戶端應以 since 重新連線
+    """
+    await websocket.accept()
+
+    session = _find_logged_in_session(session_id, use_mock)
+    if session is None:
+        await websocket.close(code=WS_CLOSE_UNAUTHORIZED, reason="Not logged in")
+        return
+
+    hub = session.get_order_hub()
+    subscriber, replay, reset = hub.subscribe(since)
+    last_sent = since or 0
+
+    try:
+        await websocket.send_json({"type": "hello", "seq": hub.sequence, "reset": reset})
+        for event in replay:
+            await websocket.send_json(event)
+            last_sent = event["seq"]
+
+        async def receive_loop() -> None:
+            # 客戶端不需傳送訊息，僅用於偵測斷線
+            while True:
+                await websocket.receive_text()
+
+        async def send_loop() -> None:
+            nonlocal last_sent
+            while True:
+                event = await subscriber.queue.get()
+                if event["type"] == "lagging":
+                    await websocket.send_json({"type": "lagging", "seq": last_sent})
+                    await websocket.close(code=WS_CLOSE_LAGGING, reason="Client lagging")
+                    return
+                # 續傳與即時事件可能重疊，略過已送出的序號
+                if event["seq"] <= last_sent:
+                    continue
+                session.touch()
+                await websocket.send_json(event)
+                last_sent = event["seq"]
+
+        tasks = [
+            asyncio.create_task(receive_loop()),
+            asyncio.create_task(send_loop())
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error("Order stream error: %s", e)
+    finally:
+        hub.unsubscribe(subscriber)
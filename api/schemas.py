@@ -34,6 +34,8 @@ class LoginResponse(BaseModel):
 class QuoteRequest(BaseModel):
     """即時報價請求"""
     stock_codes: List[str] = Field(..., description="股票代號列表")
+    max_in_flight: Optional[int] = Field(None, description="同時查詢的最大數量 (不超過伺服器上限)", gt=0)
+    timeout: Optional[float] = Field(None, description="單一股票的逾時秒數", gt=0)
 
 
 class HistoricalDataRequest(BaseModel):
@@ -47,6 +49,40 @@ class HistoricalDataRequest(BaseModel):
 class IntradayDataRequest(BaseModel):
     """盤中資料請求"""
     stock_code: str = Field(..., description="股票代號")
+    interval: str = Field("1m", description="K 線週期 (1m/5m/15m/30m/1h)")
+    since: Optional[int] = Field(None, description="上次回應的 cursor，只取回之後新增或更新的 K 線", ge=0)
+
+
+class TickDataRequest(BaseModel):
+    """tick 資料請求"""
+    stock_code: str = Field(..., description="股票代號")
+    limit: Optional[int] = Field(None, description="最近筆數 (預設全部保留的 tick)", gt=0)
+
+
+class IndicatorSourceEnum(str, Enum):
+    """指標資料來源"""
+    HISTORICAL = "historical"  # 歷史 K 線
+    INTRADAY = "intraday"  # 盤中即時 K 線
+
+
+class IndicatorRequest(BaseModel):
+    """技術指標請求"""
+    stock_codes: List[str] = Field(..., description="股票代號列表", min_length=1)
+    indicators: List[str] = Field(
+        ..., description="指標規格列表 (例如: sma:20, ema:12, rsi:14, macd:12:26:9, bbands:20:2, atr:14, vwap, rolling:20)",
+        min_length=1
+    )
+    source: IndicatorSourceEnum = Field(IndicatorSourceEnum.HISTORICAL, description="資料來源")
+    interval: Optional[str] = Field(None, description="K 線週期 (歷史預設 D，盤中預設 1m)")
+    start_date: Optional[str] = Field(None, description="開始日期 (YYYY-MM-DD，僅歷史資料)")
+    end_date: Optional[str] = Field(None, description="結束日期 (YYYY-MM-DD，僅歷史資料)")
+    limit: Optional[int] = Field(None, description="只回傳最近筆數 (計算仍使用完整資料)", gt=0)
+
+
+class ReplayRequest(BaseModel):
+    """tick 重播請求"""
+    files: List[str] = Field(..., description="tick 檔 (CSV 或 JSON Lines) 或事件錄製目錄名稱 (位於重播資料目錄)", min_length=1)
+    speed: float = Field(1.0, description="播放倍速 (1=原始速度，0=最快速度)", ge=0)
 
 
 # ==================== 交易下單相關 ====================
@@ -95,11 +131,24 @@ class PlaceOrderRequest(BaseModel):
         return v
 
 
+class BatchPlaceOrderRequest(BaseModel):
+    """批次下單請求"""
+    orders: List[PlaceOrderRequest] = Field(..., description="委託列表", min_length=1)
+    all_or_nothing: bool = Field(False, description="任一筆驗證失敗時全部不送出")
+    max_in_flight: Optional[int] = Field(None, description="同時送出的最大筆數 (不超過伺服器上限)", gt=0)
+
+
 class CancelOrderRequest(BaseModel):
     """取消委託請求"""
     order_id: str = Field(..., description="委託編號")
 
 
+class BatchCancelOrderRequest(BaseModel):
+    """批次取消委託請求"""
+    order_ids: List[str] = Field(..., description="委託編號列表", min_length=1)
+    max_in_flight: Optional[int] = Field(None, description="同時送出的最大筆數 (不超過伺服器上限)", gt=0)
+
+
 class ModifyOrderRequest(BaseModel):
     """修改委託請求"""
     order_id: str = Field(..., description="委託編號")
@@ -117,6 +166,15 @@ class OrderStatusEnum(str, Enum):
     REJECTED = "rejected"
 
 
+class CancelAllOrdersRequest(BaseModel):
+    """全部取消委託請求 (篩選條件皆為選填)"""
+    stock_code: Optional[str] = Field(None, description="股票代號")
+    action: Optional[ActionEnum] = Field(None, description="買賣動作")
+    status: Optional[OrderStatusEnum] = Field(None, description="委託狀態 (預設為所有未完成委託)")
+    dry_run: bool = Field(False, description="只回傳將被取消的委託，不實際送出")
+    max_in_flight: Optional[int] = Field(None, description="同時送出的最大筆數 (不超過伺服器上限)", gt=0)
+
+
 class QueryOrdersRequest(BaseModel):
     """查詢委託請求"""
     status: Optional[OrderStatusEnum] = Field(None, description="委託狀態")
@@ -0,0 +1,410 @@
+"""
+Broker Session Registry
+券商會話管理
+
+管理每個使用者會話的 broker 實例及其附屬資源 (執行器、帳戶快取)。
+會話數量有上限，超過時淘汰最久未使用者；閒置過久的會話也會被回收，
+回收時會登出並釋放 SDK 連線，避免長時間運行的伺服器記憶體無限成長。
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from executor import BrokerExecutor
+from quote_hub import QuoteHub
+from order_events import OrderEventHub
+from src.brokers.fubon.account_cache import AccountCache, DEFAULT_TTLS, DEFAULT_STALE_WINDOW
+from src.brokers.fubon.order_store import OrderStore
+from src.brokers.fubon.bar_builder import BarBuilder
+from src.brokers.fubon.tick_store import TickStore
+from src.brokers.fubon.replay import TickReplayer
+
+logger = logging.getLogger(__name__)
+
+# 最大會話數量
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "100"))
+# 閒置逾時秒數
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+# 閒置檢查間隔秒數
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+# 帳戶查詢快取設定: ACCOUNT_CACHE_TTL_<RESOURCE> (秒)
+ACCOUNT_CACHE_TTLS = {
+    resource: float(os.getenv(f"ACCOUNT_CACHE_TTL_{resource.upper()}", ttl))
+    for resource, ttl in DEFAULT_TTLS.items()
+}
+ACCOUNT_CACHE_STALE_WINDOW = float(
+    os.getenv("ACCOUNT_CACHE_STALE_WINDOW", DEFAULT_STALE_WINDOW)
+)
+# 委託索引與券商端對帳的間隔秒數
+ORDER_STORE_SYNC_INTERVAL = float(os.getenv("ORDER_STORE_SYNC_INTERVAL", "60"))
+# 委託專用執行緒數量 (下單/刪單/改單不與查詢共用執行緒)
+ORDER_EXECUTOR_WORKERS = int(os.getenv("ORDER_EXECUTOR_WORKERS", "4"))
+# 每個會話由即時報價聚合盤中 K 線的最大股票數量
+INTRADAY_MAX_SYMBOLS = int(os.getenv("INTRADAY_MAX_SYMBOLS", "2000"))
+# 每個會話每檔股票保留的 tick 數量與最多追蹤的股票數量
+TICK_STORE_CAPACITY = int(os.getenv("TICK_STORE_CAPACITY", "1024"))
+TICK_STORE_MAX_SYMBOLS = int(os.getenv("TICK_STORE_MAX_SYMBOLS", "500"))
+
+
+def make_session_key(session_id: str, use_mock: bool) -> str:
+    """產生帶模式標記的 session key"""
+    return f"{session_id}_{'mock' if use_mock else 'real'}"
+
+
+def session_ref(key: str) -> str:
+    """
+    產生不可逆推的會話識別碼 (供統計與執行緒命名使用)
+
+    session_id 即為存取會話的憑證，對外輸出時只使用雜湊值。
+
+    Args:
+        key: session key
+
+    Returns:
+        str: 12 字元的十六進位雜湊
+    """
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:12]
+
+
+def _approx_size(obj: Any, depth: int = 3, seen: Optional[set] = None) -> int:
+    """粗估物件佔用的記憶體 (限制遞迴深度，僅供統計參考)"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj, 0)
+    if depth <= 0:
+        return size
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += _approx_size(key, depth - 1, seen)
+            size += _approx_size(value, depth - 1, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += _approx_size(item, depth - 1, seen)
+    elif hasattr(obj, '__dict__'):
+        size += _approx_size(vars(obj), depth - 1, seen)
+    return size
+
+
+class BrokerSession:
+    """單一會話的 broker 及其附屬資源"""
+
+    def __init__(self, session_id: str, use_mock: bool, broker: Any):
+        self.session_id = session_id
+        self.use_mock = use_mock
+        self.key = make_session_key(session_id, use_mock)
+        self.ref = session_ref(self.key)
+        self.broker = broker
+        self.executor = BrokerExecutor(self.ref)
+        # SDK 額度不足時呼叫會在工作執行緒中等待，委託另用一組執行緒，
+        # 避免排隊中的查詢佔滿執行緒而延後下單
+        self.order_executor = BrokerExecutor(f"{self.ref}-order", max_workers=ORDER_EXECUTOR_WORKERS)
+        self.account_cache = AccountCache(
+            broker,
+            ttls=ACCOUNT_CACHE_TTLS,
+            stale_window=ACCOUNT_CACHE_STALE_WINDOW
+        )
+        self.order_store = OrderStore()
+        self.broker.set_order_callback(self.order_store.apply_event)
+        self.bar_builder = BarBuilder(max_symbols=INTRADAY_MAX_SYMBOLS)
+        self.tick_store = TickStore(TICK_STORE_CAPACITY, TICK_STORE_MAX_SYMBOLS)
+        self.quote_hub: Optional[QuoteHub] = None
+        self.order_hub: Optional[OrderEventHub] = None
+        self.replayer: Optional[TickReplayer] = None
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+
+    def get_quote_hub(self) -> QuoteHub:
+        """取得報價推播中樞 (需於 event loop 中呼叫)"""
+        if self.quote_hub is None:
+            self.quote_hub = QuoteHub(self.broker, self.executor, asyncio.get_running_loop())
+            self.quote_hub.add_listener(self.on_quote)
+        return self.quote_hub
+
+    def get_order_hub(self) -> OrderEventHub:
+        """取得委託事件推播中樞 (需於 event loop 中呼叫)"""
+        if self.order_hub is None:
+            self.order_hub = OrderEventHub(self.broker, asyncio.get_running_loop())
+        return self.order_hub
+
+    def on_quote(self, symbol: str, quote: Any) -> None:
+        """
+        即時報價回調 (於 SDK 執行緒呼叫)，更新盤中 K 線與 tick 儲存
+
+        Args:
+            symbol: 股票代號
+            quote: 報價
+        """
+        self.bar_builder.on_quote(symbol, quote)
+        self.tick_store.on_quote(symbol, quote)
+
+    async def synced_order_store(self) -> OrderStore:
+        """
+        取得委託索引；尚未載入或超過對帳間隔時先以 get_orders 對帳
+
+        Returns:
+            OrderStore: 該會話的委託索引
+        """
+        if self.order_store.needs_sync(ORDER_STORE_SYNC_INTERVAL):
+            await self.executor.run(self.order_store.sync, self.broker.get_orders)
+        return self.order_store
+
+    def touch(self) -> None:
+        """更新最後使用時間"""
+        self.last_used = time.monotonic()
+
+    @property
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_used
+
+    @property
+    def has_active_streams(self) -> bool:
+        """是否仍有 WebSocket 連線在接收推播"""
+        hubs = (self.quote_hub, self.order_hub)
+        return any(hub is not None and hub.stats()["clients"] > 0 for hub in hubs)
+
+    def close(self) -> None:
+        """登出並釋放 SDK 連線與執行緒池"""
+        if self.replayer is not None:
+            self.replayer.stop(timeout=1)
+        try:
+            if self.broker.is_logged_in:
+                self.broker.logout()
+        except Exception as e:
+            logger.error("Logout during session close failed (%s): %s", self.key, e)
+        if self.order_hub is not None:
+            self.order_hub.close()
+        remove = getattr(self.broker, 'remove_order_callback', None)
+        if remove:
+            remove(self.order_store.apply_event)
+        self.account_cache.invalidate()
+        self.executor.shutdown(wait=False)
+        self.order_executor.shutdown(wait=False)
+        logger.info("Session %s closed", self.key)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得會話統計資訊"""
+        scheduler = getattr(self.broker, 'scheduler', None)
+        return {
+            "ref": self.ref,
+            "logged_in": bool(self.broker.is_logged_in),
+            "idle_seconds": round(self.idle_seconds, 1),
+            "created_at": self.created_at,
+            "memory_bytes": _approx_size(self.broker) + _approx_size(self.account_cache),
+            "executor": self.executor.stats(),
+            "order_executor": self.order_executor.stats(),
+            "order_store": self.order_store.stats(),
+            "bar_builder": self.bar_builder.stats(),
+            "tick_store": self.tick_store.stats(),
+            "sdk_scheduler": scheduler.stats() if scheduler else None,
+            "quote_hub": self.quote_hub.stats() if self.quote_hub else None,
+            "order_hub": self.order_hub.stats() if self.order_hub else None,
+            "replay": self.replayer.stats() if self.replayer else None
+        }
+
+
+class SessionRegistry:
+    """
+    有容量上限的會話註冊表
+
+    以 LRU 順序保存會話；新增會話超過上限時優先淘汰最久未使用的未登入
+    會話，其次才是已登入者，並可定期回收閒置超過 idle_timeout 的會話。
+    只有登入流程會建立會話 (get)，其餘查詢一律使用 resolve / find。
+    """
+
+    def __init__(
+        self,
+        broker_factory: Callable[[bool], Any],
+        max_sessions: int = SESSION_MAX_COUNT,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT
+    ):
+        """
+        初始化註冊表
+
+        Args:
+            broker_factory: 依 use_mock 建立 broker 實例的函式
+            max_sessions: 最大會話數量
+            idle_timeout: 閒置逾時秒數
+        """
+        self._broker_factory = broker_factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions: "OrderedDict[str, BrokerSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = {"capacity": 0, "idle": 0}
+        self.created = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str, use_mock: bool) -> BrokerSession:
+        """
+        取得會話，不存在時建立
+
+        Args:
+            session_id: 會話 ID
+            use_mock: 是否使用 Mock 模式
+
+        Returns:
+            BrokerSession: 會話物件
+        """
+        key = make_session_key(session_id, use_mock)
+        evicted: List[BrokerSession] = []
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = BrokerSession(session_id, use_mock, self._broker_factory(use_mock))
+                self._sessions[key] = session
+                self.created += 1
+                while len(self._sessions) > self.max_sessions:
+                    victim = self._eviction_candidate(exclude=key)
+                    if victim is None:
+                        break
+                    del self._sessions[victim.key]
+                    self.evictions["capacity"] += 1
+                    evicted.append(victim)
+            else:
+                self._sessions.move_to_end(key)
+            session.touch()
+
+        for old in evicted:
+            logger.warning("Session capacity reached, evicting %s", old.key)
+            self._close_in_background(old)
+        return session
+
+    def _eviction_candidate(self, exclude: str) -> Optional[BrokerSession]:
+        """最久未使用的未登入會話，沒有時才選最久未使用的已登入會話 (需持有鎖)"""
+        fallback = None
+        for key, session in self._sessions.items():
+            if key == exclude:
+                continue
+            if not session.broker.is_logged_in:
+                return session
+            if fallback is None:
+                fallback = session
+        return fallback
+
+    def find(self, session_id: str, use_mock: Optional[bool] = None) -> List[BrokerSession]:
+        """
+        查詢既有會話 (不建立)
+
+        Args:
+            session_id: 會話 ID
+            use_mock: 指定模式，None 表示兩種模式皆查詢
+
+        Returns:
+            List[BrokerSession]: 符合的會話 (正式環境優先)
+        """
+        with self._lock:
+            return self._find_unlocked(session_id, use_mock)
+
+    def find_all(self) -> List[BrokerSession]:
+        """取得所有既有會話"""
+        with self._lock:
+            return list(self._sessions.values())
+
+    def resolve(self, session_id: str, use_mock: Optional[bool] = None) -> Optional[BrokerSession]:
+        """
+        取得既有且已登入的會話 (不建立)，並更新其使用時間
+
+        Args:
+            session_id: 會話 ID
+            use_mock: 是否使用 Mock 模式，None 表示任一模式 (正式環境優先)
+
+        Returns:
+            Optional[BrokerSession]: 會話物件，沒有已登入的會話時為 None
+        """
+        with self._lock:
+            for session in self._find_unlocked(session_id, use_mock):
+                if session.broker.is_logged_in:
+                    self._sessions.move_to_end(session.key)
+                    session.touch()
+                    return session
+        return None
+
+    def remove(self, session_id: str, use_mock: Optional[bool] = None) -> int:
+        """
+        移除並關閉會話
+
+        Args:
+            session_id: 會話 ID
+            use_mock: 指定模式，None 表示兩種模式皆移除
+
+        Returns:
+            int: 移除的會話數量
+        """
+        removed = []
+        with self._lock:
+            for session in self._find_unlocked(session_id, use_mock):
+                del self._sessions[session.key]
+                removed.append(session)
+        for session in removed:
+            session.close()
+        return len(removed)
+
+    def _find_unlocked(self, session_id: str, use_mock: Optional[bool]) -> List[BrokerSession]:
+        """同 find，但由已持有鎖的呼叫者使用"""
+        modes = [use_mock] if use_mock is not None else [False, True]
+        keys = (make_session_key(session_id, mode) for mode in modes)
+        return [self._sessions[key] for key in keys if key in self._sessions]
+
+    def sweep_idle(self) -> int:
+        """
+        回收閒置超過 idle_timeout 的會話
+
+        Returns:
+            int: 回收的會話數量
+        """
+        expired = []
+        with self._lock:
+            for key, session in list(self._sessions.items()):
+                if (
+                    session.idle_seconds >= self.idle_timeout
+                    and session.executor.pending == 0
+                    and session.order_executor.pending == 0
+                    and not session.has_active_streams
+                ):
+                    del self._sessions[key]
+                    expired.append(session)
+            self.evictions["idle"] += len(expired)
+
+        for session in expired:
+            logger.info("Session %s idle for %.0fs, evicting", session.key, session.idle_seconds)
+            self._close_in_background(session)
+        return len(expired)
+
+    @staticmethod
+    def _close_in_background(session: BrokerSession) -> None:
+        """於背景執行緒關閉會話，避免 SDK 登出阻塞呼叫端"""
+        threading.Thread(
+            target=session.close,
+            name=f"session-close-{session.key}",
+            daemon=True
+        ).start()
+
+    def stats(self, include_sessions: bool = True) -> Dict[str, Any]:
+        """取得註冊表統計資訊"""
+        sessions = self.find_all()
+        result: Dict[str, Any] = {
+            "live_sessions": len(sessions),
+            "logged_in_sessions": sum(1 for s in sessions if s.broker.is_logged_in),
+            "max_sessions": self.max_sessions,
+            "idle_timeout": self.idle_timeout,
+            "created": self.created,
+            "evictions": dict(self.evictions)
+        }
+        if include_sessions:
+            details = [s.stats() for s in sessions]
+            result["memory_bytes"] = sum(d["memory_bytes"] for d in details)
+            result["sessions"] = details
+        return result
@@ -0,0 +1,476 @@
+"""
+Request Tracing
+請求追蹤
+
+每個 HTTP 請求建立一筆 trace (以 X-Request-ID 為編號)，並以 contextvars
+在路由、依賴解析、執行緒池、broker 方法與 SDK 呼叫之間傳遞，記錄各段的
+span。完成的 trace 保存在程序內的環狀緩衝，可列出最慢的請求、依編號查詢
+或匯出為 JSON Lines 檔。
+
+下單產生的委託事件回調會依委託編號找回原請求的 trace，補上回調的 span。
+"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from metrics import SDK_METHODS
+
+# 保留的 trace 數量
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+# 是否啟用請求追蹤
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+# 不追蹤的路徑前綴 (逗號分隔)
+TRACE_EXCLUDE_PATHS = tuple(
+    p for p in os.getenv("TRACE_EXCLUDE_PATHS", "/health,/metrics,/debug,/docs,/openapi.json").split(",") if p
+)
+# 追蹤委託回調時保留的委託編號數量
+TRACE_ORDER_LINKS = 10000
+
+# 可沿用的外部請求編號格式
+_REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,64}$')
+
+_span_ids = itertools.count(1)
+
+
+class Span:
+    """追蹤區段"""
+
+    __slots__ = ('span_id', 'parent_id', 'name', 'start', 'end', 'attributes', 'error', 'thread')
+
+    def __init__(self, name: str, parent_id: Optional[int], attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = next(_span_ids)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.thread = threading.current_thread().name
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Trace:
+    """單一請求的追蹤紀錄"""
+
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.root = Span('http', None)
+        self.spans: List[Span] = [self.root]
+
+    @property
+    def duration(self) -> float:
+        return self.root.duration
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        轉為 dict，spans 依開始時間排序並附上 self_ms (扣除子區段後的時間)；
+        breakdown 依名稱第一段 (http / dependency / endpoint / executor /
+        broker / sdk / callback) 加總 self_ms，其中 http 為框架本身的時間
+        (參數驗證、序列化與 middleware)。
+        """
+        spans = sorted(self.spans, key=lambda s: s.start)
+        child_time: Dict[int, float] = {}
+        for entry in spans:
+            if entry.parent_id is not None:
+                child_time[entry.parent_id] = child_time.get(entry.parent_id, 0.0) + entry.duration
+
+        origin = self.root.start
+        items = []
+        breakdown: Dict[str, float] = {}
+        for entry in spans:
+            self_ms = max(entry.duration - child_time.get(entry.span_id, 0.0), 0.0) * 1000
+            category = entry.name.split('.', 1)[0]
+            breakdown[category] = breakdown.get(category, 0.0) + self_ms
+            item = {
+                'id': entry.span_id,
+                'parent_id': entry.parent_id,
+                'name': entry.name,
+                'offset_ms': round((entry.start - origin) * 1000, 3),
+                'duration_ms': round(entry.duration * 1000, 3),
+                'self_ms': round(self_ms, 3),
+                'thread': entry.thread
+            }
+            if entry.attributes:
+                item['attributes'] = entry.attributes
+            if entry.error:
+                item['error'] = entry.error
+            items.append(item)
+
+        return {
+            'request_id': self.request_id,
+            'method': self.method,
+            'path': self.path,
+            'route': self.route,
+            'status': self.status,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_ms': round(self.duration * 1000, 3),
+            'breakdown_ms': {name: round(value, 3) for name, value in breakdown.items()},
+            'spans': items
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('trace', default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('span', default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """目前請求的編號 (不在請求中時為 None)"""
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """
+    在目前的 trace 中記錄一個區段 (不在請求中時不做任何事)
+
+    Args:
+        name: 區段名稱 (第一段為分類，例如 broker.place_order)
+        **attributes: 附加屬性
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get() or trace.root
+    current = Span(name, parent.span_id, attributes or None)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def _traced(name: str, func: Callable) -> Callable:
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_trace.get() is None:
+            return func(*args, **kwargs)
+        with span(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def queued(func: Callable) -> Callable:
+    """
+    包裝要送入執行緒池的呼叫，執行時補記排隊等待的區段
+
+    需搭配 contextvars.copy_context().run 使用，讓工作執行緒看得到原請求的 trace。
+
+    Args:
+        func: 無參數的呼叫
+
+    Returns:
+        Callable: 包裝後的呼叫
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return func
+    parent = _current_span.get() or trace.root
+    waiting = Span('executor.queue', parent.span_id)
+
+    def run():
+        waiting.end = time.perf_counter()
+        trace.spans.append(waiting)
+        return func()
+
+    return run
+
+
+class TraceBuffer:
+    """完成的 trace 的環狀緩衝 (執行緒安全)"""
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE):
+        self._traces: deque = deque(maxlen=size)
+        self._orders: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces.append(trace)
+
+    def link_order(self, order_id: str, trace: Trace) -> None:
+        """記錄委託編號所屬的 trace，供之後的委託回調使用"""
+        with self._lock:
+            self._orders[order_id] = trace
+            if len(self._orders) > TRACE_ORDER_LINKS:
+                self._orders.popitem(last=False)
+
+    def find_order(self, order_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._orders.get(order_id)
+
+    def get(self, request_id: str) -> Optional[Trace]:
+        with self._lock:
+            traces = list(self._traces)
+        for trace in reversed(traces):
+            if trace.request_id == request_id:
+                return trace
+        return None
+
+    def slowest(self, limit: int = 20, min_ms: float = 0.0, route: Optional[str] = None) -> List[Trace]:
+        """
+        最慢的請求
+
+        Args:
+            limit: 筆數
+            min_ms: 只列出超過此毫秒數者
+            route: 只列出此路由樣板
+
+        Returns:
+            List[Trace]: 依耗時由大到小排序
+        """
+        with self._lock:
+            traces = list(self._traces)
+        selected = [
+            t for t in traces
+            if t.duration * 1000 >= min_ms and (route is None or t.route == route)
+        ]
+        selected.sort(key=lambda t: t.duration, reverse=True)
+        return selected[:limit]
+
+    def export(self, path: str) -> int:
+        """
+        將緩衝中的 trace 以 JSON Lines 寫入檔案
+
+        Args:
+            path: 輸出檔路徑
+
+        Returns:
+            int: 寫入筆數
+        """
+        with self._lock:
+            traces = list(self._traces)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for trace in traces:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str) + '\n')
+        return len(traces)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'buffered': len(self._traces), 'capacity': self._traces.maxlen,
+                    'linked_orders': len(self._orders)}
+
+
+# 服務共用的 trace 緩衝
+trace_buffer = TraceBuffer()
+
+
+def _request_id(scope: Dict[str, Any]) -> str:
+    for key, value in scope.get('headers', ()):
+        if key == b'x-request-id':
+            candidate = value.decode('latin-1')
+            if _REQUEST_ID_PATTERN.match(candidate):
+                return candidate
+            break
+    return uuid.uuid4().hex[:16]
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: 為每個 HTTP 請求建立 trace，並於回應標頭加上 X-Request-ID
+
+    沿用請求標頭中的 X-Request-ID (格式合法時)，否則產生新的編號。
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if (scope['type'] != 'http' or not TRACE_ENABLED
+                or scope['path'].startswith(TRACE_EXCLUDE_PATHS)):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(_request_id(scope), scope['method'], scope['path'])
+        header = (b'x-request-id', trace.request_id.encode('latin-1'))
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message['type'] == 'http.response.start':
+                trace.status = message['status']
+                message['headers'] = list(message.get('headers', ())) + [header]
+            await send(message)
+
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(trace.root)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            trace.root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            trace.root.end = time.perf_counter()
+            route = scope.get('route')
+            trace.route = getattr(route, 'path', None)
+            if trace.status is None:
+                trace.status = 500
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            trace_buffer.add(trace)
+
+
+class TracedRoute(APIRoute):
+    """記錄路由函式本身 (不含參數驗證與依賴解析) 耗時的 APIRoute"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        # include_router 會以同一類別重建路由，已包裝者不重複包裝
+        if asyncio.iscoroutinefunction(endpoint) and not getattr(endpoint, '_traced', False):
+            endpoint = _traced_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _traced_endpoint(endpoint: Callable) -> Callable:
+    name = f'endpoint.{endpoint.__name__}'
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        with span(name):
+            return await endpoint(*args, **kwargs)
+
+    wrapper._traced = True
+    return wrapper
+
+
+def _order_id(value: Any) -> Optional[str]:
+    """由委託結果或事件取出委託編號 (dict 或 SDK 物件)"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return value.get('order_id') or value.get('order_no')
+    data = getattr(value, 'data', None)
+    return (getattr(value, 'order_id', None) or getattr(value, 'order_no', None)
+            or getattr(data, 'order_no', None))
+
+
+class _TracedSDK:
+    """SDK 代理物件：子介面繼續代理，方法呼叫記錄為 sdk.<路徑> 區段"""
+
+    __slots__ = ('_target', '_path')
+
+    _PLAIN = (str, bytes, int, float, bool, list, tuple, dict, set, type(None))
+
+    def __init__(self, target: Any, path: str):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_path', path)
+
+    def __getattr__(self, name: str) -> Any:
+        value = getattr(self._target, name)
+        path = f'{self._path}.{name}'
+        if isinstance(value, self._PLAIN) or name.startswith('_'):
+            return value
+        if callable(value):
+            return _traced(path, value)
+        return _TracedSDK(value, path)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+
+def trace_broker(broker: Any) -> Any:
+    """
+    為 broker 實例加上追蹤
+
+    - SDK 方法記錄為 broker.<方法> 區段，SDK 物件本身再代理為 sdk.<路徑> 區段
+    - 呼叫額度等待 (_throttle) 記錄為 broker.throttle，Mock 的模擬延遲記錄為 sdk.simulated
+    - 下單結果的委託編號連結到目前的 trace，之後的委託回調記錄為 callback.order_event
+
+    Args:
+        broker: FubonBroker 實例
+
+    Returns:
+        同一個 broker 實例
+    """
+    def wrap_sdk() -> None:
+        sdk = getattr(broker, 'sdk', None)
+        if sdk is not None and not isinstance(sdk, _TracedSDK):
+            broker.sdk = _TracedSDK(sdk, 'sdk')
+
+    for name in SDK_METHODS:
+        method = getattr(broker, name, None)
+        if callable(method):
+            setattr(broker, name, _traced(f'broker.{name}', method))
+
+    login = broker.login
+
+    @functools.wraps(login)
+    def traced_login(*args, **kwargs):
+        result = login(*args, **kwargs)
+        wrap_sdk()
+        return result
+
+    broker.login = traced_login
+
+    place_order = broker.place_order
+
+    @functools.wraps(place_order)
+    def traced_place_order(*args, **kwargs):
+        result = place_order(*args, **kwargs)
+        trace = _current_trace.get()
+        order_id = _order_id(result)
+        if trace is not None and order_id:
+            trace_buffer.link_order(str(order_id), trace)
+        return result
+
+    broker.place_order = traced_place_order
+
+    if callable(getattr(broker, '_throttle', None)):
+        broker._throttle = _traced('broker.throttle', broker._throttle)
+    if callable(getattr(broker, '_simulate_latency', None)):
+        broker._simulate_latency = _traced('sdk.simulated', broker._simulate_latency)
+
+    dispatch_order = broker._dispatch_order
+
+    @functools.wraps(dispatch_order)
+    def traced_dispatch_order(event: Any) -> None:
+        trace = _current_trace.get()
+        if trace is None:
+            order_id = _order_id(event)
+            trace = trace_buffer.find_order(str(order_id)) if order_id else None
+        if trace is None:
+            return dispatch_order(event)
+
+        # SDK 回調執行緒沒有請求的 context，於原 trace 中記錄
+        trace_token = _current_trace.set(trace)
+        try:
+            with span('callback.order_event', status=_event_status(event)):
+                return dispatch_order(event)
+        finally:
+            _current_trace.reset(trace_token)
+
+    broker._dispatch_order = traced_dispatch_order
+    wrap_sdk()
+    return broker
+
+
+def _event_status(event: Any) -> Optional[str]:
+    if isinstance(event, dict):
+        return event.get('status')
+    return getattr(event, 'status', None)
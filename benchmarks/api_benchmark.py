@@ -0,0 +1,414 @@
+"""
+API Benchmark
+FastAPI 服務壓力測試
+
+以 Mock 模式 (模擬交易所) 啟動 api/main.py，對登入、報價、下單/刪單、
+委託查詢與帳戶摘要端點在逐步提高的並行數下發送請求，量測 p50/p90/p99
+延遲與吞吐量，並輸出 JSON 結果供不同 commit 之間比較。
+
+SDK 延遲以 MOCK_SDK_LATENCY_MS / MOCK_SDK_LATENCY_JITTER_MS 注入 Mock broker，
+可模擬真實券商往返時間下執行緒池、快取與限流的行為。
+
+用法:
+    python benchmarks/api_benchmark.py run --latency-ms 20 -o before.json
+    python benchmarks/api_benchmark.py run --concurrency 1 8 32 --requests 500
+    python benchmarks/api_benchmark.py run --url http://localhost:8000  # 使用已啟動的服務
+    python benchmarks/api_benchmark.py compare before.json after.json --threshold 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, 'api')
+PREFIX = '/api/v1'
+
+# 結果格式版本 (比較時檢查)
+RESULT_VERSION = 1
+
+# 預設並行數與每個並行數的請求數
+DEFAULT_CONCURRENCY = [1, 4, 16, 64]
+DEFAULT_REQUESTS = 200
+
+# 服務端預設環境變數: 放寬 SDK 呼叫額度與執行緒池佇列，量測服務本身而非限流
+DEFAULT_SERVER_ENV = {
+    **{
+        f'SDK_{kind}_{category}': '100000'
+        for kind in ('RATE', 'BURST')
+        for category in ('ORDER', 'MARKET', 'QUERY', 'GLOBAL')
+    },
+    'BROKER_EXECUTOR_MAX_QUEUE': '1024'
+}
+
+LOGIN_BODY = {'user_id': 'bench', 'password': 'bench', 'cert_path': '/bench', 'use_mock': True}
+
+
+class LatencySamples:
+    """單一操作的延遲樣本與錯誤計數"""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.errors = 0
+        self.status: Dict[str, int] = {}
+
+    def add(self, elapsed: float, status_code: int) -> None:
+        self.status[str(status_code)] = self.status.get(str(status_code), 0) + 1
+        if 200 <= status_code < 300:
+            self.samples.append(elapsed)
+        else:
+            self.errors += 1
+
+    def summary(self, wall: float) -> Dict[str, Any]:
+        """統計 (毫秒)"""
+        samples = sorted(self.samples)
+        count = len(samples)
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(int(p * count), count - 1)] * 1000, 3)
+
+        return {
+            'requests': count + self.errors,
+            'errors': self.errors,
+            'status': self.status,
+            'throughput_rps': round(count / wall, 1) if wall > 0 else None,
+            'mean_ms': round(sum(samples) / count * 1000, 3) if samples else None,
+            'p50_ms': percentile(0.5),
+            'p90_ms': percentile(0.9),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(samples[-1] * 1000, 3) if samples else None
+        }
+
+
+Recorder = Callable[[str, float, int], None]
+Operation = Callable[[httpx.AsyncClient, int, Recorder], Awaitable[None]]
+
+
+async def _timed(client: httpx.AsyncClient, record: Recorder, name: str, method: str,
+                 path: str, **kwargs) -> Optional[httpx.Response]:
+    """送出請求並記錄延遲 (連線錯誤記為狀態 0)"""
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, PREFIX + path, **kwargs)
+    except httpx.HTTPError:
+        record(name, time.perf_counter() - started, 0)
+        return None
+    record(name, time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def op_login(client: httpx.AsyncClient, worker: int, record: Recorder) -> None:
+    """登入 (每個 worker 使用各自的會話，避免互相登出)"""
+    await _timed(client, record, 'login', 'POST', '/auth/login',
+                 params={'session_id': f'bench-{worker}'}, json=LOGIN_BODY)
+
+
+async def op_quote(client: httpx.AsyncClient, worker: int, record: Recorder) -> None:
+    """單檔報價查詢"""
+    await _timed(client, record, 'quote', 'POST', '/market/quote', json={'stock_codes': ['2330']})
+
+
+async def op_place_cancel(client: httpx.AsyncClient, worker: int, record: Recorder) -> None:
+    """掛出不會成交的限價單後立即刪單"""
+    response = await _timed(client, record, 'place', 'POST', '/order/place', json={
+        'stock_code': '2317', 'action': 'Buy', 'price': 95, 'quantity': 1
+    })
+    if response is not None and response.status_code == 200:
+        await _timed(client, record, 'cancel', 'POST', '/order/cancel',
+                     json={'order_id': response.json()['order_id']})
+
+
+async def op_query(client: httpx.AsyncClient, worker: int, record: Recorder) -> None:
+    """委託查詢"""
+    await _timed(client, record, 'query', 'POST', '/order/query', json={})
+
+
+async def op_summary(client: httpx.AsyncClient, worker: int, record: Recorder) -> None:
+    """帳戶摘要"""
+    await _timed(client, record, 'summary', 'GET', '/account/summary')
+
+
+SCENARIOS: Dict[str, Operation] = {
+    'login': op_login,
+    'quote': op_quote,
+    'place_cancel': op_place_cancel,
+    'query': op_query,
+    'summary': op_summary
+}
+
+
+async def run_level(client: httpx.AsyncClient, operation: Operation, concurrency: int,
+                    requests: int, warmup: int) -> Tuple[Dict[str, LatencySamples], float]:
+    """
+    以固定並行數執行一個情境
+
+    Args:
+        client: HTTP client
+        operation: 情境操作
+        concurrency: 並行 worker 數
+        requests: 量測的操作次數 (由所有 worker 共同消化)
+        warmup: 不列入統計的暖身次數
+
+    Returns:
+        Tuple[Dict, float]: (各請求名稱的樣本, 量測耗時秒數)
+    """
+    samples: Dict[str, LatencySamples] = {}
+
+    def record(name: str, elapsed: float, status_code: int) -> None:
+        samples.setdefault(name, LatencySamples()).add(elapsed, status_code)
+
+    def discard(name: str, elapsed: float, status_code: int) -> None:
+        pass
+
+    async def worker(index: int, remaining: List[int], sink: Recorder) -> None:
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            await operation(client, index, sink)
+
+    pending = [warmup]
+    await asyncio.gather(*(worker(i, pending, discard) for i in range(min(warmup, concurrency))))
+
+    remaining = [requests]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, remaining, record) for i in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+async def run_benchmark(base_url: str, scenarios: List[str], levels: List[int],
+                        requests: int, warmup: int) -> List[Dict[str, Any]]:
+    """依序執行各情境與並行數，回傳結果列表"""
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        response = await client.post(PREFIX + '/auth/login', json=LOGIN_BODY)
+        response.raise_for_status()
+
+        for scenario in scenarios:
+            for concurrency in levels:
+                samples, wall = await run_level(client, SCENARIOS[scenario], concurrency, requests, warmup)
+                for name, stats in samples.items():
+                    result = {'scenario': scenario, 'request': name, 'concurrency': concurrency}
+                    result.update(stats.summary(wall))
+                    results.append(result)
+                    print(_format_row(result), file=sys.stderr, flush=True)
+    return results
+
+
+def _format_row(result: Dict[str, Any]) -> str:
+    def ms(value: Optional[float]) -> str:
+        return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+
+    return (f"{result['scenario']:<13} {result['request']:<8} c={result['concurrency']:<4} "
+            f"rps={result['throughput_rps'] or 0:<9} p50={ms(result['p50_ms'])} "
+            f"p99={ms(result['p99_ms'])} max={ms(result['max_ms'])} errors={result['errors']}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env_overrides: Dict[str, str], log_path: Optional[str] = None,
+                 timeout: float = 30.0) -> Tuple[subprocess.Popen, str]:
+    """
+    於子行程啟動 API 服務並等待 /health 就緒
+
+    Args:
+        env_overrides: 服務端環境變數
+        log_path: 服務輸出寫入的檔案，未指定時捨棄
+        timeout: 等待就緒的秒數
+
+    Returns:
+        Tuple[Popen, str]: (子行程, base URL)
+    """
+    port = _free_port()
+    env = dict(os.environ, **env_overrides)
+    output = open(log_path, 'w') if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1',
+         '--port', str(port), '--log-level', 'warning', '--no-access-log'],
+        cwd=API_DIR, env=env, stdout=output, stderr=subprocess.STDOUT
+    )
+    if log_path:
+        output.close()
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(base_url + '/health', timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError("API server did not become ready")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(['git', *args], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def command_run(args: argparse.Namespace) -> int:
+    server_env = dict(DEFAULT_SERVER_ENV)
+    server_env['MOCK_SDK_LATENCY_MS'] = str(args.latency_ms)
+    server_env['MOCK_SDK_LATENCY_JITTER_MS'] = str(args.jitter_ms)
+    for item in args.env:
+        key, _, value = item.partition('=')
+        server_env[key] = value
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(server_env, args.server_log)
+    try:
+        results = asyncio.run(run_benchmark(base_url, args.scenarios, args.concurrency, args.requests, args.warmup))
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = {
+        'version': RESULT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'url': args.url,
+            'sdk_latency_ms': None if args.url else args.latency_ms,
+            'sdk_latency_jitter_ms': None if args.url else args.jitter_ms,
+            'server_env': None if args.url else server_env,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': args.concurrency
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def compare_reports(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    比較兩份結果
+
+    延遲 (p50/p99) 增加或吞吐量下降超過 threshold 百分比時標記為退步。
+
+    Returns:
+        List[Dict]: 每組 (情境, 請求, 並行數) 的比較
+    """
+    def key(result: Dict[str, Any]) -> Tuple[str, str, int]:
+        return result['scenario'], result['request'], result['concurrency']
+
+    base_results = {key(r): r for r in base['results']}
+    rows = []
+    for result in head['results']:
+        before = base_results.get(key(result))
+        if before is None:
+            continue
+        row = {'scenario': result['scenario'], 'request': result['request'],
+               'concurrency': result['concurrency'], 'regressions': []}
+        for metric, higher_is_worse in (('p50_ms', True), ('p99_ms', True), ('throughput_rps', False)):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                row[metric] = None
+                continue
+            change = (new - old) / old * 100
+            row[metric] = {'base': old, 'head': new, 'change_pct': round(change, 1)}
+            if (change if higher_is_worse else -change) > threshold:
+                row['regressions'].append(metric)
+        if result['errors'] > before['errors']:
+            row['regressions'].append('errors')
+        rows.append(row)
+    return rows
+
+
+def command_compare(args: argparse.Namespace) -> int:
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.head, encoding='utf-8') as f:
+        head = json.load(f)
+    if base.get('version') != head.get('version'):
+        print("Result versions differ, comparison may be meaningless", file=sys.stderr)
+    if base['config'].get('sdk_latency_ms') != head['config'].get('sdk_latency_ms'):
+        print("Injected SDK latency differs between runs", file=sys.stderr)
+
+    rows = compare_reports(base, head, args.threshold)
+
+    def fmt(cell: Optional[Dict[str, Any]]) -> str:
+        return f"{cell['base']}->{cell['head']} ({cell['change_pct']:+.1f}%)" if cell else '-'
+
+    for row in rows:
+        flag = 'REGRESSION ' + ','.join(row['regressions']) if row['regressions'] else 'ok'
+        print(f"{row['scenario']:<13} {row['request']:<8} c={row['concurrency']:<4} "
+              f"p50 {fmt(row['p50_ms']):<28} p99 {fmt(row['p99_ms']):<28} "
+              f"rps {fmt(row['throughput_rps']):<28} {flag}")
+    regressions = sum(1 for row in rows if row['regressions'])
+    print(f"{regressions} regression(s) over {args.threshold}% threshold")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the FastAPI service against the mock broker')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='執行壓力測試')
+    run.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                     help='要執行的情境')
+    run.add_argument('--concurrency', nargs='+', type=int, default=DEFAULT_CONCURRENCY, help='並行數列表')
+    run.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='每個並行數量測的操作次數')
+    run.add_argument('--warmup', type=int, default=20, help='每個並行數的暖身次數')
+    run.add_argument('--latency-ms', type=float, default=0, help='注入的 SDK 呼叫延遲 (毫秒)')
+    run.add_argument('--jitter-ms', type=float, default=0, help='SDK 延遲的隨機增量上限 (毫秒)')
+    run.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                     help='額外的服務端環境變數 (可重複)')
+    run.add_argument('--url', help='測試已啟動的服務，不自行啟動 (注入延遲無效)')
+    run.add_argument('--server-log', help='服務輸出寫入的檔案 (預設捨棄)')
+    run.add_argument('-o', '--output', help='結果 JSON 檔 (未指定時輸出至 stdout)')
+    run.set_defaults(handler=command_run)
+
+    compare = commands.add_parser('compare', help='比較兩份結果')
+    compare.add_argument('base', help='基準結果 JSON')
+    compare.add_argument('head', help='新結果 JSON')
+    compare.add_argument('--threshold', type=float, default=10.0, help='視為退步的變化百分比')
+    compare.set_defaults(handler=command_compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Broker Microbenchmarks
+FubonBroker 熱路徑微基準測試
+
+以離線的 SDK stub 量測包裝層在每次呼叫上增加的成本：下單參數組裝、
+enum 轉換、報價/委託回調分派、DataFrame 轉字典列表與 API 回應模型建立。
+每項輸出 ops/sec (timeit，取多次量測中最快者) 與每次呼叫的記憶體配置
+(tracemalloc，配置區塊數與峰值位元組)。
+
+「sdk.*」項目直接呼叫 stub，與對應的 broker 項目相減即為包裝層的額外成本。
+
+用法:
+    python benchmarks/micro_broker.py
+    python benchmarks/micro_broker.py --filter dispatch -o micro.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT_DIR, 'api')
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from src.brokers.fubon.broker import FubonBroker  # noqa: E402
+from src.brokers.fubon.constants import Action, OrderCondition, OrderType, PriceType  # noqa: E402
+from src.brokers.fubon.rate_limiter import DEFAULT_LIMITS, RequestScheduler  # noqa: E402
+
+try:
+    import pandas
+except ImportError:  # pragma: no cover - pandas 為選用
+    pandas = None
+
+# 每項量測的重複次數與記憶體配置取樣次數
+DEFAULT_REPEAT = 5
+ALLOCATION_SAMPLES = 200
+
+POSITION_ROWS = 50
+
+
+class _StubOrderApi:
+    """SDK order 介面 stub (立即回傳固定結果)"""
+
+    def __init__(self):
+        self.result = {'order_id': 'STUB0001', 'status': 'Submitted'}
+
+    def place_order(self, **params) -> Dict[str, Any]:
+        return self.result
+
+    def set_callback(self, callback: Callable) -> None:
+        pass
+
+
+class _StubAccountApi:
+    """SDK account 介面 stub"""
+
+    def __init__(self, positions: Any):
+        self.positions = positions
+
+    def get_positions(self) -> Any:
+        return self.positions
+
+
+class StubSDK:
+    """離線 SDK stub，只提供基準測試用到的介面"""
+
+    def __init__(self, positions: Any):
+        self.order = _StubOrderApi()
+        self.account = _StubAccountApi(positions)
+
+
+def _position_rows(count: int = POSITION_ROWS) -> List[Dict[str, Any]]:
+    return [
+        {'stock_code': str(2000 + i), 'quantity': 1000 + i, 'avg_price': 100.0 + i,
+         'market_value': (100.0 + i) * 1000, 'unrealized_pnl': float(i)}
+        for i in range(count)
+    ]
+
+
+def make_broker(positions: Any = None) -> FubonBroker:
+    """建立已「登入」stub SDK 的 broker (限流額度放寬，不等待)"""
+    unlimited = {category: (1e12, 10 ** 12) for category in DEFAULT_LIMITS}
+    broker = FubonBroker(scheduler=RequestScheduler(limits=unlimited, global_limit=None))
+    broker.sdk = StubSDK(positions if positions is not None else _position_rows())
+    broker.is_logged_in = True
+    broker.user_id = 'bench'
+    return broker
+
+
+def build_cases() -> Dict[str, Optional[Callable[[], Any]]]:
+    """
+    建立所有基準項目
+
+    Returns:
+        Dict[str, Callable]: {名稱: 無參數函式}，無法執行的項目為 None
+    """
+    from routers.account import _to_records
+    from routers.order import _order_kwargs
+    from schemas import LoginResponse, PlaceOrderRequest, PositionsResponse
+
+    broker = make_broker()
+    sdk = broker.sdk
+    cases: Dict[str, Optional[Callable[[], Any]]] = {}
+
+    # 下單參數組裝
+    cases['sdk.place_order'] = lambda: sdk.order.place_order(
+        stock_no='2330', action='Buy', quantity=1000, price_type='Limit',
+        order_type='ROD', order_condition='Cash', price=600.0
+    )
+    cases['broker.place_order'] = lambda: broker.place_order(
+        '2330', Action.BUY, 1000, price=600.0, price_type=PriceType.LIMIT,
+        order_type=OrderType.ROD, order_condition=OrderCondition.CASH
+    )
+    order_request = PlaceOrderRequest(stock_code='2330', action='Buy', price=600.0, quantity=1)
+    cases['api._order_kwargs'] = lambda: _order_kwargs(order_request)
+
+    # enum 轉換
+    cases['enum.from_value'] = lambda: (
+        Action('Buy'), PriceType('Limit'), OrderType('ROD'), OrderCondition('Cash')
+    )
+    cases['enum.value'] = lambda: (
+        Action.BUY.value, PriceType.LIMIT.value, OrderType.ROD.value, OrderCondition.CASH.value
+    )
+
+    # 回調分派 (1 / 10 / 100 個回調)
+    quote = {'symbol': '2330', 'price': 600.0, 'volume': 1}
+    for fanout in (1, 10, 100):
+        dispatcher = make_broker()
+        for _ in range(fanout):
+            dispatcher.quote_callbacks.setdefault('2330', []).append(lambda q: None)
+            dispatcher.order_callbacks.append(lambda e: None)
+        cases[f'dispatch_quote.x{fanout}'] = lambda d=dispatcher: d._dispatch_quote(quote)
+        cases[f'dispatch_order.x{fanout}'] = lambda d=dispatcher: d._dispatch_order(quote)
+    cases['dispatch_quote.unsubscribed'] = lambda: broker._dispatch_quote({'symbol': '9999', 'price': 1.0})
+
+    # DataFrame / 列表轉字典列表
+    rows = _position_rows()
+    cases['to_records.list'] = lambda: _to_records(rows)
+    if pandas is not None:
+        frame = pandas.DataFrame(rows)
+        frame_broker = make_broker(frame)
+        cases['to_records.dataframe'] = lambda: _to_records(frame)
+        cases['broker.get_positions.dataframe'] = lambda: _to_records(frame_broker.get_positions())
+    else:
+        cases['to_records.dataframe'] = None
+        cases['broker.get_positions.dataframe'] = None
+    cases['broker.get_positions.list'] = lambda: _to_records(broker.get_positions())
+
+    # 回應模型建立
+    cases['model.LoginResponse'] = lambda: LoginResponse(
+        success=True, message='登入成功', user_id='bench', session_id='default'
+    )
+    cases['model.PlaceOrderRequest'] = lambda: PlaceOrderRequest(
+        stock_code='2330', action='Buy', price=600.0, quantity=1
+    )
+    cases['model.PositionsResponse'] = lambda: PositionsResponse(
+        success=True, positions=rows, total_count=len(rows)
+    )
+    return cases
+
+
+def measure_speed(func: Callable[[], Any], repeat: int) -> Tuple[float, int]:
+    """
+    量測每秒可執行次數
+
+    Returns:
+        Tuple[float, int]: (ops/sec，取最快的一輪, 每輪次數)
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best, number
+
+
+def measure_allocations(func: Callable[[], Any], samples: int = ALLOCATION_SAMPLES) -> Dict[str, float]:
+    """
+    量測每次呼叫的記憶體配置
+
+    Returns:
+        Dict: blocks (每次呼叫新配置且仍存活的區塊數，含回傳值) 與
+              peak_bytes (呼叫期間相對呼叫前的峰值位元組)
+    """
+    func()  # 先執行一次，排除延遲初始化
+    tracemalloc.start()
+    try:
+        peak_total = 0
+        before = tracemalloc.take_snapshot()
+        results = []
+        for _ in range(samples):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            results.append(func())
+            peak_total += tracemalloc.get_traced_memory()[1] - current
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    return {
+        'blocks_per_call': round(max(blocks - 1, 0) / samples, 2),  # 扣除 results 列表本身
+        'peak_bytes_per_call': round(peak_total / samples, 1)
+    }
+
+
+def _git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(['git', *args], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))}
+    except OSError:
+        return {'commit': None, 'dirty': None}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Microbenchmarks for FubonBroker hot paths')
+    parser.add_argument('--filter', help='只執行名稱包含此字串的項目')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每項量測輪數')
+    parser.add_argument('-o', '--output', help='結果 JSON 檔')
+    args = parser.parse_args()
+
+    results = []
+    for name, func in build_cases().items():
+        if args.filter and args.filter not in name:
+            continue
+        if func is None:
+            print(f"{name:<32} skipped (pandas not installed)")
+            results.append({'name': name, 'skipped': True})
+            continue
+        ops, number = measure_speed(func, args.repeat)
+        result = {'name': name, 'ops_per_sec': round(ops, 1), 'ns_per_op': round(1e9 / ops, 1), 'loops': number}
+        result.update(measure_allocations(func))
+        results.append(result)
+        print(f"{name:<32} {result['ops_per_sec']:>14,.0f} ops/s {result['ns_per_op']:>12,.1f} ns/op "
+              f"{result['blocks_per_call']:>8} blocks {result['peak_bytes_per_call']:>10,.0f} B peak")
+
+    if args.output:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': getattr(pandas, '__version__', None),
+            'results': results
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
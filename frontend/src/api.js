@@ -92,6 +92,35 @@ class FubonAPI {
     return response.data;
   }
 
+  // 開啟即時報價 WebSocket，回傳可訂閱/關閉的控制物件
+  openQuoteStream(stockCodes, onQuotes, onStatus = () => {}) {
+    const wsURL = this.baseURL.replace(/^http/, 'ws');
+    const params = new URLSearchParams({ symbols: stockCodes.join(',') });
+    const socket = new WebSocket(`${wsURL}/ws/quotes?${params}`);
+
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data);
+      if (message.type === 'quotes') {
+        onQuotes(message.data);
+      } else {
+        onStatus(message);
+      }
+    };
+    socket.onclose = (event) => onStatus({ type: 'closed', code: event.code, reason: event.reason });
+
+    const send = (action, codes) => {
+      if (socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({ action, symbols: codes }));
+      }
+    };
+
+    return {
+      subscribe: (codes) => send('subscribe', codes),
+      unsubscribe: (codes) => send('unsubscribe', codes),
+      close: () => socket.close(),
+    };
+  }
+
   async getIntradayData(stockCode) {
     const response = await this.client.post('/api/v1/market/intraday', {
       stock_code: stockCode
@@ -137,6 +166,60 @@ class FubonAPI {
     return response.data;
   }
 
+  // 開啟委託事件 WebSocket，非預期斷線時以退避間隔重連並以最後序號續傳
+  openOrderStream(onEvent, onReset = () => {}) {
+    const wsURL = this.baseURL.replace(/^http/, 'ws');
+    let lastSeq = null;
+    let socket = null;
+    let ready = false;
+    let closed = false;
+    let retries = 0;
+    let retryTimer = null;
+
+    const connect = () => {
+      retryTimer = null;
+      const query = lastSeq === null ? '' : `?since=${lastSeq}`;
+      socket = new WebSocket(`${wsURL}/ws/orders${query}`);
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.type === 'hello') {
+          ready = true;
+          retries = 0;
+          if (message.reset) {
+            onReset();
+          }
+          if (lastSeq === null || message.reset) {
+            lastSeq = message.seq;
+          }
+        } else if (message.type === 'order') {
+          lastSeq = message.seq;
+          onEvent(message.data);
+        }
+      };
+      socket.onclose = (event) => {
+        ready = false;
+        if (closed) {
+          return;
+        }
+        // 4409 = 客戶端處理過慢，立即續傳；其餘斷線 (含伺服器重啟、未登入) 退避重連
+        const delay = event.code === 4409 ? 0 : Math.min(1000 * 2 ** retries, 30000);
+        retries += 1;
+        retryTimer = setTimeout(connect, delay);
+      };
+    };
+
+    connect();
+    return {
+      // 已收到 hello 且連線中；否則呼叫端需自行重新載入委託列表
+      isOpen: () => ready,
+      close: () => {
+        closed = true;
+        clearTimeout(retryTimer);
+        socket?.close();
+      },
+    };
+  }
+
   // ========== 帳戶管理 ==========
   
   async getAccountInfo() {
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import api from '../api';
 import './MarketPanel.css';
 
@@ -9,6 +9,26 @@ function MarketPanel() {
   const [intradayData, setIntradayData] = useState(null);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState(null);
+  const streamRef = useRef(null);
+
+  // 卸載時關閉即時報價連線
+  useEffect(() => () => streamRef.current?.close(), []);
+
+  // 以推播報價更新表格 (依股票代碼合併)
+  const applyStreamQuotes = (updates) => {
+    setQuoteData((prev) => {
+      const quotes = [...(prev?.quotes || [])];
+      updates.forEach(({ symbol, quote }) => {
+        const index = quotes.findIndex(q => (q.code || q.stock_code) === symbol);
+        if (index >= 0) {
+          quotes[index] = { ...quotes[index], ...quote };
+        } else {
+          quotes.push({ code: symbol, ...quote });
+        }
+      });
+      return { ...(prev || {}), quotes };
+    });
+  };
 
   const handleGetQuote = async () => {
     setLoading(true);
@@ -72,15 +92,19 @@ function MarketPanel() {
     setMessage(null);
     try {
       const codes = stockCodes.split(',').map(c => c.trim());
-      const result = await api.subscribeQuote(codes);
-      const successCodes = (result.results || [])
-        .filter(item => item.success)
-        .map(item => item.stock_code);
-      setMessage({ 
-        type: 'success', 
-        text: successCodes.length > 0
-          ? `成功訂閱 ${successCodes.join(', ')} 的即時報價`
-          : result.message || '訂閱請求已送出'
+      // 改以 WebSocket 接收推播，不再輪詢 /quote
+      streamRef.current?.close();
+      streamRef.current = api.openQuoteStream(codes, applyStreamQuotes, (status) => {
+        if (status.type === 'subscribed') {
+          setMessage({
+            type: 'success',
+            text: status.symbols.length > 0
+              ? `成功訂閱 ${status.symbols.join(', ')} 的即時報價`
+              : '訂閱請求已送出'
+          });
+        } else if (status.type === 'closed' && status.code === 4401) {
+          setMessage({ type: 'error', text: '即時報價連線失敗：尚未登入' });
+        }
       });
     } catch (error) {
       console.error('訂閱錯誤:', error);
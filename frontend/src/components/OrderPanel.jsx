@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import api from '../api';
 import './OrderPanel.css';
 
@@ -15,11 +15,38 @@ function OrderPanel() {
   const [todayOrders, setTodayOrders] = useState([]);
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState(null);
+  const streamRef = useRef(null);
 
   useEffect(() => {
     loadTodayOrders();
+    // 委託/成交變更由伺服器推播，不再重複輪詢完整委託列表
+    const stream = api.openOrderStream(mergeOrderEvent, loadTodayOrders);
+    streamRef.current = stream;
+    return () => stream.close();
   }, []);
 
+  // 推播中斷時改由 /order/today 重新載入，避免列表停在舊狀態
+  const refreshIfStreamDown = () => {
+    if (!streamRef.current?.isOpen()) {
+      loadTodayOrders();
+    }
+  };
+
+  const mergeOrderEvent = (event) => {
+    if (!event?.order_id) {
+      return;
+    }
+    setTodayOrders((orders) => {
+      const index = orders.findIndex(o => o.order_id === event.order_id);
+      if (index < 0) {
+        return [event, ...orders];
+      }
+      const next = [...orders];
+      next[index] = { ...next[index], ...event };
+      return next;
+    });
+  };
+
   const loadTodayOrders = async () => {
     try {
       const result = await api.getTodayOrders();
@@ -52,14 +79,13 @@ function OrderPanel() {
         type: 'success',
         text: result.message || `下單成功！訂單編號: ${result.order_id}`
       });
-      // 重新載入今日委託
-      await loadTodayOrders();
       // 重置表單
       setOrderForm({
         ...orderForm,
         price: '',
         quantity: 1000
       });
+      refreshIfStreamDown();
     } catch (error) {
       console.error('下單錯誤:', error);
       setMessage({
@@ -82,7 +108,7 @@ function OrderPanel() {
         type: 'success',
         text: result.message
       });
-      await loadTodayOrders();
+      refreshIfStreamDown();
     } catch (error) {
       console.error('取消訂單錯誤:', error);
       setMessage({
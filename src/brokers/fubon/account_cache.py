@@ -0,0 +1,233 @@
+"""
+Account Snapshot Cache
+帳戶查詢快取
+
+帳戶查詢 (餘額、持股、交割、損益、融資融券) 受券商端頻率限制，
+而前端儀表板會同時且頻繁地輪詢這些資料。此模組提供：
+
+- 每項資源獨立的 TTL
+- 過期後於容忍期間內先回傳舊資料並於背景更新 (stale-while-revalidate)
+- 同一資源的並行未命中只會發出一次 SDK 呼叫 (single-flight)
+- 下單、刪單、改單後可整體失效
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 各項資源的預設 TTL (秒)，鍵值對應 broker 的 get_<resource> 方法
+DEFAULT_TTLS: Dict[str, float] = {
+    'balance': 2.0,
+    'positions': 5.0,
+    'settlements': 60.0,
+    'profit_loss': 5.0,
+    'margin_info': 30.0
+}
+
+# 過期後仍可回傳舊資料的容忍時間 (秒)
+DEFAULT_STALE_WINDOW = 30.0
+
+
+class _Entry:
+    """單一資源的快取項目"""
+
+    __slots__ = ('value', 'fetched_at', 'generation')
+
+    def __init__(self, value: Any, fetched_at: float, generation: int):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.generation = generation
+
+
+class _Flight:
+    """進行中的載入作業，供並行的呼叫者等待同一結果"""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class AccountCache:
+    """
+    帳戶查詢快取
+
+    包裝一個 broker 實例，以 get(resource) 取代直接呼叫
+    broker.get_<resource>()。執行緒安全，可由多個工作執行緒同時使用。
+    """
+
+    def __init__(
+        self,
+        broker: Any,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_window: float = DEFAULT_STALE_WINDOW,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化快取
+
+        Args:
+            broker: FubonBroker 實例 (Real 或 Mock)
+            ttls: 各資源 TTL 覆寫值 (秒)，0 表示不快取
+            stale_window: 過期後仍可回傳舊資料的容忍時間 (秒)
+            clock: 時間來源 (測試用)
+        """
+        self.broker = broker
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.stale_window = stale_window
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _Entry] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._generation = 0
+
+        self.stats_counters = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'loads': 0,
+            'background_refreshes': 0,
+            'invalidations': 0,
+            'errors': 0
+        }
+
+    def _check_resource(self, resource: str) -> None:
+        if resource not in self.ttls:
+            raise KeyError(f"Unknown account resource: {resource}")
+
+    def lookup(self, resource: str) -> Tuple[bool, Any]:
+        """
+        不阻塞地查詢快取
+
+        新鮮資料直接回傳；過期但仍在容忍期間內的資料也會回傳，
+        並同時在背景觸發更新。
+
+        Args:
+            resource: 資源名稱 (balance, positions, ...)
+
+        Returns:
+            Tuple[bool, Any]: (是否可直接使用, 資料)
+        """
+        self._check_resource(resource)
+        now = self._clock()
+        refresh = False
+        with self._lock:
+            entry = self._entries.get(resource)
+            if entry is None:
+                return False, None
+            age = now - entry.fetched_at
+            ttl = self.ttls[resource]
+            if age < ttl:
+                self.stats_counters['hits'] += 1
+                return True, entry.value
+            if age >= ttl + self.stale_window:
+                return False, None
+            self.stats_counters['stale_hits'] += 1
+            if resource not in self._flights:
+                self._flights[resource] = _Flight()
+                refresh = True
+            value = entry.value
+
+        if refresh:
+            self.stats_counters['background_refreshes'] += 1
+            threading.Thread(
+                target=self._load,
+                args=(resource,),
+                name=f"account-cache-{resource}",
+                daemon=True
+            ).start()
+        return True, value
+
+    def get(self, resource: str) -> Any:
+        """
+        取得資源資料，必要時同步向 SDK 查詢
+
+        並行的未命中會共用同一次 SDK 呼叫的結果或錯誤。
+
+        Args:
+            resource: 資源名稱 (balance, positions, ...)
+
+        Returns:
+            Any: broker.get_<resource>() 的回傳值
+        """
+        usable, value = self.lookup(resource)
+        if usable:
+            return value
+
+        with self._lock:
+            flight = self._flights.get(resource)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[resource] = flight
+            self.stats_counters['misses'] += 1
+
+        if leader:
+            self._load(resource)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, resource: str) -> None:
+        """向 SDK 載入資料並喚醒等待者 (由持有 flight 的執行緒呼叫)"""
+        with self._lock:
+            flight = self._flights[resource]
+            generation = self._generation
+
+        try:
+            value = getattr(self.broker, f"get_{resource}")()
+            flight.value = value
+            self.stats_counters['loads'] += 1
+            with self._lock:
+                # 載入期間若已失效 (例如剛下單)，結果僅回給本次呼叫者，不寫入快取
+                if generation == self._generation and self.ttls[resource] > 0:
+                    self._entries[resource] = _Entry(value, self._clock(), generation)
+        except Exception as e:
+            flight.error = e
+            self.stats_counters['errors'] += 1
+            logger.warning("Account cache load failed for %s: %s", resource, e)
+        finally:
+            with self._lock:
+                if self._flights.get(resource) is flight:
+                    del self._flights[resource]
+            flight.done.set()
+
+    def invalidate(self, resources: Optional[Iterable[str]] = None) -> None:
+        """
+        使快取失效
+
+        Args:
+            resources: 要失效的資源，None 表示全部
+        """
+        with self._lock:
+            self._generation += 1
+            if resources is None:
+                self._entries.clear()
+            else:
+                for resource in resources:
+                    self._entries.pop(resource, None)
+            self.stats_counters['invalidations'] += 1
+        logger.debug("Account cache invalidated: %s", resources or "all")
+
+    def stats(self) -> Dict[str, Any]:
+        """取得快取統計資訊"""
+        counters = dict(self.stats_counters)
+        lookups = counters['hits'] + counters['stale_hits'] + counters['misses']
+        counters['hit_ratio'] = (
+            round((counters['hits'] + counters['stale_hits']) / lookups, 4)
+            if lookups else 0.0
+        )
+        counters['cached_resources'] = sorted(self._entries.keys())
+        return counters
@@ -0,0 +1,227 @@
+"""
+Intraday Bar Builder
+盤中 K 線即時聚合
+
+由訂閱報價的 tick 串流增量維護各股票的 1m/5m/15m/30m/1h OHLCV K 線，
+取代每次向 SDK 查詢整日的盤中資料。每個 (股票, 週期) 以預先配置的
+環狀緩衝保存最近的 K 線；每次更新都會編上遞增版本號，客戶端以
+since 游標只取回新增或更新過的 K 線。
+"""
+
+import threading
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ticks import parse_tick
+
+# 支援的週期 (秒)
+DEFAULT_INTERVALS: Dict[str, int] = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600
+}
+
+# 週期別名 (與歷史行情 API 的寫法一致)
+INTERVAL_ALIASES: Dict[str, str] = {
+    '1': '1m',
+    '5': '5m',
+    '15': '15m',
+    '30': '30m',
+    '60': '1h'
+}
+
+# 每個 (股票, 週期) 保留的 K 線數量 (台股一日 270 分鐘)
+DEFAULT_CAPACITY = 300
+
+
+def normalize_interval(interval: str) -> str:
+    """將週期別名轉為標準寫法"""
+    return INTERVAL_ALIASES.get(interval, interval)
+
+
+class _BarRing:
+    """單一 (股票, 週期) 的 K 線環狀緩衝 (欄式儲存)"""
+
+    __slots__ = ('capacity', 'count', 'end', 'start', 'open', 'high', 'low',
+                 'close', 'volume', 'version')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self.end = 0  # 下一筆寫入位置
+        self.start = array('q', bytes(8 * capacity))
+        self.open = array('d', bytes(8 * capacity))
+        self.high = array('d', bytes(8 * capacity))
+        self.low = array('d', bytes(8 * capacity))
+        self.close = array('d', bytes(8 * capacity))
+        self.volume = array('d', bytes(8 * capacity))
+        self.version = array('q', bytes(8 * capacity))
+
+    def update(self, bucket: int, price: float, volume: float, version: int) -> bool:
+        """
+        將一筆成交併入 K 線
+
+        Returns:
+            bool: 是否採用 (早於最新 K 線的延遲成交不採用)
+        """
+        last = (self.end - 1) % self.capacity
+        if self.count and self.start[last] == bucket:
+            if price > self.high[last]:
+                self.high[last] = price
+            if price < self.low[last]:
+                self.low[last] = price
+            self.close[last] = price
+            self.volume[last] += volume
+            self.version[last] = version
+            return True
+        if self.count and bucket < self.start[last]:
+            return False
+
+        i = self.end
+        self.start[i] = bucket
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = volume
+        self.version[i] = version
+        self.end = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        return True
+
+    def since(self, version: int) -> List[Dict[str, Any]]:
+        """取得版本號大於 version 的 K 線 (由舊到新)"""
+        bars = []
+        i = self.end
+        for _ in range(self.count):
+            i = (i - 1) % self.capacity
+            # 只有最新一根會被更新，版本號由舊到新遞增，可提前結束
+            if self.version[i] <= version:
+                break
+            bars.append({
+                'time': datetime.fromtimestamp(self.start[i]).isoformat(),
+                'timestamp': self.start[i],
+                'open': self.open[i],
+                'high': self.high[i],
+                'low': self.low[i],
+                'close': self.close[i],
+                'volume': self.volume[i],
+                'version': self.version[i]
+            })
+        bars.reverse()
+        return bars
+
+
+class BarBuilder:
+    """
+    盤中 K 線聚合器 (執行緒安全)
+
+    on_quote 可直接作為 broker 的報價回調 (於 SDK 執行緒呼叫)。
+    """
+
+    def __init__(
+        self,
+        intervals: Optional[Dict[str, int]] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        max_symbols: Optional[int] = None
+    ):
+        """
+        初始化聚合器
+
+        Args:
+            intervals: 週期名稱與秒數
+            capacity: 每個 (股票, 週期) 保留的 K 線數量
+            max_symbols: 最多追蹤的股票數量 (None 表示不限)
+        """
+        self.intervals = dict(intervals or DEFAULT_INTERVALS)
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.version = 0
+        self._rings: Dict[str, Dict[str, _BarRing]] = {}
+        self._last_total: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.late_ticks = 0
+        self.skipped = 0
+
+    def on_quote(self, symbol: str, quote: Any) -> None:
+        """
+        併入一筆報價
+
+        會話的報價監聽者只經由報價中樞註冊一次，每筆報價只會送達一次。
+
+        Args:
+            symbol: 股票代號
+            quote: 報價 dict
+        """
+        tick = parse_tick(quote)
+        if tick is None:
+            self.skipped += 1
+            return
+
+        with self._lock:
+            rings = self._rings.get(symbol)
+            if rings is None:
+                if self.max_symbols is not None and len(self._rings) >= self.max_symbols:
+                    self.skipped += 1
+                    return
+                rings = {name: _BarRing(self.capacity) for name in self.intervals}
+                self._rings[symbol] = rings
+
+            volume = tick.volume
+            if tick.total_volume is not None:
+                previous = self._last_total.get(symbol)
+                if previous is not None and tick.total_volume >= previous:
+                    volume = tick.total_volume - previous
+                self._last_total[symbol] = tick.total_volume
+
+            self.version += 1
+            self.ticks += 1
+            ts = int(tick.ts)
+            for name, seconds in self.intervals.items():
+                if not rings[name].update(ts - ts % seconds, tick.price, volume, self.version):
+                    self.late_ticks += 1
+
+    def has_symbol(self, symbol: str) -> bool:
+        """是否已有該股票的 K 線"""
+        return symbol in self._rings
+
+    def bars(
+        self,
+        symbol: str,
+        interval: str = '1m',
+        since: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        取得 K 線
+
+        Args:
+            symbol: 股票代號
+            interval: 週期 (1m/5m/15m/30m/1h 或 1/5/15/30/60)
+            since: 上次取得的游標，只回傳之後新增或更新的 K 線
+
+        Returns:
+            tuple: (K 線列表, 新游標)
+
+        Raises:
+            ValueError: 不支援的週期
+        """
+        interval = normalize_interval(interval)
+        if interval not in self.intervals:
+            raise ValueError(f"Unsupported interval: {interval}")
+        with self._lock:
+            rings = self._rings.get(symbol)
+            if rings is None:
+                return [], self.version
+            return rings[interval].since(since or 0), self.version
+
+    def stats(self) -> Dict[str, Any]:
+        """取得聚合器統計資訊"""
+        return {
+            'symbols': len(self._rings),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'skipped': self.skipped,
+            'version': self.version,
+            'memory_bytes': len(self._rings) * len(self.intervals) * self.capacity * 8 * 7
+        }
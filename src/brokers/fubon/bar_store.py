@@ -0,0 +1,342 @@
+"""
+Historical Bar Store
+歷史 K 線本地儲存
+
+以 (股票代號, 週期) 為單位將 K 線以欄式格式存放於磁碟：每個欄位
+(時間、開高低收、成交量) 各為一個原生 typed array 檔案，讀取時以
+mmap 映射後用 memoryview 存取，範圍查詢以二分搜尋定位，不需載入整個檔案。
+
+另記錄已向券商查詢過的日期區間，再次查詢時只下載缺少的區間並合併，
+重複載入圖表或回測多年資料時可直接由本地讀取。當日資料尚未收盤，
+不會標記為已查詢，每次都會重新向券商取得。
+
+檔案使用本機位元組順序，僅作為本機快取使用。
+"""
+
+import calendar
+import json
+import logging
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 欄位名稱與 array typecode
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('ts', 'q'),
+    ('open', 'd'),
+    ('high', 'd'),
+    ('low', 'd'),
+    ('close', 'd'),
+    ('volume', 'd')
+)
+
+# 未指定開始日期時往前查詢的天數
+DEFAULT_LOOKBACK_DAYS = 365
+
+_DAY = 86400
+_EPOCH = datetime(1970, 1, 1)
+_TIME_KEYS = ('date', 'datetime', 'time', 'timestamp')
+
+Range = Tuple[int, int]
+
+
+def _date_to_ts(value: date) -> int:
+    """日期轉為當日 00:00 (UTC) 的 epoch 秒數"""
+    return calendar.timegm(value.timetuple()[:3] + (0, 0, 0))
+
+
+def _parse_time(value: Any) -> int:
+    """將 K 線時間欄位 (日期字串、datetime 或 epoch) 轉為 epoch 秒數"""
+    if isinstance(value, datetime):
+        return calendar.timegm(value.timetuple())
+    if isinstance(value, date):
+        return _date_to_ts(value)
+    if isinstance(value, (int, float)):
+        # 毫秒時間戳
+        return int(value / 1000) if value > 1e11 else int(value)
+    text = str(value).strip().replace('/', '-')
+    if len(text) <= 10:
+        return _date_to_ts(datetime.strptime(text, '%Y-%m-%d').date())
+    parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        return int(parsed.timestamp())
+    return calendar.timegm(parsed.timetuple())
+
+
+def _format_time(ts: int, daily: bool) -> str:
+    moment = _EPOCH + timedelta(seconds=ts)
+    return moment.strftime('%Y-%m-%d') if daily else moment.isoformat()
+
+
+def _safe_name(value: str) -> str:
+    """將代號轉為可安全作為目錄名稱的字串"""
+    return ''.join(c if c.isalnum() or c in '-_' else '_' for c in value)
+
+
+def subtract_ranges(start: int, end: int, covered: Iterable[Range]) -> List[Range]:
+    """
+    計算 [start, end] 中尚未被 covered 涵蓋的區間
+
+    Args:
+        start: 開始時間 (含)
+        end: 結束時間 (含)
+        covered: 已涵蓋的區間列表 (已排序且不重疊)
+
+    Returns:
+        List[Range]: 缺少的區間
+    """
+    gaps: List[Range] = []
+    cursor = start
+    for lo, hi in covered:
+        if hi < cursor:
+            continue
+        if lo > end:
+            break
+        if lo > cursor:
+            gaps.append((cursor, lo - 1))
+        cursor = max(cursor, hi + 1)
+        if cursor > end:
+            break
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge_ranges(ranges: Iterable[Range]) -> List[Range]:
+    """合併重疊或相鄰的區間"""
+    merged: List[List[int]] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return [(lo, hi) for lo, hi in merged]
+
+
+class _Series:
+    """單一 (股票代號, 週期) 的檔案位置"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def path(self, column: str) -> str:
+        return os.path.join(self.directory, f'{column}.bin')
+
+    @property
+    def coverage_path(self) -> str:
+        return os.path.join(self.directory, 'coverage.json')
+
+
+class BarStore:
+    """
+    歷史 K 線本地儲存
+
+    執行緒安全：同一 (股票代號, 週期) 的讀寫以鎖保護，
+    不同股票可並行查詢。
+    """
+
+    def __init__(self, root: str, today: Callable[[], date] = date.today):
+        """
+        初始化儲存
+
+        Args:
+            root: 儲存目錄
+            today: 取得今日日期的函式 (測試用)
+        """
+        self.root = root
+        self._today = today
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+        self.stats_counters = {'requests': 0, 'local_hits': 0, 'fetches': 0, 'bars_fetched': 0}
+
+    def _get_series(self, symbol: str, interval: str) -> _Series:
+        key = (symbol, interval)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = _Series(os.path.join(self.root, _safe_name(interval), _safe_name(symbol)))
+                self._series[key] = series
+            return series
+
+    # ===== 磁碟讀寫 =====
+
+    def _load_coverage(self, series: _Series) -> List[Range]:
+        try:
+            with open(series.coverage_path, 'r', encoding='utf-8') as f:
+                return [tuple(r) for r in json.load(f)]
+        except FileNotFoundError:
+            return []
+
+    def _read_columns(self, series: _Series) -> Dict[str, array]:
+        """將所有欄位讀入記憶體 (合併寫入時使用)"""
+        columns = {}
+        for name, typecode in COLUMNS:
+            values = array(typecode)
+            try:
+                with open(series.path(name), 'rb') as f:
+                    values.frombytes(f.read())
+            except FileNotFoundError:
+                pass
+            columns[name] = values
+        return columns
+
+    def _write(self, series: _Series, columns: Dict[str, array], coverage: List[Range]) -> None:
+        """以暫存檔寫入後替換，避免讀取到寫到一半的檔案"""
+        os.makedirs(series.directory, exist_ok=True)
+        for name, _ in COLUMNS:
+            tmp = series.path(name) + '.tmp'
+            with open(tmp, 'wb') as f:
+                columns[name].tofile(f)
+            os.replace(tmp, series.path(name))
+        tmp = series.coverage_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump([list(r) for r in coverage], f)
+        os.replace(tmp, series.coverage_path)
+
+    def _merge(self, series: _Series, records: List[Dict[str, Any]], covered: List[Range]) -> int:
+        """將新資料依時間合併 (同一時間以新資料為準) 並寫回磁碟"""
+        existing = self._read_columns(series)
+        rows: Dict[int, Tuple[float, ...]] = {
+            ts: tuple(existing[name][i] for name, _ in COLUMNS[1:])
+            for i, ts in enumerate(existing['ts'])
+        }
+        added = 0
+        for record in records:
+            time_value = next((record[k] for k in _TIME_KEYS if record.get(k) is not None), None)
+            if time_value is None:
+                continue
+            rows[_parse_time(time_value)] = tuple(
+                float(record.get(name) or 0) for name, _ in COLUMNS[1:]
+            )
+            added += 1
+
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        for ts in sorted(rows):
+            columns['ts'].append(ts)
+            for (name, _), value in zip(COLUMNS[1:], rows[ts]):
+                columns[name].append(value)
+
+        coverage = merge_ranges(self._load_coverage(series) + covered)
+        self._write(series, columns, coverage)
+        return added
+
+    def _query(self, series: _Series, start: int, end: int, daily: bool) -> List[Dict[str, Any]]:
+        """以 mmap 映射時間欄位，二分搜尋後只讀取範圍內的資料"""
+        ts_path = series.path('ts')
+        if not os.path.exists(ts_path) or os.path.getsize(ts_path) == 0:
+            return []
+
+        maps: List[mmap.mmap] = []
+        buffers: List[memoryview] = []
+        try:
+            views = {}
+            for name, typecode in COLUMNS:
+                with open(series.path(name), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                maps.append(mapped)
+                raw = memoryview(mapped)
+                views[name] = raw.cast(typecode)
+                buffers.extend((views[name], raw))
+
+            timestamps = views['ts']
+            lo = bisect_left(timestamps, start)
+            hi = bisect_right(timestamps, end)
+            slices = {name: view[lo:hi].tolist() for name, view in views.items()}
+        finally:
+            # 需先釋放 memoryview 才能關閉 mmap
+            for buffer in buffers:
+                buffer.release()
+            for mapped in maps:
+                mapped.close()
+
+        key = 'date' if daily else 'datetime'
+        return [
+            {
+                key: _format_time(ts, daily),
+                'open': o, 'high': h, 'low': l, 'close': c, 'volume': v
+            }
+            for ts, o, h, l, c, v in zip(
+                slices['ts'], slices['open'], slices['high'],
+                slices['low'], slices['close'], slices['volume']
+            )
+        ]
+
+    # ===== 公開介面 =====
+
+    def get_range(
+        self,
+        symbol: str,
+        interval: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        fetch: Callable[[str, str], Any],
+        daily: bool = True
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        取得區間內的 K 線，只向券商查詢本地缺少的日期
+
+        Args:
+            symbol: 股票代號
+            interval: 週期
+            start_date: 開始日期 (YYYY-MM-DD)，None 表示往前 DEFAULT_LOOKBACK_DAYS 天
+            end_date: 結束日期 (YYYY-MM-DD)，None 表示今日
+            fetch: 向券商查詢的函式 fetch(start_date, end_date)，回傳 K 線列表
+            daily: 是否為日線 (影響回傳的時間格式)
+
+        Returns:
+            tuple: (K 線列表, 查詢資訊 {fetched_ranges, local})
+        """
+        today = self._today()
+        end_day = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else today
+        start_day = (
+            datetime.strptime(start_date, '%Y-%m-%d').date() if start_date
+            else end_day - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+        )
+        start = _date_to_ts(start_day)
+        end = _date_to_ts(end_day) + _DAY - 1
+        # 今日 (含) 之後的資料尚未完整，不列入已查詢區間
+        complete_until = _date_to_ts(today) - 1
+
+        series = self._get_series(symbol, interval)
+        with series.lock:
+            self.stats_counters['requests'] += 1
+            gaps = subtract_ranges(start, end, self._load_coverage(series))
+            if gaps:
+                records: List[Dict[str, Any]] = []
+                for lo, hi in gaps:
+                    data = fetch(_format_time(lo, True), _format_time(hi, True))
+                    if hasattr(data, 'to_dict'):
+                        data = data.to_dict('records')
+                    records.extend(data or [])
+                covered = [(lo, min(hi, complete_until)) for lo, hi in gaps if lo <= complete_until]
+                added = self._merge(series, records, covered)
+                self.stats_counters['fetches'] += len(gaps)
+                self.stats_counters['bars_fetched'] += added
+                logger.info(
+                    "Bar store %s/%s: fetched %d range(s), %d bars",
+                    symbol, interval, len(gaps), added
+                )
+            else:
+                self.stats_counters['local_hits'] += 1
+            bars = self._query(series, start, end, daily)
+
+        return bars, {
+            'fetched_ranges': [
+                [_format_time(lo, True), _format_time(hi, True)] for lo, hi in gaps
+            ],
+            'local': not gaps
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """取得儲存統計資訊"""
+        result = dict(self.stats_counters)
+        result['series'] = len(self._series)
+        return result
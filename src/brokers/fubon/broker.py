@@ -7,6 +7,8 @@ import logging
 from typing import Optional, Dict, List, Any, Callable
 from datetime import datetime
 from .constants import Action, PriceType, OrderType, OrderCondition, MarketType
+from .rate_limiter import RequestScheduler, CATEGORY_ORDER, CATEGORY_MARKET, CATEGORY_QUERY
+from .recorder import EventRecorder
 
 
 logger = logging.getLogger(__name__)
@@ -19,9 +21,21 @@ class FubonBroker:
     提供完整的證券交易、行情查詢、帳戶管理功能
     """
     
-    def __init__(self):
-        """初始化 Fubon Broker"""
+    def __init__(
+        self,
+        scheduler: Optional[RequestScheduler] = None,
+        recorder: Optional[EventRecorder] = None
+    ):
+        """
+        初始化 Fubon Broker
+        
+        Args:
+            scheduler: SDK 呼叫排程器 (選填，預設使用 DEFAULT_LIMITS 額度)
+            recorder: 事件錄製器，錄製 SDK 推送的報價與委託事件 (選填)
+        """
         self.sdk = None
+        self.scheduler = scheduler or RequestScheduler()
+        self.recorder = recorder
         self.is_logged_in = False
         self.user_id = None
         self.last_error: Optional[str] = None
@@ -74,9 +88,9 @@ class FubonBroker:
             
             # 使用 person_id 或 user_id (兩者同義)
             personal_id = person_id or user_id
-            logger.info(f"Attempting to login with personal_id: {personal_id}")
-            logger.info(f"cert_path: {cert_path}")
-            logger.info(f"cert_pass provided: {'Yes' if cert_pass else 'No (empty)'}")
+            logger.info("Attempting to login with personal_id: %s", personal_id)
+            logger.info("cert_path: %s", cert_path)
+            logger.info("cert_pass provided: %s", 'Yes' if cert_pass else 'No (empty)')
             
             self.sdk = FubonSDK()
             
@@ -92,12 +106,15 @@ class FubonBroker:
                 self.is_logged_in = True
                 self.user_id = user_id
                 self.last_error = None
-                logger.info(f"Successfully logged in as {personal_id}")
-                logger.info(f"Accounts: {result.data}")
+                # 登入前已設定的委託回調，於 SDK 建立後補註冊
+                if self.order_callbacks:
+                    self.sdk.order.set_callback(self._dispatch_order)
+                logger.info("Successfully logged in as %s", personal_id)
+                logger.info("Accounts: %s", result.data)
                 return True
             else:
                 error_msg = result.message if result else "Unknown error"
-                logger.error(f"Login failed: {error_msg}")
+                logger.error("Login failed: %s", error_msg)
                 self.last_error = error_msg
                 return False
                 
@@ -106,7 +123,7 @@ class FubonBroker:
             self.last_error = "fubon-neo package not installed"
             raise Exception("fubon-neo package not installed. Please install it first.")
         except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+            logger.error("Login error: %s", e)
             self.last_error = str(e)
             raise
     
@@ -126,9 +143,18 @@ class FubonBroker:
                 return True
             return False
         except Exception as e:
-            logger.error(f"Logout error: {str(e)}")
+            logger.error("Logout error: %s", e)
             return False
     
+    def _throttle(self, category: str) -> None:
+        """
+        SDK 呼叫前取得排程額度，額度不足時阻塞等待
+        
+        Args:
+            category: 呼叫類別 (order / market / query)
+        """
+        self.scheduler.acquire(category)
+    
     def _ensure_logged_in(self):
         """確保已登入，否則拋出異常"""
         if not self.is_logged_in:
@@ -146,12 +172,14 @@ class FubonBroker:
             
             if not self.realtime_initialized:
                 self.sdk.init_realtime()
+                # SDK 的所有報價推送統一由 _dispatch_quote 分派給各檔股票的回調
+                self.sdk.quote.set_callback(self._dispatch_quote)
                 self.realtime_initialized = True
                 logger.info("Realtime market data initialized")
             
             return True
         except Exception as e:
-            logger.error(f"Failed to initialize realtime: {str(e)}")
+            logger.error("Failed to initialize realtime: %s", e)
             raise
     
     # ===== 行情查詢功能 =====
@@ -178,6 +206,7 @@ class FubonBroker:
                 self.init_realtime()
             
             # 訂閱報價
+            self._throttle(CATEGORY_MARKET)
             self.sdk.quote.subscribe(symbol)
             
             # 儲存回調函數
@@ -186,19 +215,22 @@ class FubonBroker:
                     self.quote_callbacks[symbol] = []
                 self.quote_callbacks[symbol].append(callback)
             
-            logger.info(f"Subscribed to quote: {symbol}")
+            logger.info("Subscribed to quote: %s", symbol)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to subscribe quote {symbol}: {str(e)}")
+            logger.error("Failed to subscribe quote %s: %s", symbol, e)
             raise
     
-    def unsubscribe_quote(self, symbol: str) -> bool:
+    def unsubscribe_quote(self, symbol: str, callback: Optional[Callable] = None) -> bool:
         """
         取消訂閱即時報價
         
+        指定 callback 時只移除該回調，仍有其他回調時不向 SDK 取消訂閱。
+        
         Args:
             symbol: 股票代號
+            callback: 要移除的回調函數 (None 表示移除全部回調)
         
         Returns:
             bool: 取消訂閱是否成功
@@ -206,19 +238,49 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
-            self.sdk.quote.unsubscribe(symbol)
-            
             # 清除回調函數
-            if symbol in self.quote_callbacks:
-                del self.quote_callbacks[symbol]
+            callbacks = self.quote_callbacks.get(symbol, [])
+            if callback is not None:
+                if callback in callbacks:
+                    callbacks.remove(callback)
+                if callbacks:
+                    logger.debug("Removed quote callback: %s", symbol)
+                    return True
+            self.quote_callbacks.pop(symbol, None)
+            
+            self._throttle(CATEGORY_MARKET)
+            self.sdk.quote.unsubscribe(symbol)
             
-            logger.info(f"Unsubscribed from quote: {symbol}")
+            logger.info("Unsubscribed from quote: %s", symbol)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to unsubscribe quote {symbol}: {str(e)}")
+            logger.error("Failed to unsubscribe quote %s: %s", symbol, e)
             raise
     
+    def _dispatch_quote(self, quote: Dict[str, Any]) -> None:
+        """
+        將 SDK 推送的報價分派給該股票的回調函數
+        
+        於 SDK 的回調執行緒中執行，單一回調的錯誤不影響其他回調。
+        
+        Args:
+            quote: 報價資料 (需包含 symbol / stock_code / code 其中之一)
+        """
+        if self.recorder is not None:
+            self.recorder.record_quote(quote)
+        symbol = quote.get('symbol') or quote.get('stock_code') or quote.get('code')
+        callbacks = self.quote_callbacks.get(symbol)
+        if not callbacks:
+            return
+        
+        # 複製列表，避免分派期間訂閱異動造成迭代錯誤
+        for callback in list(callbacks):
+            try:
+                callback(quote)
+            except Exception as e:
+                logger.error("Quote callback error for %s: %s", symbol, e)
+    
     def get_quote(self, symbol: str) -> Optional[Dict[str, Any]]:
         """
         取得即時報價快照
@@ -232,13 +294,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_MARKET)
             quote = self.sdk.quote.get_quote(symbol)
             
-            logger.debug(f"Retrieved quote for {symbol}")
+            logger.debug("Retrieved quote for %s", symbol)
             return quote
             
         except Exception as e:
-            logger.error(f"Failed to get quote {symbol}: {str(e)}")
+            logger.error("Failed to get quote %s: %s", symbol, e)
             raise
     
     def get_historical_data(
@@ -263,6 +326,7 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_MARKET)
             data = self.sdk.market_data.get_historical_data(
                 symbol=symbol,
                 start_date=start_date,
@@ -270,11 +334,11 @@ class FubonBroker:
                 interval=interval
             )
             
-            logger.info(f"Retrieved historical data for {symbol}")
+            logger.info("Retrieved historical data for %s", symbol)
             return data
             
         except Exception as e:
-            logger.error(f"Failed to get historical data {symbol}: {str(e)}")
+            logger.error("Failed to get historical data %s: %s", symbol, e)
             raise
     
     def get_intraday_data(
@@ -295,16 +359,17 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_MARKET)
             data = self.sdk.market_data.get_intraday(
                 symbol=symbol,
                 interval=interval
             )
             
-            logger.debug(f"Retrieved intraday data for {symbol}")
+            logger.debug("Retrieved intraday data for %s", symbol)
             return data
             
         except Exception as e:
-            logger.error(f"Failed to get intraday data {symbol}: {str(e)}")
+            logger.error("Failed to get intraday data %s: %s", symbol, e)
             raise
     
     # ===== 下單功能 =====
@@ -355,13 +420,14 @@ class FubonBroker:
                 order_params['price'] = price
             
             # 送出委託
+            self._throttle(CATEGORY_ORDER)
             order_result = self.sdk.order.place_order(**order_params)
             
-            logger.info(f"Order placed: {symbol} {action.value} {quantity}@{price}")
+            logger.info("Order placed: %s %s %s@%s", symbol, action.value, quantity, price)
             return order_result
             
         except Exception as e:
-            logger.error(f"Failed to place order: {str(e)}")
+            logger.error("Failed to place order: %s", e)
             raise
     
     def cancel_order(self, order_id: str) -> bool:
@@ -377,13 +443,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_ORDER)
             result = self.sdk.order.cancel_order(order_id)
             
-            logger.info(f"Order cancelled: {order_id}")
+            logger.info("Order cancelled: %s", order_id)
             return result
             
         except Exception as e:
-            logger.error(f"Failed to cancel order {order_id}: {str(e)}")
+            logger.error("Failed to cancel order %s: %s", order_id, e)
             raise
     
     def modify_order(
@@ -413,13 +480,14 @@ class FubonBroker:
             if quantity is not None:
                 modify_params['quantity'] = quantity
             
+            self._throttle(CATEGORY_ORDER)
             result = self.sdk.order.modify_order(**modify_params)
             
-            logger.info(f"Order modified: {order_id}")
+            logger.info("Order modified: %s", order_id)
             return result
             
         except Exception as e:
-            logger.error(f"Failed to modify order {order_id}: {str(e)}")
+            logger.error("Failed to modify order %s: %s", order_id, e)
             raise
     
     def get_orders(
@@ -446,13 +514,14 @@ class FubonBroker:
             if symbol:
                 query_params['symbol'] = symbol
             
+            self._throttle(CATEGORY_QUERY)
             orders = self.sdk.order.get_orders(**query_params)
             
-            logger.debug(f"Retrieved orders: {len(orders)} orders")
+            logger.debug("Retrieved orders: %s orders", len(orders))
             return orders
             
         except Exception as e:
-            logger.error(f"Failed to get orders: {str(e)}")
+            logger.error("Failed to get orders: %s", e)
             raise
     
     def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
@@ -468,13 +537,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             order = self.sdk.order.get_order(order_id)
             
-            logger.debug(f"Retrieved order: {order_id}")
+            logger.debug("Retrieved order: %s", order_id)
             return order
             
         except Exception as e:
-            logger.error(f"Failed to get order {order_id}: {str(e)}")
+            logger.error("Failed to get order %s: %s", order_id, e)
             raise
     
     # ===== 帳戶管理功能 =====
@@ -489,13 +559,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             account_info = self.sdk.get_account()
             
             logger.debug("Retrieved account info")
             return account_info
             
         except Exception as e:
-            logger.error(f"Failed to get account info: {str(e)}")
+            logger.error("Failed to get account info: %s", e)
             raise
     
     def get_balance(self) -> Dict[str, Any]:
@@ -508,13 +579,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             balance = self.sdk.account.get_balance()
             
             logger.debug("Retrieved account balance")
             return balance
             
         except Exception as e:
-            logger.error(f"Failed to get balance: {str(e)}")
+            logger.error("Failed to get balance: %s", e)
             raise
     
     def get_positions(self) -> List[Dict[str, Any]]:
@@ -527,13 +599,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             positions = self.sdk.account.get_positions()
             
-            logger.debug(f"Retrieved positions: {len(positions)} positions")
+            logger.debug("Retrieved positions: %s positions", len(positions))
             return positions
             
         except Exception as e:
-            logger.error(f"Failed to get positions: {str(e)}")
+            logger.error("Failed to get positions: %s", e)
             raise
     
     def get_position(self, symbol: str) -> Optional[Dict[str, Any]]:
@@ -549,13 +622,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             position = self.sdk.account.get_position(symbol)
             
-            logger.debug(f"Retrieved position for {symbol}")
+            logger.debug("Retrieved position for %s", symbol)
             return position
             
         except Exception as e:
-            logger.error(f"Failed to get position {symbol}: {str(e)}")
+            logger.error("Failed to get position %s: %s", symbol, e)
             raise
     
     def get_settlements(self) -> List[Dict[str, Any]]:
@@ -568,13 +642,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             settlements = self.sdk.account.get_settlements()
             
-            logger.debug(f"Retrieved settlements: {len(settlements)} records")
+            logger.debug("Retrieved settlements: %s records", len(settlements))
             return settlements
             
         except Exception as e:
-            logger.error(f"Failed to get settlements: {str(e)}")
+            logger.error("Failed to get settlements: %s", e)
             raise
     
     def get_profit_loss(self) -> Dict[str, Any]:
@@ -587,13 +662,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             pnl = self.sdk.account.get_profit_loss()
             
             logger.debug("Retrieved profit/loss info")
             return pnl
             
         except Exception as e:
-            logger.error(f"Failed to get profit/loss: {str(e)}")
+            logger.error("Failed to get profit/loss: %s", e)
             raise
     
     # ===== 進階功能 =====
@@ -608,13 +684,14 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             margin_info = self.sdk.account.get_margin_info()
             
             logger.debug("Retrieved margin info")
             return margin_info
             
         except Exception as e:
-            logger.error(f"Failed to get margin info: {str(e)}")
+            logger.error("Failed to get margin info: %s", e)
             raise
     
     def get_buying_power(self) -> float:
@@ -627,29 +704,60 @@ class FubonBroker:
         try:
             self._ensure_logged_in()
             
+            self._throttle(CATEGORY_QUERY)
             buying_power = self.sdk.account.get_buying_power()
             
-            logger.debug(f"Retrieved buying power: {buying_power}")
+            logger.debug("Retrieved buying power: %s", buying_power)
             return buying_power
             
         except Exception as e:
-            logger.error(f"Failed to get buying power: {str(e)}")
+            logger.error("Failed to get buying power: %s", e)
             raise
     
     def set_order_callback(self, callback: Callable) -> None:
         """
         設定委託狀態變更回調函數
         
+        可設定多個回調；SDK 端只註冊一個分派函數 (_dispatch_order)，
+        再由其依序呼叫所有回調。
+        
         Args:
             callback: 回調函數
         """
         self.order_callbacks.append(callback)
         
         if self.sdk:
-            self.sdk.order.set_callback(callback)
+            self.sdk.order.set_callback(self._dispatch_order)
         
         logger.info("Order callback set")
     
+    def remove_order_callback(self, callback: Callable) -> None:
+        """
+        移除委託狀態變更回調函數
+        
+        Args:
+            callback: 先前設定的回調函數
+        """
+        if callback in self.order_callbacks:
+            self.order_callbacks.remove(callback)
+    
+    def _dispatch_order(self, event: Any) -> None:
+        """
+        將 SDK 推送的委託/成交事件分派給所有回調函數
+        
+        於 SDK 的回調執行緒中執行，單一回調的錯誤不影響其他回調。
+        
+        Args:
+            event: 委託或成交事件
+        """
+        if self.recorder is not None:
+            self.recorder.record_order(event)
+        for callback in list(self.order_callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error("Order callback error: %s", e)
+    
     def __enter__(self):
         """Context manager 進入"""
         return self
@@ -1,14 +1,31 @@
 """
 Mock Fubon Broker for Testing
 模擬富邦券商用於測試 API
+
+委託、帳戶與報價由 simulator 模組的模擬交易所撮合產生，
+可離線對 API 與策略做端對端的壓力測試。
 """
 
 import logging
-from typing import Optional, Dict, List, Any
+import random
+import time
+from typing import Optional, Dict, List, Any, Callable
 from datetime import datetime
 
+from .simulator import SimulatedExchange
+from .rate_limiter import RequestScheduler, CATEGORY_ORDER, CATEGORY_MARKET, CATEGORY_QUERY
+from .recorder import EventRecorder
+
 logger = logging.getLogger(__name__)
 
+# 模擬交易所初始參考價
+MOCK_PRICES = {"2330": 600.0, "2317": 105.0}
+MOCK_STOCK_NAMES = {"2330": "台積電", "2317": "鴻海"}
+
+# 模擬帳戶初始現金與持股 {股票代號: (張數, 平均成本)}
+MOCK_INITIAL_CASH = 10_000_000.0
+MOCK_INITIAL_POSITIONS = {"2330": (10, 580.0), "2317": (20, 100.0)}
+
 
 class FubonBroker:
     """
@@ -16,53 +33,127 @@ class FubonBroker:
     實際使用時請替換為真實的 fubon-neo SDK
     """
     
-    def __init__(self):
-        """初始化 Mock Broker"""
+    def __init__(
+        self,
+        exchange: Optional[SimulatedExchange] = None,
+        recorder: Optional[EventRecorder] = None,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        scheduler: Optional[RequestScheduler] = None
+    ):
+        """
+        初始化 Mock Broker
+        
+        Args:
+            exchange: 模擬交易所 (多個 broker 共用時委託會互相撮合)，未指定時各自建立
+            recorder: 事件錄製器，錄製推送的報價與委託事件 (選填)
+            latency: 每次 SDK 呼叫模擬的延遲秒數 (壓力測試用)
+            latency_jitter: 延遲的隨機增量上限秒數
+            scheduler: SDK 呼叫排程器，與真實 broker 相同的額度限制 (選填，未指定時不限制)
+        """
         self.is_logged_in = False
         self.user_id = None
         self.last_error: Optional[str] = None
+        
+        self.exchange = exchange or SimulatedExchange(initial_prices=MOCK_PRICES)
+        self.recorder = recorder
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.scheduler = scheduler
+        self.account = None
+        
+        # 回調函數存儲
+        self.quote_callbacks: Dict[str, List[Callable]] = {}
+        self.order_callbacks: List[Callable] = []
+        
         logger.info("Mock FubonBroker initialized")
     
-    def login(self, user_id: str, password: str, cert_path: str, person_id: Optional[str] = None) -> bool:
+    def _simulate_latency(self, category: Optional[str] = None) -> None:
+        """
+        模擬 SDK 呼叫的網路與券商處理延遲 (阻塞目前執行緒，與真實 SDK 相同)
+
+        Args:
+            category: 呼叫類別 (order / market / query)，設定排程器時先取得額度
+        """
+        if self.scheduler is not None and category is not None:
+            self.scheduler.acquire(category)
+        delay = self.latency
+        if self.latency_jitter:
+            delay += random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            time.sleep(delay)
+    
+    def login(self, user_id: str, password: str, cert_path: str, person_id: Optional[str] = None,
+              cert_pass: str = '') -> bool:
         """模擬登入"""
-        logger.info(f"Mock login with user_id: {user_id}")
+        self._simulate_latency()
+        logger.info("Mock login with user_id: %s", user_id)
         self.is_logged_in = True
         self.user_id = user_id
         self.last_error = None
+        self.account = self.exchange.open_account(
+            user_id, cash=MOCK_INITIAL_CASH, positions=MOCK_INITIAL_POSITIONS
+        )
+        self.account.add_listener(self._dispatch_order)
         return True
     
     def logout(self) -> bool:
         """模擬登出"""
+        self._simulate_latency()
         logger.info("Mock logout")
+        if self.account is not None:
+            self.account.remove_listener(self._dispatch_order)
         self.is_logged_in = False
         self.user_id = None
         self.last_error = None
         return True
     
     # 市場行情功能
-    def subscribe_quote(self, stock_code: str) -> bool:
+    def subscribe_quote(self, stock_code: str, callback: Optional[Callable] = None) -> bool:
         """模擬訂閱報價"""
-        logger.info(f"Mock subscribe quote: {stock_code}")
+        logger.info("Mock subscribe quote: %s", stock_code)
+        self._simulate_latency(CATEGORY_MARKET)
+        if callback:
+            self.quote_callbacks.setdefault(stock_code, []).append(callback)
         return True
     
-    def unsubscribe_quote(self, stock_code: str) -> bool:
-        """模擬取消訂閱"""
-        logger.info(f"Mock unsubscribe quote: {stock_code}")
+    def unsubscribe_quote(self, stock_code: str, callback: Optional[Callable] = None) -> bool:
+        """模擬取消訂閱 (指定 callback 時只移除該回調)"""
+        logger.info("Mock unsubscribe quote: %s", stock_code)
+        callbacks = self.quote_callbacks.get(stock_code, [])
+        if callback is not None:
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if callbacks:
+                return True
+        self.quote_callbacks.pop(stock_code, None)
+        self._simulate_latency(CATEGORY_MARKET)
         return True
     
+    def _dispatch_quote(self, quote: Dict[str, Any]) -> None:
+        """模擬 SDK 推送報價 (更新模擬交易所參考價後分派給該股票的回調函數)"""
+        if self.recorder is not None:
+            self.recorder.record_quote(quote)
+        symbol = quote.get('symbol') or quote.get('stock_code') or quote.get('code')
+        price = quote.get('price') or quote.get('close')
+        if symbol and price:
+            self.exchange.update_price(symbol, float(price))
+        for callback in list(self.quote_callbacks.get(symbol, [])):
+            try:
+                callback(quote)
+            except Exception as e:
+                logger.error("Mock quote callback error for %s: %s", symbol, e)
+    
     def get_quote(self, stock_code: str) -> Optional[Dict]:
         """模擬取得報價"""
-        return {
-            "stock_code": stock_code,
-            "price": 600.0,
-            "volume": 1000,
-            "timestamp": datetime.now().isoformat()
-        }
+        self._simulate_latency(CATEGORY_MARKET)
+        return self.exchange.quote(stock_code)
     
     def get_historical_data(self, stock_code: str, interval: str = "D", 
                           start_date: Optional[str] = None, 
                           end_date: Optional[str] = None) -> Optional[List[Dict]]:
         """模擬取得歷史資料"""
+        self._simulate_latency(CATEGORY_MARKET)
         return [
             {
                 "date": "2024-01-01",
@@ -76,71 +167,99 @@ class FubonBroker:
     
     def get_intraday_data(self, stock_code: str) -> Optional[Dict]:
         """模擬取得盤中資料"""
+        self._simulate_latency(CATEGORY_MARKET)
+        quote = self.exchange.quote(stock_code)
         return {
             "stock_code": stock_code,
-            "current_price": 600.0,
-            "high": 610.0,
-            "low": 590.0,
-            "volume": 5000
+            "current_price": quote["price"],
+            "high": max(quote["price"], quote["ask"] or quote["price"]),
+            "low": min(quote["price"], quote["bid"] or quote["price"]),
+            "volume": quote["volume"]
         }
     
     # 交易下單功能
+    def _ensure_account(self):
+        """確保已登入 (模擬帳戶於登入時建立)"""
+        if self.account is None:
+            raise Exception("Not logged in. Please call login() first.")
+        return self.account
+    
     def place_order(self, stock_code: str, action: str, price: Optional[float], 
                    quantity: int, price_type: str = "LMT", 
                    order_type: str = "ROD", order_condition: str = "Cash") -> Dict:
-        """模擬下單"""
-        logger.warning(f"Mock place order: {action} {stock_code} @ {price} x {quantity}")
+        """模擬下單 (由模擬交易所撮合)"""
+        self._simulate_latency(CATEGORY_ORDER)
+        logger.info("Mock place order: %s %s @ %s x %s", action, stock_code, price, quantity)
+        order = self.exchange.place_order(
+            self._ensure_account(), stock_code, action, quantity, price=price,
+            price_type=price_type, order_type=order_type, order_condition=order_condition
+        )
+        if order["status"] == "Rejected":
+            return {
+                "success": False,
+                "order_id": order["order_id"],
+                "message": order["message"]
+            }
         return {
             "success": True,
-            "order_id": f"MOCK_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "order_id": order["order_id"],
+            "status": order["status"],
+            "filled_quantity": order["filled_quantity"],
             "message": "Mock order placed successfully"
         }
     
     def cancel_order(self, order_id: str) -> Dict:
         """模擬取消委託"""
-        logger.info(f"Mock cancel order: {order_id}")
-        return {
-            "success": True,
-            "message": "Mock order cancelled"
-        }
+        self._simulate_latency(CATEGORY_ORDER)
+        logger.info("Mock cancel order: %s", order_id)
+        result = self.exchange.cancel_order(order_id)
+        return {"success": result["success"], "message": result["message"]}
     
     def modify_order(self, order_id: str, price: Optional[float] = None, 
                     quantity: Optional[int] = None) -> Dict:
         """模擬修改委託"""
-        logger.info(f"Mock modify order: {order_id}")
-        return {
-            "success": True,
-            "message": "Mock order modified"
-        }
+        self._simulate_latency(CATEGORY_ORDER)
+        logger.info("Mock modify order: %s", order_id)
+        result = self.exchange.modify_order(order_id, price=price, quantity=quantity)
+        return {"success": result["success"], "message": result["message"]}
+    
+    def set_order_callback(self, callback: Callable) -> None:
+        """設定委託狀態變更回調函數"""
+        self.order_callbacks.append(callback)
+    
+    def remove_order_callback(self, callback: Callable) -> None:
+        """移除委託狀態變更回調函數"""
+        if callback in self.order_callbacks:
+            self.order_callbacks.remove(callback)
+    
+    def _dispatch_order(self, event: Dict[str, Any]) -> None:
+        """模擬 SDK 推送委託事件"""
+        if self.recorder is not None:
+            self.recorder.record_order(event)
+        for callback in list(self.order_callbacks):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error("Mock order callback error: %s", e)
     
     def get_orders(self, status: Optional[str] = None, 
                   stock_code: Optional[str] = None) -> Optional[List[Dict]]:
         """模擬查詢委託"""
-        return [
-            {
-                "order_id": "MOCK_001",
-                "stock_code": "2330",
-                "action": "Buy",
-                "price": 600.0,
-                "quantity": 1,
-                "status": "filled"
-            }
-        ]
+        self._simulate_latency(CATEGORY_QUERY)
+        return self.exchange.get_orders(self._ensure_account(), status=status, symbol=stock_code)
     
     def get_order(self, order_id: str) -> Optional[Dict]:
         """模擬查詢單筆委託"""
-        return {
-            "order_id": order_id,
-            "stock_code": "2330",
-            "action": "Buy",
-            "price": 600.0,
-            "quantity": 1,
-            "status": "filled"
-        }
+        self._simulate_latency(CATEGORY_QUERY)
+        order = self.exchange.get_order(order_id)
+        if order is None or order_id not in self._ensure_account().orders:
+            return None
+        return order
     
     # 帳戶管理功能
     def get_account_info(self) -> Optional[Dict]:
         """模擬取得帳戶資訊"""
+        self._simulate_latency(CATEGORY_QUERY)
         return {
             "account_id": self.user_id,
             "account_type": "Mock Account",
@@ -149,40 +268,21 @@ class FubonBroker:
     
     def get_balance(self) -> Optional[Dict]:
         """模擬取得帳戶餘額"""
-        return {
-            "balance": 1000000.0,
-            "buying_power": 800000.0,
-            "available_balance": 800000.0
-        }
+        self._simulate_latency(CATEGORY_QUERY)
+        return self.exchange.balance(self._ensure_account())
     
     def get_buying_power(self) -> Optional[float]:
         """模擬取得購買力"""
-        return 800000.0
+        self._simulate_latency(CATEGORY_QUERY)
+        return self.exchange.balance(self._ensure_account())["buying_power"]
     
     def get_positions(self) -> Optional[List[Dict]]:
         """模擬取得持股"""
-        return [
-            {
-                "stock_code": "2330",
-                "stock_name": "台積電",
-                "quantity": 10,
-                "average_cost": 580.0,
-                "current_price": 600.0,
-                "market_value": 6000.0,
-                "profit_loss": 200.0,
-                "profit_loss_pct": 3.45
-            },
-            {
-                "stock_code": "2317",
-                "stock_name": "鴻海",
-                "quantity": 20,
-                "average_cost": 100.0,
-                "current_price": 105.0,
-                "market_value": 2100.0,
-                "profit_loss": 100.0,
-                "profit_loss_pct": 5.0
-            }
-        ]
+        self._simulate_latency(CATEGORY_QUERY)
+        positions = self.exchange.positions(self._ensure_account())
+        for pos in positions:
+            pos["stock_name"] = MOCK_STOCK_NAMES.get(pos["stock_code"], pos["stock_code"])
+        return positions
     
     def get_position(self, stock_code: str) -> Optional[Dict]:
         """模擬取得單一持股"""
@@ -195,6 +295,7 @@ class FubonBroker:
     
     def get_settlements(self) -> Optional[List[Dict]]:
         """模擬取得交割資訊"""
+        self._simulate_latency(CATEGORY_QUERY)
         return [
             {
                 "date": "2024-01-03",
@@ -205,15 +306,12 @@ class FubonBroker:
     
     def get_profit_loss(self) -> Optional[Dict]:
         """模擬取得損益"""
-        return {
-            "realized_profit_loss": 50000.0,
-            "unrealized_profit_loss": 300.0,
-            "total_profit_loss": 50300.0,
-            "return_rate": 5.03
-        }
+        self._simulate_latency(CATEGORY_QUERY)
+        return self.exchange.profit_loss(self._ensure_account())
     
     def get_margin_info(self) -> Optional[Dict]:
         """模擬取得融資融券資訊"""
+        self._simulate_latency(CATEGORY_QUERY)
         return {
             "margin_limit": 500000.0,
             "margin_used": 0.0,
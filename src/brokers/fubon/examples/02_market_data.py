@@ -8,6 +8,7 @@ import logging
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from fubon.broker import FubonBroker
+from fubon import indicators
 
 # 載入環境變數
 load_dotenv()
@@ -126,12 +127,17 @@ def main():
         logger.info("\n===== 簡單技術分析 =====")
         
         if historical_data and len(historical_data) >= 5:
-            # 計算5日平均價
-            recent_5_days = historical_data[-5:]
-            avg_price = sum(d.get('close', 0) for d in recent_5_days) / 5
+            # 轉為欄式資料後計算指標 (序列與 K 線對齊，暖機期間為 None)
+            columns = indicators.columns_from_records(historical_data)
+            avg_price = indicators.sma(columns['close'], 5)[-1]
             logger.info(f"{symbol} 5日平均價: {avg_price:.2f}")
             
+            rsi = indicators.rsi(columns['close'], 14)[-1]
+            if rsi is not None:
+                logger.info(f"{symbol} RSI(14): {rsi:.2f}")
+            
             # 計算漲跌
+            recent_5_days = historical_data[-5:]
             first_close = recent_5_days[0].get('close', 0)
             last_close = recent_5_days[-1].get('close', 0)
             change = last_close - first_close
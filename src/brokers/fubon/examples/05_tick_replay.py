@@ -0,0 +1,96 @@
+"""
+富邦證券 API 使用範例 - tick 重播
+Tick Replay Example
+
+將錄製的 tick 檔送入 Mock broker 的報價回調，量測分派延遲與吞吐量。
+未指定檔案時會產生一段模擬開盤爆量的 tick 資料。
+
+用法:
+    python 05_tick_replay.py [--speed 10] [tick 檔 ...]
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+
+from fubon.bar_builder import BarBuilder
+from fubon.broker_mock import FubonBroker
+from fubon.replay import TickReplayer, read_tick_file
+from fubon.tick_store import TickStore
+
+# 設定日誌
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def write_opening_burst(directory: str, symbols, seconds: int = 60, peak_rate: int = 200) -> list:
+    """
+    產生模擬開盤的 tick 檔 (開盤前幾秒成交最密集，之後逐漸趨緩)
+
+    Returns:
+        list: 產生的檔案路徑
+    """
+    rng = random.Random(42)
+    start = 1_700_000_000
+    paths = []
+    for symbol in symbols:
+        price = rng.uniform(50, 600)
+        path = os.path.join(directory, f'{symbol}.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            for second in range(seconds):
+                rate = max(int(peak_rate / (1 + second / 5)), 1)
+                for i in range(rate):
+                    price = max(price * (1 + rng.gauss(0, 0.0005)), 1)
+                    f.write(json.dumps({
+                        'timestamp': start + second + i / rate,
+                        'price': round(price, 2),
+                        'volume': rng.randint(1, 20)
+                    }) + '\n')
+        paths.append(path)
+    return paths
+
+
+def main():
+    """tick 重播範例"""
+    parser = argparse.ArgumentParser(description='Replay recorded ticks into the mock broker')
+    parser.add_argument('files', nargs='*', help='tick 檔 (CSV 或 JSON Lines)')
+    parser.add_argument('--speed', type=float, default=0, help='播放倍速 (0=最快速度)')
+    args = parser.parse_args()
+
+    broker = FubonBroker()
+    broker.login('replay', '', '')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.files or write_opening_burst(tmp, ['2330', '2317', '2454', '2412'])
+        sources = [read_tick_file(path) for path in paths]
+
+        # 下游消費者: 盤中 K 線與 tick 儲存
+        bar_builder = BarBuilder()
+        tick_store = TickStore()
+        symbols = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+        for symbol in symbols:
+            broker.subscribe_quote(symbol, lambda quote, s=symbol: bar_builder.on_quote(s, quote))
+            broker.subscribe_quote(symbol, lambda quote, s=symbol: tick_store.on_quote(s, quote))
+
+        logger.info(f"重播 {len(paths)} 個檔案，倍速: {args.speed or '最快'}")
+        stats = TickReplayer(broker._dispatch_quote, sources, speed=args.speed).run()
+
+    logger.info(f"tick 數: {stats['ticks']}，耗時: {stats['elapsed_seconds']} 秒")
+    logger.info(f"吞吐量: {stats['ticks_per_second']} ticks/s")
+    logger.info(f"分派延遲: {stats['dispatch_latency']}")
+    if stats['schedule_lag']['count']:
+        logger.info(f"排程延遲: {stats['schedule_lag']}")
+    logger.info(f"K 線聚合: {bar_builder.stats()}")
+    logger.info(f"tick 儲存: {tick_store.stats()}")
+    logger.info(f"模擬報價: {broker.get_quote(symbols[0])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Technical Indicators
+技術指標計算
+
+提供 SMA / EMA / VWAP / RSI / MACD / 布林通道 / ATR 與滾動統計 (標準差、
+最高、最低)。每個指標都有增量版本 (每根新 K 線呼叫一次 update，O(1))，
+批次函式則以同一份增量實作對整欄資料做單次線性掃描，兩者結果一致。
+
+輸入為欄式資料 (list 或 array)，可由 columns_from_records 從
+get_historical_data / get_intraday_data 的結果轉換。暖機期間
+(資料不足一個週期) 的輸出為 None。
+"""
+
+import math
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+Series = List[Optional[float]]
+
+# K 線欄位
+BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def columns_from_records(records: Iterable[Dict[str, Any]]) -> Dict[str, array]:
+    """
+    將 K 線 dict 列表轉為欄式資料
+
+    Args:
+        records: K 線列表 (含 open/high/low/close/volume)
+
+    Returns:
+        Dict[str, array]: 各欄位的 float64 陣列
+    """
+    columns = {name: array('d') for name in BAR_FIELDS}
+    for record in records:
+        for name in BAR_FIELDS:
+            columns[name].append(float(record.get(name) or 0))
+    return columns
+
+
+# ===== 增量指標 =====
+
+class SMA:
+    """簡單移動平均"""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self._window: deque = deque()
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        self._window.append(x)
+        self._sum += x
+        if len(self._window) > self.period:
+            self._sum -= self._window.popleft()
+        if len(self._window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+
+class EMA:
+    """指數移動平均 (以前 period 筆的 SMA 作為起始值)"""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self._seed = SMA(period)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self.value is None:
+            self.value = self._seed.update(x)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingStats:
+    """滾動平均、標準差 (母體)、最高與最低"""
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self._window: deque = deque()
+        self._sum = 0.0
+        self._sumsq = 0.0
+        # 單調佇列 (索引, 值)，維持區間最高/最低
+        self._max: deque = deque()
+        self._min: deque = deque()
+        self._count = 0
+        self.mean: Optional[float] = None
+        self.std: Optional[float] = None
+        self.max: Optional[float] = None
+        self.min: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        i = self._count
+        self._count += 1
+        self._window.append(x)
+        self._sum += x
+        self._sumsq += x * x
+        if len(self._window) > self.period:
+            old = self._window.popleft()
+            self._sum -= old
+            self._sumsq -= old * old
+
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((i, x))
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((i, x))
+        if self._max[0][0] <= i - self.period:
+            self._max.popleft()
+        if self._min[0][0] <= i - self.period:
+            self._min.popleft()
+
+        if len(self._window) == self.period:
+            self.mean = self._sum / self.period
+            self.std = math.sqrt(max(self._sumsq / self.period - self.mean * self.mean, 0.0))
+            self.max = self._max[0][1]
+            self.min = self._min[0][1]
+        return self.std
+
+
+class Bollinger:
+    """布林通道 (中軌為 SMA，上下軌為中軌 ± k 倍標準差)"""
+
+    def __init__(self, period: int = 20, k: float = 2.0):
+        self.k = k
+        self._stats = RollingStats(period)
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def update(self, x: float) -> Optional[Tuple[float, float, float]]:
+        """回傳 (中軌, 上軌, 下軌)"""
+        std = self._stats.update(x)
+        if std is not None:
+            mid = self._stats.mean
+            self.value = (mid, mid + self.k * std, mid - self.k * std)
+        return self.value
+
+
+class RSI:
+    """相對強弱指標 (Wilder 平滑)"""
+
+    def __init__(self, period: int = 14):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self._prev: Optional[float] = None
+        self._gain = 0.0
+        self._loss = 0.0
+        self._count = 0
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> Optional[float]:
+        if self._prev is None:
+            self._prev = x
+            return None
+        change = x - self._prev
+        self._prev = x
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        self._count += 1
+        if self._count <= self.period:
+            self._gain += gain / self.period
+            self._loss += loss / self.period
+            if self._count < self.period:
+                return None
+        else:
+            self._gain = (self._gain * (self.period - 1) + gain) / self.period
+            self._loss = (self._loss * (self.period - 1) + loss) / self.period
+        if self._loss == 0:
+            self.value = 100.0 if self._gain > 0 else 50.0
+        else:
+            self.value = 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+        return self.value
+
+
+class MACD:
+    """MACD (快慢 EMA 差、訊號線與柱狀體)"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if fast >= slow:
+            raise ValueError("fast period must be shorter than slow period")
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+        self.value: Optional[Tuple[float, Optional[float], Optional[float]]] = None
+
+    def update(self, x: float) -> Optional[Tuple[float, Optional[float], Optional[float]]]:
+        """回傳 (MACD, 訊號線, 柱狀體)；訊號線暖機期間後兩者為 None"""
+        fast = self._fast.update(x)
+        slow = self._slow.update(x)
+        if fast is None or slow is None:
+            return None
+        line = fast - slow
+        signal = self._signal.update(line)
+        self.value = (line, signal, line - signal if signal is not None else None)
+        return self.value
+
+
+class ATR:
+    """平均真實區間 (Wilder 平滑)"""
+
+    def __init__(self, period: int = 14):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self._prev_close: Optional[float] = None
+        self._count = 0
+        self._sum = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> Optional[float]:
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self._count += 1
+        if self.value is None:
+            self._sum += true_range
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + true_range) / self.period
+        return self.value
+
+
+class VWAP:
+    """成交量加權平均價 (以典型價 (高+低+收)/3 累計)"""
+
+    def __init__(self):
+        self._pv = 0.0
+        self._volume = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float, volume: float) -> Optional[float]:
+        self._pv += (high + low + close) / 3.0 * volume
+        self._volume += volume
+        if self._volume > 0:
+            self.value = self._pv / self._volume
+        return self.value
+
+
+# ===== 批次計算 =====
+
+def sma(values: Sequence[float], period: int) -> Series:
+    """簡單移動平均"""
+    indicator = SMA(period)
+    return [indicator.update(x) for x in values]
+
+
+def ema(values: Sequence[float], period: int) -> Series:
+    """指數移動平均"""
+    indicator = EMA(period)
+    return [indicator.update(x) for x in values]
+
+
+def rsi(values: Sequence[float], period: int = 14) -> Series:
+    """相對強弱指標"""
+    indicator = RSI(period)
+    return [indicator.update(x) for x in values]
+
+
+def rolling(values: Sequence[float], period: int) -> Dict[str, Series]:
+    """滾動統計，回傳 mean / std / max / min 四欄"""
+    indicator = RollingStats(period)
+    result: Dict[str, Series] = {'mean': [], 'std': [], 'max': [], 'min': []}
+    for x in values:
+        indicator.update(x)
+        result['mean'].append(indicator.mean)
+        result['std'].append(indicator.std)
+        result['max'].append(indicator.max)
+        result['min'].append(indicator.min)
+    return result
+
+
+def bollinger(values: Sequence[float], period: int = 20, k: float = 2.0) -> Dict[str, Series]:
+    """布林通道，回傳 mid / upper / lower 三欄"""
+    indicator = Bollinger(period, k)
+    result: Dict[str, Series] = {'mid': [], 'upper': [], 'lower': []}
+    for x in values:
+        band = indicator.update(x)
+        for name, value in zip(('mid', 'upper', 'lower'), band or (None, None, None)):
+            result[name].append(value)
+    return result
+
+
+def macd(values: Sequence[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, Series]:
+    """MACD，回傳 macd / signal / histogram 三欄"""
+    indicator = MACD(fast, slow, signal)
+    result: Dict[str, Series] = {'macd': [], 'signal': [], 'histogram': []}
+    for x in values:
+        output = indicator.update(x)
+        for name, value in zip(('macd', 'signal', 'histogram'), output or (None, None, None)):
+            result[name].append(value)
+    return result
+
+
+def atr(high: Sequence[float], low: Sequence[float], close: Sequence[float], period: int = 14) -> Series:
+    """平均真實區間"""
+    indicator = ATR(period)
+    return [indicator.update(h, l, c) for h, l, c in zip(high, low, close)]
+
+
+def vwap(
+    high: Sequence[float],
+    low: Sequence[float],
+    close: Sequence[float],
+    volume: Sequence[float]
+) -> Series:
+    """成交量加權平均價"""
+    indicator = VWAP()
+    return [indicator.update(h, l, c, v) for h, l, c, v in zip(high, low, close, volume)]
+
+
+# ===== 指標規格 =====
+
+# 指標名稱: (計算函式, 預設參數)
+_SPECS: Dict[str, Tuple[Callable[..., Any], Tuple[float, ...]]] = {
+    'sma': (lambda c, p: sma(c['close'], int(p)), (20,)),
+    'ema': (lambda c, p: ema(c['close'], int(p)), (20,)),
+    'rsi': (lambda c, p: rsi(c['close'], int(p)), (14,)),
+    'macd': (lambda c, f, s, g: macd(c['close'], int(f), int(s), int(g)), (12, 26, 9)),
+    'bbands': (lambda c, p, k: bollinger(c['close'], int(p), k), (20, 2.0)),
+    'atr': (lambda c, p: atr(c['high'], c['low'], c['close'], int(p)), (14,)),
+    'vwap': (lambda c: vwap(c['high'], c['low'], c['close'], c['volume']), ()),
+    'rolling': (lambda c, p: rolling(c['close'], int(p)), (20,))
+}
+
+SUPPORTED_INDICATORS = tuple(_SPECS)
+
+
+def compute(spec: str, columns: Dict[str, Sequence[float]]) -> Any:
+    """
+    依規格字串計算指標
+
+    規格格式為「名稱:參數1:參數2」，省略的參數使用預設值，例如
+    sma:5、ema:12、rsi、macd:12:26:9、bbands:20:2、atr:14、vwap、rolling:20。
+
+    Args:
+        spec: 指標規格
+        columns: 欄式 K 線資料 (open/high/low/close/volume)
+
+    Returns:
+        Series 或 Dict[str, Series]: 與輸入等長的指標序列
+
+    Raises:
+        ValueError: 不支援的指標或參數錯誤
+    """
+    name, *raw_args = spec.strip().lower().split(':')
+    if name not in _SPECS:
+        raise ValueError(f"Unsupported indicator: {name}")
+    func, defaults = _SPECS[name]
+    if len(raw_args) > len(defaults):
+        raise ValueError(f"Too many parameters for {name}: {spec}")
+    try:
+        args = [float(a) for a in raw_args] + list(defaults[len(raw_args):])
+    except ValueError:
+        raise ValueError(f"Invalid parameters: {spec}")
+    return func(columns, *args)
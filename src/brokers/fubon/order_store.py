@@ -0,0 +1,277 @@
+"""
+Order State Store
+委託狀態本地索引
+
+以 get_orders 的結果為初始狀態，並由委託回調持續更新，
+依委託編號、股票代號及委託狀態建立索引，讓篩選查詢與單筆查詢
+不必每次都向券商發出請求。定期以 get_orders 的完整結果對帳，
+偵測並修正與券商端的差異。
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .constants import OrderStatus
+
+logger = logging.getLogger(__name__)
+
+
+# 各種狀態寫法 (SDK、Mock、API schema) 對應到 OrderStatus
+_STATUS_ALIASES: Dict[str, OrderStatus] = {}
+for _status in OrderStatus:
+    _STATUS_ALIASES[_status.value.lower()] = _status
+    _STATUS_ALIASES[_status.name.lower()] = _status
+_STATUS_ALIASES['partial_filled'] = OrderStatus.PARTIALLY_FILLED
+_STATUS_ALIASES['canceled'] = OrderStatus.CANCELLED
+
+
+def normalize_status(value: Any) -> Optional[OrderStatus]:
+    """
+    將委託狀態轉為 OrderStatus
+
+    Args:
+        value: 狀態字串或 OrderStatus (大小寫、底線寫法皆可)
+
+    Returns:
+        OrderStatus: 對應狀態，無法辨識時回傳 None
+    """
+    if value is None:
+        return None
+    if isinstance(value, OrderStatus):
+        return value
+    key = str(getattr(value, 'value', value)).strip().lower()
+    return _STATUS_ALIASES.get(key) or _STATUS_ALIASES.get(key.replace('_', ''))
+
+
+def _as_record(order: Any) -> Optional[Dict[str, Any]]:
+    """將委託 (dict 或 SDK 物件) 轉為 dict 副本"""
+    if isinstance(order, dict):
+        return dict(order)
+    if hasattr(order, '__dict__'):
+        return dict(vars(order))
+    return None
+
+
+def order_symbol(order: Dict[str, Any]) -> Optional[str]:
+    """取得委託的股票代號 (相容不同欄位名稱)"""
+    return order.get('symbol') or order.get('stock_code') or order.get('stock_no')
+
+
+class OrderStore:
+    """
+    委託狀態本地索引
+
+    執行緒安全：委託回調於 SDK 執行緒呼叫 apply_event，
+    查詢則由 API 的工作執行緒或 event loop 呼叫。
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        """
+        初始化索引
+
+        Args:
+            clock: 時間來源 (測試用)
+        """
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._orders: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._first_seen: Dict[str, int] = {}
+        self._next_position = 0
+        self._by_symbol: Dict[str, Set[str]] = {}
+        self._by_status: Dict[Optional[OrderStatus], Set[str]] = {}
+        self.version = 0
+        self.last_synced: Optional[float] = None
+        self.stats_counters = {
+            'events': 0,
+            'syncs': 0,
+            'drift_added': 0,
+            'drift_removed': 0,
+            'drift_changed': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def seeded(self) -> bool:
+        """是否已由 get_orders 載入過"""
+        return self.last_synced is not None
+
+    def needs_sync(self, interval: float) -> bool:
+        """距上次對帳是否已超過 interval 秒 (尚未載入時為 True)"""
+        return self.last_synced is None or self._clock() - self.last_synced >= interval
+
+    # ===== 索引維護 =====
+
+    def _unindex(self, order_id: str) -> None:
+        order = self._orders.get(order_id)
+        if order is None:
+            return
+        symbol_ids = self._by_symbol.get(order_symbol(order))
+        if symbol_ids is not None:
+            symbol_ids.discard(order_id)
+            if not symbol_ids:
+                del self._by_symbol[order_symbol(order)]
+        status_ids = self._by_status.get(normalize_status(order.get('status')))
+        if status_ids is not None:
+            status_ids.discard(order_id)
+
+    def _index(self, order_id: str, order: Dict[str, Any]) -> None:
+        self._orders[order_id] = order
+        self._by_symbol.setdefault(order_symbol(order), set()).add(order_id)
+        self._by_status.setdefault(normalize_status(order.get('status')), set()).add(order_id)
+
+    def _put(self, order: Dict[str, Any], version: int) -> None:
+        order_id = str(order['order_id'])
+        self._unindex(order_id)
+        self._index(order_id, order)
+        self._versions[order_id] = version
+        if order_id not in self._first_seen:
+            self._first_seen[order_id] = self._next_position
+            self._next_position += 1
+
+    # ===== 寫入 =====
+
+    def apply_event(self, event: Any) -> None:
+        """
+        套用委託回調事件 (可為部分欄位的更新)
+
+        Args:
+            event: 含 order_id 的委託事件
+        """
+        event = _as_record(event)
+        if event is None or event.get('order_id') is None:
+            return
+        order_id = str(event['order_id'])
+        with self._lock:
+            self.version += 1
+            merged = dict(self._orders.get(order_id, {}))
+            merged.update(event)
+            self._put(merged, self.version)
+            self.stats_counters['events'] += 1
+
+    def sync(self, fetch: Callable[[], Any]) -> Dict[str, int]:
+        """
+        以券商端完整委託列表對帳
+
+        查詢期間收到的回調事件較新，不會被查詢結果覆蓋。
+
+        Args:
+            fetch: 取得完整委託列表的函式 (通常為 broker.get_orders)
+
+        Returns:
+            Dict[str, int]: 本次發現的差異數量 (added / removed / changed)
+        """
+        started_version = self.version
+        orders = fetch()
+        records = orders.to_dict('records') if hasattr(orders, 'to_dict') else list(orders or [])
+        return self.reconcile(records, started_version)
+
+    def reconcile(self, records: Iterable[Dict[str, Any]], since_version: int = 0) -> Dict[str, int]:
+        """
+        以完整委託列表取代本地狀態，並統計差異
+
+        Args:
+            records: 券商端的完整委託列表
+            since_version: 快照開始時的版本；之後才更新的委託保留本地狀態
+
+        Returns:
+            Dict[str, int]: 差異數量 (added / removed / changed)
+        """
+        drift = {'added': 0, 'removed': 0, 'changed': 0}
+        with self._lock:
+            remote = {}
+            for record in map(_as_record, records):
+                if record is not None and record.get('order_id') is not None:
+                    remote[str(record['order_id'])] = record
+            for order_id in list(self._orders):
+                if order_id not in remote and self._versions.get(order_id, 0) <= since_version:
+                    self._unindex(order_id)
+                    del self._orders[order_id]
+                    del self._versions[order_id]
+                    del self._first_seen[order_id]
+                    drift['removed'] += 1
+            for order_id, order in remote.items():
+                if self._versions.get(order_id, 0) > since_version:
+                    continue
+                current = self._orders.get(order_id)
+                if current is None:
+                    drift['added'] += 1
+                elif any(current.get(k) != v for k, v in order.items()):
+                    # 僅比對券商端提供的欄位；回調事件額外帶入的欄位予以保留
+                    drift['changed'] += 1
+                    order = {**current, **order}
+                else:
+                    continue
+                self._put(order, self._versions.get(order_id, 0))
+
+            first_sync = self.last_synced is None
+            self.last_synced = self._clock()
+            self.stats_counters['syncs'] += 1
+            if not first_sync:
+                for key, count in drift.items():
+                    self.stats_counters[f'drift_{key}'] += count
+
+        if not first_sync and any(drift.values()):
+            logger.warning("Order store drift detected: %s", drift)
+        return drift
+
+    # ===== 查詢 =====
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """取得單筆委託 (副本)"""
+        with self._lock:
+            order = self._orders.get(str(order_id))
+            return dict(order) if order is not None else None
+
+    def query(
+        self,
+        status: Any = None,
+        symbol: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        依狀態及股票代號篩選委託
+
+        Args:
+            status: 委託狀態 (OrderStatus 或可辨識的字串)，None 表示不篩選
+            symbol: 股票代號，None 表示不篩選
+
+        Returns:
+            List[Dict]: 符合條件的委託 (副本，依首次出現順序)
+        """
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            if status is not None:
+                normalized = normalize_status(status)
+                if normalized is None:
+                    return []
+                candidates = self._by_status.get(normalized, set())
+            if symbol is not None:
+                symbol_ids = self._by_symbol.get(symbol, set())
+                candidates = (
+                    symbol_ids if candidates is None
+                    else candidates & symbol_ids
+                )
+            if candidates is None:
+                return [dict(o) for o in self._orders.values()]
+            ordered = sorted(candidates, key=self._first_seen.__getitem__)
+            return [dict(self._orders[oid]) for oid in ordered]
+
+    def stats(self) -> Dict[str, Any]:
+        """取得索引統計資訊"""
+        with self._lock:
+            by_status = {
+                (status.value if status else 'Unknown'): len(ids)
+                for status, ids in self._by_status.items()
+                if ids
+            }
+        result = dict(self.stats_counters)
+        result.update({
+            'orders': len(self._orders),
+            'symbols': len(self._by_symbol),
+            'by_status': by_status
+        })
+        return result
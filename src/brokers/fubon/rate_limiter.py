@@ -0,0 +1,261 @@
+"""
+SDK Request Scheduler
+券商 SDK 呼叫排程與速率限制
+
+多個儀表板或批次腳本同時呼叫 SDK 時，瞬間的請求量容易觸發券商端
+的頻率限制而直接失敗。此模組在每次 SDK 呼叫前於用戶端排隊：
+
+- 下單、行情、查詢三類呼叫各有獨立的 token bucket
+- 另有一個所有類別共用的總額度，對應券商端的整體限制
+- 總額度不足時依優先順序放行：下單/刪單優先於行情，行情優先於帳戶查詢
+- 記錄各類別的排隊等待時間
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 呼叫類別
+CATEGORY_ORDER = 'order'
+CATEGORY_MARKET = 'market'
+CATEGORY_QUERY = 'query'
+
+# 各類別的預設額度: (每秒補充數量, 最多累積數量)
+DEFAULT_LIMITS: Dict[str, Tuple[float, int]] = {
+    CATEGORY_ORDER: (10.0, 10),
+    CATEGORY_MARKET: (20.0, 20),
+    CATEGORY_QUERY: (5.0, 5)
+}
+
+# 所有類別共用的預設總額度
+DEFAULT_GLOBAL_LIMIT: Tuple[float, int] = (25.0, 25)
+
+# 各類別的優先順序 (數字越小越優先)
+DEFAULT_PRIORITIES: Dict[str, int] = {
+    CATEGORY_ORDER: 0,
+    CATEGORY_MARKET: 1,
+    CATEGORY_QUERY: 2
+}
+
+
+class TokenBucket:
+    """Token bucket (由 RequestScheduler 持鎖操作，本身不做同步)"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: int, now: float):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(int(burst), 1)
+        self.tokens = float(self.burst)
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        """依經過時間補充 token"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until_available(self) -> float:
+        """距離可取得一個 token 的秒數"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class _Waiter:
+    """排隊中的呼叫"""
+
+    __slots__ = ('priority', 'seq', 'category')
+
+    def __init__(self, priority: int, seq: int, category: str):
+        self.priority = priority
+        self.seq = seq
+        self.category = category
+
+    def key(self) -> Tuple[int, int]:
+        return (self.priority, self.seq)
+
+
+class RequestScheduler:
+    """
+    SDK 呼叫排程器 (執行緒安全)
+
+    呼叫端於 SDK 呼叫前執行 acquire(category)，取得額度後才放行。
+    同時有多個呼叫在等待時，只有「自身類別仍有額度」者中優先順序
+    最高 (同順序則最早排隊) 的呼叫可以取用總額度。
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, int]]] = None,
+        global_limit: Optional[Tuple[float, int]] = DEFAULT_GLOBAL_LIMIT,
+        priorities: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化排程器
+
+        Args:
+            limits: 各類別額度 {類別: (每秒數量, 最多累積數量)}
+            global_limit: 共用總額度，None 表示不限制
+            priorities: 各類別優先順序 (數字越小越優先)
+            clock: 時間來源 (測試用)
+        """
+        self._clock = clock
+        now = clock()
+        self._buckets = {
+            category: TokenBucket(rate, burst, now)
+            for category, (rate, burst) in (limits or DEFAULT_LIMITS).items()
+        }
+        self._global = TokenBucket(*global_limit, now) if global_limit else None
+        self.priorities = dict(DEFAULT_PRIORITIES)
+        self.priorities.update(priorities or {})
+        self._cond = threading.Condition()
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._metrics: Dict[str, Dict[str, float]] = {
+            category: {
+                'acquired': 0,
+                'waited': 0,
+                'timeouts': 0,
+                'total_wait': 0.0,
+                'max_wait': 0.0
+            }
+            for category in self._buckets
+        }
+
+    def _refill(self, now: float) -> None:
+        for bucket in self._buckets.values():
+            bucket.refill(now)
+        if self._global is not None:
+            self._global.refill(now)
+
+    def _global_ready(self) -> bool:
+        return self._global is None or self._global.tokens >= 1
+
+    def _is_next(self, waiter: _Waiter) -> bool:
+        """此呼叫是否可立即取得額度"""
+        if self._buckets[waiter.category].tokens < 1 or not self._global_ready():
+            return False
+        eligible = [
+            w.key() for w in self._waiters
+            if self._buckets[w.category].tokens >= 1
+        ]
+        return waiter.key() == min(eligible)
+
+    def _delay(self, waiter: _Waiter) -> float:
+        """估計下次可能放行前需等待的秒數"""
+        own = self._buckets[waiter.category].time_until_available()
+        shared = self._global.time_until_available() if self._global is not None else 0.0
+        delay = max(own, shared)
+        # 被更高優先的呼叫擋住時，等待其取用額度後的通知
+        return delay if delay > 0 else 0.05
+
+    def acquire(
+        self,
+        category: str,
+        priority: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> float:
+        """
+        取得一次 SDK 呼叫的額度，不足時阻塞等待
+
+        Args:
+            category: 呼叫類別 (order / market / query)
+            priority: 覆寫類別預設的優先順序 (選填)
+            timeout: 最長等待秒數，None 表示一直等待
+
+        Returns:
+            float: 排隊等待的秒數
+
+        Raises:
+            ValueError: 未知的呼叫類別
+            TimeoutError: 超過 timeout 仍未取得額度
+        """
+        if category not in self._buckets:
+            raise ValueError(f"Unknown request category: {category}")
+        if priority is None:
+            priority = self.priorities.get(category, len(self.priorities))
+
+        started = self._clock()
+        with self._cond:
+            self._seq += 1
+            waiter = _Waiter(priority, self._seq, category)
+            self._waiters.append(waiter)
+            blocked = False
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    if self._is_next(waiter):
+                        self._buckets[category].tokens -= 1
+                        if self._global is not None:
+                            self._global.tokens -= 1
+                        break
+
+                    delay = self._delay(waiter)
+                    if timeout is not None:
+                        remaining = started + timeout - now
+                        if remaining <= 0:
+                            self._metrics[category]['timeouts'] += 1
+                            raise TimeoutError(
+                                f"Rate limit wait exceeded {timeout:g}s ({category})"
+                            )
+                        delay = min(delay, remaining)
+                    blocked = True
+                    self._cond.wait(delay)
+            finally:
+                self._waiters.remove(waiter)
+                self._cond.notify_all()
+
+            waited = self._clock() - started if blocked else 0.0
+            metrics = self._metrics[category]
+            metrics['acquired'] += 1
+            if blocked:
+                metrics['waited'] += 1
+                metrics['total_wait'] += waited
+                metrics['max_wait'] = max(metrics['max_wait'], waited)
+
+        if waited >= 1:
+            logger.debug("SDK %s call waited %.3fs for rate limit", category, waited)
+        return waited
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得排程統計資訊
+
+        Returns:
+            Dict: 各類別的額度、取得次數、等待次數與等待時間 (毫秒)
+        """
+        with self._cond:
+            self._refill(self._clock())
+            waiting: Dict[str, int] = {}
+            for w in self._waiters:
+                waiting[w.category] = waiting.get(w.category, 0) + 1
+            categories = {}
+            for category, bucket in self._buckets.items():
+                metrics = self._metrics[category]
+                acquired = metrics['acquired']
+                categories[category] = {
+                    'rate': bucket.rate,
+                    'burst': bucket.burst,
+                    'tokens': round(bucket.tokens, 2),
+                    'priority': self.priorities.get(category),
+                    'acquired': acquired,
+                    'waited': metrics['waited'],
+                    'waiting': waiting.get(category, 0),
+                    'timeouts': metrics['timeouts'],
+                    'avg_wait_ms': round(metrics['total_wait'] / acquired * 1000, 2) if acquired else 0.0,
+                    'max_wait_ms': round(metrics['max_wait'] * 1000, 2)
+                }
+            result: Dict[str, Any] = {'categories': categories}
+            if self._global is not None:
+                result['global'] = {
+                    'rate': self._global.rate,
+                    'burst': self._global.burst,
+                    'tokens': round(self._global.tokens, 2)
+                }
+            return result
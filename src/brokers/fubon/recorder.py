@@ -0,0 +1,406 @@
+"""
+Event Recorder
+報價與委託事件錄製
+
+將 SDK 推送的報價與委託回調事件附加寫入二進位日誌，供事後排查、
+重播與分析。回調執行緒只把事件放入佇列 (不做 I/O，佇列滿時捨棄並計數)，
+由背景寫入執行緒序列化並寫檔。
+
+檔案格式 (位元組順序為 little-endian):
+
+- 區段檔 segment-NNNNNN.log，超過大小上限時換到下一個區段
+  - 檔頭: MAGIC (4 bytes) + 版本 (uint16)
+  - 每筆記錄: 長度 (uint32) + CRC32 (uint32) + 類別 (uint8) + 時間 (float64)
+    + 內容 (JSON，UTF-8)；CRC32 涵蓋類別、時間與內容
+- 索引檔 segment-NNNNNN.idx: 每隔 index_interval 筆記錄一組
+  (時間 float64, 位移 uint64)，讀取時依時間定位，不必從頭掃描
+
+寫到一半的記錄 (程序中止) 在讀取時會因長度或 CRC 不符而停止於該處。
+"""
+
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# 事件類別
+KIND_QUOTE = 1
+KIND_ORDER = 2
+KIND_NAMES = {KIND_QUOTE: 'quote', KIND_ORDER: 'order'}
+
+MAGIC = b'FBRC'
+VERSION = 1
+_FILE_HEADER = struct.Struct('<4sH')
+_RECORD_HEADER = struct.Struct('<IIBd')  # 長度, CRC32, 類別, 時間
+_KIND_TS = struct.Struct('<Bd')
+_INDEX_ENTRY = struct.Struct('<dQ')
+
+# 區段大小上限 (bytes)
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+# 每隔幾筆記錄寫入一筆索引
+DEFAULT_INDEX_INTERVAL = 256
+# 佇列容量 (超過時捨棄事件)
+DEFAULT_QUEUE_SIZE = 100_000
+# 寫入後多久 flush 一次 (秒)
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+_SEGMENT_PREFIX = 'segment-'
+
+_STOP = object()
+
+
+class Record(NamedTuple):
+    """一筆錄製事件"""
+    kind: int
+    ts: float  # 收到事件的 epoch 秒數
+    payload: Any
+
+
+def _default(value: Any) -> Any:
+    """JSON 序列化無法處理的型別 (SDK 物件、列舉、日期)"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return str(value)
+
+
+def _segment_name(number: int, suffix: str) -> str:
+    return f'{_SEGMENT_PREFIX}{number:06d}{suffix}'
+
+
+def _segment_numbers(directory: str) -> List[int]:
+    numbers = []
+    for name in os.listdir(directory):
+        if name.startswith(_SEGMENT_PREFIX) and name.endswith('.log'):
+            try:
+                numbers.append(int(name[len(_SEGMENT_PREFIX):-4]))
+            except ValueError:
+                continue
+    return sorted(numbers)
+
+
+class EventRecorder:
+    """
+    事件錄製器 (執行緒安全)
+
+    record_quote / record_order 可於任意執行緒呼叫且不會阻塞。
+    啟動時一律開新區段，不會改寫既有檔案。
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        index_interval: int = DEFAULT_INDEX_INTERVAL,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        max_segments: Optional[int] = None
+    ):
+        """
+        初始化錄製器並啟動背景寫入執行緒
+
+        Args:
+            directory: 錄製目錄
+            segment_bytes: 區段大小上限
+            index_interval: 每隔幾筆記錄寫入一筆索引
+            queue_size: 佇列容量
+            flush_interval: flush 間隔秒數
+            max_segments: 最多保留的區段數 (None 表示不刪除)
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.flush_interval = flush_interval
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        existing = _segment_numbers(directory)
+        self._segment = existing[-1] if existing else 0
+        self._data = None
+        self._index = None
+        self._segment_records = 0
+        self._segment_size = 0
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.segments_opened = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='event-recorder', daemon=True)
+        self._thread.start()
+
+    # ===== 回調執行緒 =====
+
+    def record(self, kind: int, payload: Any) -> bool:
+        """
+        放入一筆事件 (不阻塞)
+
+        Args:
+            kind: 事件類別 (KIND_QUOTE / KIND_ORDER)
+            payload: 事件內容
+
+        Returns:
+            bool: 是否成功放入佇列 (已關閉或佇列已滿時為 False)
+        """
+        if self._closed:
+            return False
+        # 淺複製，避免下游修改 dict 影響錄製內容
+        if isinstance(payload, dict):
+            payload = dict(payload)
+        try:
+            self._queue.put_nowait((kind, time.time(), payload))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.recorded += 1
+        return True
+
+    def record_quote(self, quote: Any) -> bool:
+        """錄製一筆報價"""
+        return self.record(KIND_QUOTE, quote)
+
+    def record_order(self, event: Any) -> bool:
+        """錄製一筆委託/成交事件"""
+        return self.record(KIND_ORDER, event)
+
+    # ===== 背景寫入 =====
+
+    def _open_segment(self) -> None:
+        self._close_segment()
+        self._segment += 1
+        base = os.path.join(self.directory, _segment_name(self._segment, ''))
+        self._data = open(base + '.log', 'wb')
+        self._index = open(base + '.idx', 'wb')
+        self._data.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self._segment_size = _FILE_HEADER.size
+        self._segment_records = 0
+        self.segments_opened += 1
+        self._enforce_retention()
+
+    def _close_segment(self) -> None:
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def _enforce_retention(self) -> None:
+        if not self.max_segments:
+            return
+        numbers = _segment_numbers(self.directory)
+        for number in numbers[:-self.max_segments]:
+            for suffix in ('.log', '.idx'):
+                try:
+                    os.remove(os.path.join(self.directory, _segment_name(number, suffix)))
+                except FileNotFoundError:
+                    pass
+
+    def _write(self, kind: int, ts: float, payload: Any) -> None:
+        body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+        head = _KIND_TS.pack(kind, ts)
+        crc = zlib.crc32(body, zlib.crc32(head))
+        if self._data is None or self._segment_size >= self.segment_bytes:
+            self._open_segment()
+        if self._segment_records % self.index_interval == 0:
+            self._index.write(_INDEX_ENTRY.pack(ts, self._segment_size))
+        self._data.write(_RECORD_HEADER.pack(len(body), crc, kind, ts))
+        self._data.write(body)
+        size = _RECORD_HEADER.size + len(body)
+        self._segment_size += size
+        self._segment_records += 1
+        self.bytes_written += size
+        self.written += 1
+
+    def _flush(self) -> None:
+        for f in (self._data, self._index):
+            if f is not None:
+                f.flush()
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                try:
+                    self._write(*item)
+                    dirty = True
+                except Exception as e:
+                    self.errors += 1
+                    logger.error("Event recorder write error: %s", e)
+            now = time.monotonic()
+            if dirty and (self._queue.empty() or now - last_flush >= self.flush_interval):
+                self._flush()
+                last_flush = now
+                dirty = False
+        # 寫完剩餘事件後關閉
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error("Event recorder write error: %s", e)
+        self._close_segment()
+
+    def close(self, timeout: Optional[float] = 5) -> None:
+        """停止錄製，寫完佇列中的事件後關閉檔案"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得錄製統計資訊"""
+        return {
+            'directory': self.directory,
+            'segment': self._segment,
+            'segments_opened': self.segments_opened,
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'queue_depth': self._queue.qsize(),
+            'bytes_written': self.bytes_written
+        }
+
+
+class RecordingReader:
+    """錄製檔讀取器"""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: 錄製目錄
+        """
+        self.directory = directory
+
+    def _path(self, number: int, suffix: str) -> str:
+        return os.path.join(self.directory, _segment_name(number, suffix))
+
+    def _load_index(self, number: int) -> Tuple[List[float], List[int]]:
+        times: List[float] = []
+        offsets: List[int] = []
+        try:
+            with open(self._path(number, '.idx'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return times, offsets
+        usable = len(data) - len(data) % _INDEX_ENTRY.size
+        for ts, offset in _INDEX_ENTRY.iter_unpack(data[:usable]):
+            times.append(ts)
+            offsets.append(offset)
+        return times, offsets
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """
+        列出區段
+
+        Returns:
+            List[Dict]: 各區段的編號、路徑、大小與第一筆記錄時間
+        """
+        result = []
+        for number in _segment_numbers(self.directory):
+            times, _ = self._load_index(number)
+            path = self._path(number, '.log')
+            result.append({
+                'segment': number,
+                'path': path,
+                'bytes': os.path.getsize(path),
+                'first_ts': times[0] if times else None
+            })
+        return result
+
+    def _read_segment(self, number: int, offset: int) -> Iterator[Record]:
+        with open(self._path(number, '.log'), 'rb') as f:
+            header = f.read(_FILE_HEADER.size)
+            if len(header) < _FILE_HEADER.size or _FILE_HEADER.unpack(header)[0] != MAGIC:
+                logger.warning("Skipping invalid recording segment: %s", self._path(number, '.log'))
+                return
+            f.seek(max(offset, _FILE_HEADER.size))
+            while True:
+                head = f.read(_RECORD_HEADER.size)
+                if len(head) < _RECORD_HEADER.size:
+                    return
+                length, crc, kind, ts = _RECORD_HEADER.unpack(head)
+                body = f.read(length)
+                if len(body) < length or zlib.crc32(body, zlib.crc32(_KIND_TS.pack(kind, ts))) != crc:
+                    logger.warning("Recording truncated or corrupt at segment %d", number)
+                    return
+                yield Record(kind, ts, json.loads(body))
+
+    def read(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        kinds: Optional[Iterable[int]] = None
+    ) -> Iterator[Record]:
+        """
+        依錄製順序讀取事件
+
+        Args:
+            start: 開始時間 (epoch 秒數，含)
+            end: 結束時間 (epoch 秒數，含)
+            kinds: 只讀取的事件類別
+
+        Returns:
+            Iterator[Record]: 事件
+        """
+        wanted = set(kinds) if kinds is not None else None
+        numbers = _segment_numbers(self.directory)
+        indexes = {number: self._load_index(number) for number in numbers}
+        for i, number in enumerate(numbers):
+            times, offsets = indexes[number]
+            offset = 0
+            if start is not None:
+                # 下一個區段的第一筆仍早於 start 時可整段略過
+                if i + 1 < len(numbers):
+                    next_times = indexes[numbers[i + 1]][0]
+                    if next_times and next_times[0] < start:
+                        continue
+                position = bisect_right(times, start) - 1
+                if position >= 0:
+                    offset = offsets[position]
+            for record in self._read_segment(number, offset):
+                if start is not None and record.ts < start:
+                    continue
+                if end is not None and record.ts > end:
+                    return
+                if wanted is None or record.kind in wanted:
+                    yield record
+
+    def quotes(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """讀取錄製的報價 (可作為 TickReplayer 的來源)"""
+        for record in self.read(start, end, kinds=(KIND_QUOTE,)):
+            yield record.payload
+
+    def orders(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """讀取錄製的委託/成交事件"""
+        for record in self.read(start, end, kinds=(KIND_ORDER,)):
+            yield record.payload
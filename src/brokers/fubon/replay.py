@@ -0,0 +1,279 @@
+"""
+Tick Replay
+歷史 tick 重播
+
+讀取錄製的 tick 檔 (CSV 或 JSON Lines) 或 EventRecorder 錄製目錄，
+依時間以 heap 合併多個來源 (同時間的 tick 依來源與行號排序，結果可重現)，
+再以原始速度、N 倍速或最快速度送入 broker 的報價分派 (_dispatch_quote)，
+讓報價回調、盤中 K 線、WebSocket 推播等下游元件可離線承受開盤時的爆量測試。
+
+每筆重播的報價會加上 replay_ts (送出時的 epoch 秒數)，下游可據此
+計算 tick 到客戶端的延遲。
+"""
+
+import csv
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .recorder import RecordingReader
+from .ticks import parse_tick
+
+logger = logging.getLogger(__name__)
+
+
+# 延遲統計保留的樣本數
+DEFAULT_MAX_SAMPLES = 100_000
+
+# 單次等待的最長秒數 (讓 stop() 能及時生效)
+_MAX_SLEEP = 0.5
+
+
+class LatencyRecorder:
+    """
+    延遲樣本統計 (執行緒安全)
+
+    保留最近 max_samples 筆樣本 (環狀緩衝)，統計時才排序計算百分位數。
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_MAX_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = array('d')
+        self._next = 0
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value: float) -> None:
+        """記錄一筆樣本 (秒)"""
+        with self._lock:
+            self.count += 1
+            if value > self.max:
+                self.max = value
+            if len(self._samples) < self.max_samples:
+                self._samples.append(value)
+            else:
+                self._samples[self._next] = value
+                self._next = (self._next + 1) % self.max_samples
+
+    def summary(self) -> Dict[str, Any]:
+        """取得統計 (毫秒)"""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, maximum = self.count, self.max
+        if not samples:
+            return {'count': 0}
+
+        def percentile(p: float) -> float:
+            return round(samples[min(int(p * len(samples)), len(samples) - 1)] * 1000, 3)
+
+        return {
+            'count': count,
+            'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+            'p50_ms': percentile(0.5),
+            'p90_ms': percentile(0.9),
+            'p99_ms': percentile(0.99),
+            'max_ms': round(maximum * 1000, 3)
+        }
+
+
+def _convert(value: str) -> Any:
+    """CSV 欄位轉為數字 (無法轉換時保留字串)"""
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() and '.' not in value else number
+
+
+def read_tick_file(path: str, symbol: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    讀取 tick 檔
+
+    CSV 需有標題列；JSON Lines 每行一筆報價。欄位名稱與即時報價相同
+    (price / volume / timestamp 等)。沒有 symbol 欄位時使用 symbol 參數，
+    未指定則以檔名 (不含副檔名) 作為股票代號。
+
+    Args:
+        path: 檔案路徑 (.csv / .jsonl / .json)
+        symbol: 預設股票代號
+
+    Returns:
+        Iterator[Dict]: 報價 dict
+    """
+    default_symbol = symbol or os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rows: Iterable[Dict[str, Any]] = (
+                {key: _convert(value) for key, value in row.items()} for row in csv.DictReader(f)
+            )
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            if not (row.get('symbol') or row.get('stock_code') or row.get('code')):
+                row['symbol'] = default_symbol
+            yield row
+
+
+def open_source(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    開啟重播來源：目錄視為 EventRecorder 的錄製目錄 (讀取其中的報價)，
+    其他則視為 tick 檔
+
+    Args:
+        path: 錄製目錄或 tick 檔路徑
+
+    Returns:
+        Iterator[Dict]: 報價 dict
+    """
+    if os.path.isdir(path):
+        return RecordingReader(path).quotes()
+    return read_tick_file(path)
+
+
+def merge_ticks(sources: Iterable[Iterable[Dict[str, Any]]]) -> Iterator[Tuple[float, Dict[str, Any]]]:
+    """
+    依時間合併多個 tick 來源
+
+    各來源需已依時間排序；同時間的 tick 依來源順序與來源內順序排列。
+    無法解析成交價的資料列會略過。
+
+    Args:
+        sources: tick 來源列表 (例如 read_tick_file 的結果)
+
+    Returns:
+        Iterator[Tuple[float, Dict]]: (epoch 秒數, 報價)
+    """
+    def keyed(index: int, source: Iterable[Dict[str, Any]]):
+        for line, quote in enumerate(source):
+            tick = parse_tick(quote)
+            if tick is not None:
+                yield tick.ts, index, line, quote
+
+    for ts, _, _, quote in heapq.merge(*(keyed(i, s) for i, s in enumerate(sources))):
+        yield ts, quote
+
+
+class TickReplayer:
+    """
+    tick 重播器
+
+    speed 為 1 時依原始時間間隔送出；N 表示 N 倍速；None 或 0 表示不等待、
+    以最快速度送出。可同步執行 (run) 或於背景執行緒執行 (start)。
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[Dict[str, Any]], None],
+        sources: Iterable[Iterable[Dict[str, Any]]],
+        speed: Optional[float] = 1.0,
+        clock: Callable[[], float] = time.perf_counter,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        初始化重播器
+
+        Args:
+            dispatch: 報價分派函式 (通常為 broker._dispatch_quote)
+            sources: tick 來源列表
+            speed: 播放倍速，None 或 0 表示最快速度
+            clock: 單調時鐘 (測試用)
+            sleep: 等待函式 (測試用)
+        """
+        self.dispatch = dispatch
+        self.sources = list(sources)
+        self.speed = speed or None
+        self._clock = clock
+        self._sleep = sleep
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.dispatch_latency = LatencyRecorder()
+        self.schedule_lag = LatencyRecorder()
+        self.ticks = 0
+        self.errors = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.first_ts: Optional[float] = None
+        self.last_ts: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self) -> Dict[str, Any]:
+        """
+        同步重播所有 tick
+
+        Returns:
+            Dict: 重播統計 (同 stats)
+        """
+        self.started_at = self._clock()
+        self.finished_at = None
+        for ts, quote in merge_ticks(self.sources):
+            if self._stop.is_set():
+                break
+            if self.first_ts is None:
+                self.first_ts = ts
+            self.last_ts = ts
+
+            if self.speed is not None:
+                due = self.started_at + (ts - self.first_ts) / self.speed
+                while not self._stop.is_set():
+                    remaining = due - self._clock()
+                    if remaining <= 0:
+                        break
+                    self._sleep(min(remaining, _MAX_SLEEP))
+                if self._stop.is_set():
+                    break
+                self.schedule_lag.record(max(self._clock() - due, 0.0))
+
+            quote['replay_ts'] = time.time()
+            sent = self._clock()
+            try:
+                self.dispatch(quote)
+            except Exception as e:
+                self.errors += 1
+                logger.error("Replay dispatch error: %s", e)
+            self.dispatch_latency.record(self._clock() - sent)
+            self.ticks += 1
+        self.finished_at = self._clock()
+        logger.info("Tick replay finished: %d ticks", self.ticks)
+        return self.stats()
+
+    def start(self) -> None:
+        """於背景執行緒開始重播"""
+        if self.running:
+            raise RuntimeError("Replay is already running")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name='tick-replay', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止重播並等待背景執行緒結束"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得重播統計資訊"""
+        end = self.finished_at if self.finished_at is not None else self._clock()
+        elapsed = end - self.started_at if self.started_at is not None else 0.0
+        span = (self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        return {
+            'running': self.running,
+            'speed': self.speed,
+            'ticks': self.ticks,
+            'errors': self.errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'market_seconds': round(span, 3),
+            'ticks_per_second': round(self.ticks / elapsed, 1) if elapsed > 0 else None,
+            'dispatch_latency': self.dispatch_latency.summary(),
+            'schedule_lag': self.schedule_lag.summary()
+        }
@@ -0,0 +1,685 @@
+"""
+SDK Log Reader
+SDK 日誌解碼與查詢
+
+富邦 SDK 在 log/ 目錄寫入 program.log / client.log / notify.log (檔名加上
+.YYYYMMDD)，其中 program.log 每行為一筆 base64 編碼的事件，client.log 與
+notify.log 則為明文。解碼後每筆事件的格式為:
+
+    [2025-11-06 10:29:57.692980954 +08:00 INFO sdk_core::fubon::ws_connector] 訊息
+    [2025-11-05 17:47:33.475731908 +08:00 INFO] [login] 訊息
+
+讀取時以 mmap 逐行處理，建立索引只解碼每行開頭 (時間、等級、元件)，
+訊息本身在查詢命中時才解碼。索引依時間排序，可用二分搜尋定位時間範圍；
+指定 index_dir 時索引會存成檔案，日誌檔只有附加新行時只索引新增的部分。
+
+索引檔 <日誌檔名>.idx 格式 (little-endian):
+
+- 檔頭: MAGIC (4 bytes) + 版本 (uint16) + 已索引位元組數 (uint64)
+  + 日誌檔開頭 CRC32 (uint32) + 筆數 (uint32) + 是否依時間排序 (uint8)
+  + 元件名稱 JSON 長度 (uint32)
+- 元件名稱 JSON (字串陣列)
+- 位移 uint64 x 筆數、時間 (epoch 微秒) int64 x 筆數、等級 uint8 x 筆數、
+  元件編號 uint16 x 筆數
+
+命令列用法 (於 src/brokers 目錄):
+
+    python -m fubon.sdk_log query --since 2025-11-06T10:00 --grep reconnect
+    python -m fubon.sdk_log query --component ws_connector --level WARN
+    python -m fubon.sdk_log components
+    python -m fubon.sdk_log tail --kind program
+"""
+
+import argparse
+import base64
+import binascii
+import calendar
+import heapq
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Sequence, Tuple
+
+MAGIC = b'FBSL'
+VERSION = 1
+_INDEX_HEADER = struct.Struct('<4sHQIIBI')
+
+# SDK 日誌種類
+LOG_KINDS = ('program', 'client', 'notify')
+# SDK 日誌的時區 (未指定時區的查詢時間以此解讀)
+SDK_TZ = timezone(timedelta(hours=8))
+
+LEVELS = ('TRACE', 'DEBUG', 'INFO', 'WARN', 'ERROR')
+_LEVEL_IDS = {name.encode(): number for number, name in enumerate(LEVELS)}
+_LEVEL_IDS[b'WARNING'] = _LEVEL_IDS[b'WARN']
+UNKNOWN_LEVEL = 255
+
+# 建索引時只解碼每行開頭的 base64 字元數 (需為 4 的倍數)
+_HEAD_CHARS = 192
+# 計算日誌檔開頭 CRC 的位元組數 (用於判斷檔案是否被替換)
+_HEAD_CRC_BYTES = 4096
+
+_LINE_HEADER = re.compile(
+    rb'\[(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)(?:\.(\d+))? ([+-])(\d\d):(\d\d) ([A-Z]+)(?: ([^\]\s]+))?\]'
+    rb'(?: \[([^\]]+)\])?'
+)
+_FILE_NAME = re.compile(r'^(%s)\.log(?:\.(\d{8}))?$' % '|'.join(LOG_KINDS))
+
+# 命令列預設的日誌目錄與索引目錄 (相對於專案根目錄)
+_PROJECT_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_LOG_DIRS = (_PROJECT_ROOT / 'api' / 'log', _PROJECT_ROOT / 'log')
+DEFAULT_INDEX_DIR = _PROJECT_ROOT / 'api' / 'cache' / 'sdk_log'
+
+
+class LogEntry(NamedTuple):
+    """一筆解碼後的 SDK 日誌"""
+    ts: float  # epoch 秒數
+    level: str
+    component: str
+    text: str  # 解碼後的完整內容 (含時間與等級)
+    source: str  # 日誌檔路徑
+    offset: int  # 於日誌檔中的位移
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'time': datetime.fromtimestamp(self.ts, SDK_TZ).isoformat(timespec='microseconds'),
+            'level': self.level,
+            'component': self.component,
+            'text': self.text,
+            'source': os.path.basename(self.source),
+            'offset': self.offset
+        }
+
+
+def decode_line(raw: bytes) -> str:
+    """
+    解碼單行日誌 (明文直接回傳，否則視為 base64)
+
+    Args:
+        raw: 原始內容 (不含換行)
+
+    Returns:
+        str: 解碼後的內容，無法解碼時回傳原始內容
+    """
+    raw = raw.rstrip(b'\r\n')
+    if not raw or raw[:1] == b'[':
+        return raw.decode('utf-8', errors='replace')
+    try:
+        return base64.b64decode(raw, validate=True).decode('utf-8', errors='replace').rstrip('\r\n')
+    except (binascii.Error, ValueError):
+        return raw.decode('utf-8', errors='replace')
+
+
+def _decode_head(raw: bytes) -> bytes:
+    """只解碼一行開頭足以取得時間、等級與元件的部分"""
+    if raw[:1] == b'[':
+        return raw[:_HEAD_CHARS]
+    head = raw[:_HEAD_CHARS]
+    try:
+        return base64.b64decode(head[:len(head) - len(head) % 4], validate=True)
+    except (binascii.Error, ValueError):
+        return b''
+
+
+_epoch_days: Dict[Tuple[bytes, ...], int] = {}
+
+
+def _parse_header(head: bytes) -> Optional[Tuple[int, int, str]]:
+    """
+    解析一行開頭
+
+    Returns:
+        Optional[Tuple]: (epoch 微秒, 等級編號, 元件名稱)，不是事件開頭時為 None
+    """
+    match = _LINE_HEADER.match(head)
+    if match is None:
+        return None
+    (year, month, day, hour, minute, second, fraction, sign,
+     offset_hour, offset_minute, level, target, tag) = match.groups()
+
+    day_key = (year, month, day, sign, offset_hour, offset_minute)
+    base = _epoch_days.get(day_key)
+    if base is None:
+        offset = int(offset_hour) * 3600 + int(offset_minute) * 60
+        base = calendar.timegm((int(year), int(month), int(day), 0, 0, 0)) - (offset if sign == b'+' else -offset)
+        _epoch_days[day_key] = base
+    micros = int((fraction or b'0')[:6].ljust(6, b'0'))
+    ts = (base + int(hour) * 3600 + int(minute) * 60 + int(second)) * 1_000_000 + micros
+
+    component = (target or tag or b'').decode('utf-8', errors='replace')
+    return ts, _LEVEL_IDS.get(level, UNKNOWN_LEVEL), component
+
+
+def _head_crc(mm: Any, size: int) -> int:
+    """日誌檔開頭的 CRC32 (最多 _HEAD_CRC_BYTES)"""
+    return zlib.crc32(mm[:min(size, _HEAD_CRC_BYTES)])
+
+
+class SdkLogFile:
+    """
+    單一 SDK 日誌檔與其索引
+
+    只有開頭可解析為「[時間 等級 ...]」的行會成為一筆索引，其後無法解析的
+    行 (多行訊息) 歸入前一筆。
+    """
+
+    def __init__(self, path: str, index_dir: Optional[str] = None):
+        """
+        Args:
+            path: 日誌檔路徑
+            index_dir: 索引檔目錄 (None 表示只在記憶體中建立)
+        """
+        self.path = str(path)
+        self.index_dir = str(index_dir) if index_dir else None
+        self.offsets = array('Q')
+        self.timestamps = array('q')
+        self.levels = array('B')
+        self.component_ids = array('H')
+        self.components: List[str] = []
+        self._component_ids: Dict[str, int] = {}
+        self.indexed_size = 0
+        self.head_crc = 0
+        self.sorted = True
+        self._loaded = False
+        # 未依時間排序時的排序結果 (索引位置, 對應時間)，索引更新後重算
+        self._time_order: Optional[Tuple[array, array]] = None
+
+    @property
+    def index_path(self) -> Optional[str]:
+        if self.index_dir is None:
+            return None
+        return os.path.join(self.index_dir, os.path.basename(self.path) + '.idx')
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _reset(self) -> None:
+        for column in (self.offsets, self.timestamps, self.levels, self.component_ids):
+            del column[:]
+        self.components = []
+        self._component_ids = {}
+        self.indexed_size = 0
+        self.sorted = True
+        self._time_order = None
+
+    def _load_index(self) -> None:
+        path = self.index_path
+        if path is None or not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                magic, version, indexed_size, head_crc, count, is_sorted, names_len = \
+                    _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+                if magic != MAGIC or version != VERSION:
+                    return
+                components = json.loads(f.read(names_len).decode('utf-8'))
+                columns = (array('Q'), array('q'), array('B'), array('H'))
+                for column in columns:
+                    column.fromfile(f, count)
+        except (OSError, EOFError, ValueError, struct.error):
+            # 索引損毀時重建
+            return
+        self.offsets, self.timestamps, self.levels, self.component_ids = columns
+        self.components = components
+        self._component_ids = {name: number for number, name in enumerate(components)}
+        self.indexed_size = indexed_size
+        self.head_crc = head_crc
+        self.sorted = bool(is_sorted)
+
+    def _save_index(self) -> None:
+        path = self.index_path
+        if path is None:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        names = json.dumps(self.components, ensure_ascii=False).encode('utf-8')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(
+                MAGIC, VERSION, self.indexed_size, self.head_crc,
+                len(self.offsets), int(self.sorted), len(names)
+            ))
+            f.write(names)
+            for column in (self.offsets, self.timestamps, self.levels, self.component_ids):
+                column.tofile(f)
+        os.replace(tmp_path, path)
+
+    def _component_id(self, name: str) -> int:
+        number = self._component_ids.get(name)
+        if number is None:
+            number = self._component_ids[name] = len(self.components)
+            self.components.append(name)
+        return number
+
+    def refresh(self) -> int:
+        """
+        建立或更新索引 (只處理上次索引之後新增的完整行)
+
+        Returns:
+            int: 新增的索引筆數
+        """
+        if not self._loaded:
+            self._load_index()
+            self._loaded = True
+
+        size = os.path.getsize(self.path)
+        if size == 0:
+            if self.indexed_size:
+                self._reset()
+            return 0
+
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # 檔案變小或開頭改變 (被替換) 時重建
+            if size < self.indexed_size or (
+                self.indexed_size and _head_crc(mm, self.indexed_size) != self.head_crc
+            ):
+                self._reset()
+            if size == self.indexed_size:
+                return 0
+
+            added = 0
+            last_ts = self.timestamps[-1] if self.timestamps else None
+            pos = self.indexed_size
+            while pos < size:
+                end = mm.find(b'\n', pos)
+                if end < 0:
+                    # 尚未寫完的最後一行留待下次
+                    break
+                parsed = _parse_header(_decode_head(mm[pos:min(end, pos + _HEAD_CHARS)]))
+                if parsed is None and end - pos > _HEAD_CHARS:
+                    # 元件名稱特別長時開頭不足以解析，改為解碼整行
+                    parsed = _parse_header(decode_line(mm[pos:end]).encode('utf-8'))
+                if parsed is not None:
+                    ts, level, component = parsed
+                    if last_ts is not None and ts < last_ts:
+                        self.sorted = False
+                    last_ts = ts
+                    self.offsets.append(pos)
+                    self.timestamps.append(ts)
+                    self.levels.append(level)
+                    self.component_ids.append(self._component_id(component))
+                    added += 1
+                pos = end + 1
+            self.indexed_size = pos
+            self.head_crc = _head_crc(mm, pos)
+
+        if added:
+            self._time_order = None
+            self._save_index()
+        return added
+
+    def span(self, start: Optional[float] = None, end: Optional[float] = None) -> Sequence[int]:
+        """
+        時間範圍內依時間排序的索引位置
+
+        SDK 多個執行緒同時寫入時，相鄰幾行的時間可能稍微倒序；此時以
+        排序後的位置二分搜尋，排序結果快取到索引更新為止。
+
+        Args:
+            start: 起始 epoch 秒數 (含)
+            end: 結束 epoch 秒數 (不含)
+
+        Returns:
+            Sequence[int]: 索引位置
+        """
+        if self.sorted:
+            order, timestamps = None, self.timestamps
+        else:
+            if self._time_order is None:
+                order = array('Q', sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__))
+                self._time_order = (order, array('q', (self.timestamps[i] for i in order)))
+            order, timestamps = self._time_order
+        low = 0 if start is None else bisect_left(timestamps, int(start * 1_000_000))
+        high = len(timestamps) if end is None else bisect_left(timestamps, int(end * 1_000_000))
+        return range(low, high) if order is None else order[low:high]
+
+    def read(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        min_level: Optional[int] = None,
+        component: Optional[str] = None,
+        pattern: Optional[Pattern] = None,
+        positions: Optional[Sequence[int]] = None
+    ) -> Iterator[LogEntry]:
+        """
+        依條件讀取日誌 (時間、等級、元件先以索引過濾，命中的行才解碼)
+
+        Args:
+            start: 起始 epoch 秒數 (含)
+            end: 結束 epoch 秒數 (不含)
+            min_level: 最低等級編號 (LEVELS 的位置)
+            component: 元件名稱需包含的字串 (不分大小寫)
+            pattern: 解碼後內容需符合的正規表示式
+            positions: 只讀取這些索引位置 (預設為時間範圍內依時間排序的位置)
+
+        Yields:
+            LogEntry: 日誌
+        """
+        if positions is None:
+            self.refresh()
+            positions = self.span(start, end)
+        if not self.offsets:
+            return
+
+        allowed = None
+        if component:
+            needle = component.lower()
+            allowed = {number for number, name in enumerate(self.components) if needle in name.lower()}
+            if not allowed:
+                return
+
+        start_us = None if start is None else int(start * 1_000_000)
+        end_us = None if end is None else int(end * 1_000_000)
+        count = len(self.offsets)
+
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for i in positions:
+                ts = self.timestamps[i]
+                if (
+                    (start_us is not None and ts < start_us) or (end_us is not None and ts >= end_us)
+                ):
+                    continue
+                level = self.levels[i]
+                if min_level is not None and (level == UNKNOWN_LEVEL or level < min_level):
+                    continue
+                component_id = self.component_ids[i]
+                if allowed is not None and component_id not in allowed:
+                    continue
+
+                offset = self.offsets[i]
+                stop = self.offsets[i + 1] if i + 1 < count else self.indexed_size
+                text = '\n'.join(decode_line(line) for line in mm[offset:stop].splitlines())
+                if pattern is not None and not pattern.search(text):
+                    continue
+                yield LogEntry(
+                    ts / 1_000_000,
+                    LEVELS[level] if level < len(LEVELS) else '?',
+                    self.components[component_id],
+                    text,
+                    self.path,
+                    offset
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """取得索引統計 (筆數、時間範圍、各元件與等級的筆數)"""
+        self.refresh()
+        by_component: Dict[str, int] = {}
+        for component_id in self.component_ids:
+            name = self.components[component_id]
+            by_component[name] = by_component.get(name, 0) + 1
+        by_level: Dict[str, int] = {}
+        for level in self.levels:
+            name = LEVELS[level] if level < len(LEVELS) else '?'
+            by_level[name] = by_level.get(name, 0) + 1
+        return {
+            'path': self.path,
+            'entries': len(self.offsets),
+            'first': min(self.timestamps) / 1_000_000 if self.timestamps else None,
+            'last': max(self.timestamps) / 1_000_000 if self.timestamps else None,
+            'sorted': self.sorted,
+            'components': by_component,
+            'levels': by_level
+        }
+
+
+class SdkLogReader:
+    """跨目錄、跨日期查詢 SDK 日誌"""
+
+    def __init__(self, directories: Iterable[str], index_dir: Optional[str] = None):
+        """
+        Args:
+            directories: SDK 日誌目錄列表 (例如 api/log、log)
+            index_dir: 索引檔目錄 (None 表示只在記憶體中建立)
+        """
+        self.directories = [str(directory) for directory in directories]
+        self.index_dir = str(index_dir) if index_dir else None
+        self._files: Dict[str, SdkLogFile] = {}
+
+    def _index_dir_for(self, directory: str) -> Optional[str]:
+        # 不同目錄可能有同名日誌檔，索引依來源目錄分開存放
+        if self.index_dir is None:
+            return None
+        return os.path.join(self.index_dir, re.sub(r'[^\w.-]+', '_', os.path.abspath(directory)).strip('_'))
+
+    def files(self, kinds: Optional[Iterable[str]] = None) -> List[Tuple[str, Optional[str], SdkLogFile]]:
+        """
+        列出日誌檔
+
+        Args:
+            kinds: 日誌種類 (program / client / notify)，預設全部
+
+        Returns:
+            List[Tuple]: (種類, 日期 YYYYMMDD 或 None, SdkLogFile)，依日期排序
+        """
+        wanted = set(kinds or LOG_KINDS)
+        found = []
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                match = _FILE_NAME.match(name)
+                if match is None or match.group(1) not in wanted:
+                    continue
+                path = os.path.join(directory, name)
+                log_file = self._files.get(path)
+                if log_file is None:
+                    log_file = self._files[path] = SdkLogFile(path, self._index_dir_for(directory))
+                found.append((match.group(1), match.group(2), log_file))
+        # 沒有日期的檔案視為最新
+        found.sort(key=lambda item: (item[1] or '99999999', item[0], item[2].path))
+        return found
+
+    def query(
+        self,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        kinds: Optional[Iterable[str]] = None,
+        min_level: Optional[int] = None,
+        component: Optional[str] = None,
+        pattern: Optional[Pattern] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[LogEntry]:
+        """
+        依時間順序查詢日誌
+
+        檔名日期明顯在範圍外的檔案不會開啟；各檔的結果以時間合併。
+
+        Args:
+            start: 起始 epoch 秒數 (含)
+            end: 結束 epoch 秒數 (不含)
+            kinds: 日誌種類
+            min_level: 最低等級編號
+            component: 元件名稱需包含的字串
+            pattern: 內容需符合的正規表示式
+            limit: 最多筆數
+
+        Yields:
+            LogEntry: 依時間排序的日誌
+        """
+        start_day = None if start is None else datetime.fromtimestamp(start, SDK_TZ).strftime('%Y%m%d')
+        end_day = None if end is None else datetime.fromtimestamp(end, SDK_TZ).strftime('%Y%m%d')
+
+        sources = []
+        for _, day, log_file in self.files(kinds):
+            if day is not None and (
+                (start_day is not None and day < start_day) or (end_day is not None and day > end_day)
+            ):
+                continue
+            sources.append(log_file.read(start, end, min_level, component, pattern))
+
+        for count, entry in enumerate(heapq.merge(*sources, key=lambda entry: entry.ts)):
+            if limit is not None and count >= limit:
+                return
+            yield entry
+
+    def follow(
+        self,
+        kinds: Optional[Iterable[str]] = None,
+        min_level: Optional[int] = None,
+        component: Optional[str] = None,
+        pattern: Optional[Pattern] = None,
+        poll_interval: float = 0.5,
+        from_start: bool = False
+    ) -> Iterator[LogEntry]:
+        """
+        持續輸出新寫入的日誌 (tail -f)，換日產生的新檔也會自動加入
+
+        Args:
+            kinds: 日誌種類
+            min_level: 最低等級編號
+            component: 元件名稱需包含的字串
+            pattern: 內容需符合的正規表示式
+            poll_interval: 檢查新內容的間隔秒數
+            from_start: 是否先輸出既有內容
+
+        Yields:
+            LogEntry: 新的日誌
+        """
+        positions: Dict[str, int] = {}
+        first = True
+        while True:
+            for _, _, log_file in self.files(kinds):
+                known = log_file.path in positions
+                try:
+                    log_file.refresh()
+                except (OSError, ValueError):
+                    continue
+                if not known and first and not from_start:
+                    # 啟動時已存在的檔案從結尾開始
+                    positions[log_file.path] = len(log_file)
+                    continue
+                seen = positions.get(log_file.path, 0)
+                if len(log_file) < seen:
+                    seen = 0  # 檔案被替換
+                if len(log_file) == seen:
+                    positions[log_file.path] = seen
+                    continue
+                positions[log_file.path] = len(log_file)
+                # 只解碼新增的部分
+                yield from log_file.read(None, None, min_level, component, pattern,
+                                         positions=range(seen, len(log_file)))
+            first = False
+            time.sleep(poll_interval)
+
+
+def parse_time(value: str, now: Optional[float] = None) -> float:
+    """
+    解析查詢時間
+
+    支援 ISO 格式 (未指定時區時視為 +08:00)、只有日期，以及相對時間
+    (例如 15m、2h、1d，表示現在往前)。
+
+    Args:
+        value: 時間字串
+        now: 目前 epoch 秒數 (測試用)
+
+    Returns:
+        float: epoch 秒數
+    """
+    value = value.strip()
+    relative = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value)
+    if relative:
+        seconds = float(relative.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[relative.group(2)]
+        return (time.time() if now is None else now) - seconds
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=SDK_TZ)
+    return parsed.timestamp()
+
+
+def _level_number(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    name = value.upper()
+    if name == 'WARNING':
+        name = 'WARN'
+    if name not in LEVELS:
+        raise argparse.ArgumentTypeError(f"unknown level {value}")
+    return LEVELS.index(name)
+
+
+def _print_entry(entry: LogEntry, as_json: bool) -> None:
+    if as_json:
+        print(json.dumps(entry.to_dict(), ensure_ascii=False))
+    else:
+        print(entry.text)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="解碼與查詢富邦 SDK 日誌")
+    parser.add_argument('--dir', action='append', dest='dirs',
+                        help="SDK 日誌目錄，可重複指定 (預設 api/log 與 log)")
+    parser.add_argument('--index-dir', default=str(DEFAULT_INDEX_DIR),
+                        help="索引檔目錄 (空字串表示不保存索引)")
+    parser.add_argument('--kind', action='append', choices=LOG_KINDS, help="日誌種類，可重複指定")
+
+    subparsers = parser.add_subparsers(dest='command')
+    filters = argparse.ArgumentParser(add_help=False)
+    filters.add_argument('--level', help="最低等級 (TRACE / DEBUG / INFO / WARN / ERROR)")
+    filters.add_argument('--component', help="元件名稱包含的字串，例如 ws_connector")
+    filters.add_argument('--grep', help="內容需符合的正規表示式")
+    filters.add_argument('-i', '--ignore-case', action='store_true', help="--grep 不分大小寫")
+    filters.add_argument('--json', action='store_true', help="以 JSON Lines 輸出")
+
+    query_parser = subparsers.add_parser('query', parents=[filters], help="依條件查詢")
+    query_parser.add_argument('--since', help="起始時間 (ISO、日期或 15m / 2h / 1d)")
+    query_parser.add_argument('--until', help="結束時間")
+    query_parser.add_argument('--limit', type=int, help="最多筆數")
+
+    tail_parser = subparsers.add_parser('tail', parents=[filters], help="持續輸出新日誌")
+    tail_parser.add_argument('--interval', type=float, default=0.5, help="檢查間隔秒數")
+    tail_parser.add_argument('--from-start', action='store_true', help="先輸出既有內容")
+
+    subparsers.add_parser('components', help="列出各檔的元件、等級筆數與時間範圍")
+
+    args = parser.parse_args(argv)
+    reader = SdkLogReader(args.dirs or DEFAULT_LOG_DIRS, args.index_dir or None)
+    command = args.command or 'query'
+
+    if command == 'components':
+        for _, _, log_file in reader.files(args.kind):
+            stats = log_file.stats()
+            for key in ('first', 'last'):
+                if stats[key] is not None:
+                    stats[key] = datetime.fromtimestamp(stats[key], SDK_TZ).isoformat(timespec='seconds')
+            print(json.dumps(stats, ensure_ascii=False))
+        return 0
+
+    try:
+        min_level = _level_number(getattr(args, 'level', None))
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    grep = getattr(args, 'grep', None)
+    pattern = re.compile(grep, re.IGNORECASE if args.ignore_case else 0) if grep else None
+    as_json = getattr(args, 'json', False)
+    component = getattr(args, 'component', None)
+
+    try:
+        if command == 'tail':
+            for entry in reader.follow(args.kind, min_level, component, pattern,
+                                       poll_interval=args.interval, from_start=args.from_start):
+                _print_entry(entry, as_json)
+                sys.stdout.flush()
+        else:
+            start = parse_time(args.since) if getattr(args, 'since', None) else None
+            end = parse_time(args.until) if getattr(args, 'until', None) else None
+            for entry in reader.query(start, end, args.kind, min_level, component, pattern,
+                                      getattr(args, 'limit', None)):
+                _print_entry(entry, as_json)
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,810 @@
+"""
+Exchange Simulator
+模擬交易所撮合引擎
+
+供 Mock broker 離線模擬完整的委託流程：每檔股票一本依價格、時間優先
+排序的委託簿，支援 ROD / IOC / FOK、限價與市價、部分成交、刪單與改單，
+成交後更新帳戶現金、持股與損益，並以委託回調推送每次狀態變化。
+
+除了委託簿上其他委託外，交易所在參考價上下各提供若干檔模擬流動性
+(造市量)，讓單一帳戶也能成交。參考價可由報價 (update_price) 驅動，
+價格移動時會補充模擬流動性並撮合因此變成可成交的掛單。
+"""
+
+import itertools
+import logging
+import threading
+from bisect import insort
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .constants import Action, OrderStatus, OrderType, PriceType
+from .order_store import normalize_status
+
+logger = logging.getLogger(__name__)
+
+
+# 價格類型別名 (API schema 與 SDK 寫法)
+_PRICE_TYPE_ALIASES: Dict[str, PriceType] = {
+    'lmt': PriceType.LIMIT,
+    'limit': PriceType.LIMIT,
+    'mkt': PriceType.MARKET,
+    'market': PriceType.MARKET,
+    'mkp': PriceType.MARKET_RANGE,
+    'marketrange': PriceType.MARKET_RANGE
+}
+
+# 未指定參考價的股票使用的價格
+DEFAULT_PRICE = 100.0
+
+# 參考價上下各提供的模擬流動性檔數與每檔數量 (張)
+DEFAULT_DEPTH = 5
+DEFAULT_LEVEL_QUANTITY = 50
+
+# 範圍市價單可成交的最大檔數
+MARKET_RANGE_TICKS = 5
+
+# 漲跌幅限制 (市價買單以漲停價預估所需資金)
+PRICE_LIMIT = 0.1
+
+# 每張股數、手續費率與證交稅率
+SHARES_PER_LOT = 1000
+COMMISSION_RATE = 0.001425
+TAX_RATE = 0.003
+
+_FINAL_STATUSES = {OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.REJECTED}
+
+
+def tick_size(price: float) -> float:
+    """台股升降單位"""
+    if price < 10:
+        return 0.01
+    if price < 50:
+        return 0.05
+    if price < 100:
+        return 0.1
+    if price < 500:
+        return 0.5
+    if price < 1000:
+        return 1.0
+    return 5.0
+
+
+def _enum_value(value: Any) -> str:
+    return str(getattr(value, 'value', value))
+
+
+def parse_action(value: Any) -> Action:
+    """將買賣動作轉為 Action"""
+    text = _enum_value(value).strip().lower()
+    for action in Action:
+        if text in (action.value.lower(), action.name.lower()):
+            return action
+    raise ValueError(f"Unknown action: {value}")
+
+
+def parse_price_type(value: Any) -> PriceType:
+    """將價格類型 (LMT/MKT/MKP 或 Limit/Market/MarketRange) 轉為 PriceType"""
+    price_type = _PRICE_TYPE_ALIASES.get(_enum_value(value).strip().lower().replace('_', ''))
+    if price_type is None:
+        raise ValueError(f"Unknown price type: {value}")
+    return price_type
+
+
+def parse_order_type(value: Any) -> OrderType:
+    """將委託類型轉為 OrderType"""
+    try:
+        return OrderType(_enum_value(value).strip().upper())
+    except ValueError:
+        raise ValueError(f"Unknown order type: {value}")
+
+
+class SimOrder:
+    """模擬委託"""
+
+    __slots__ = ('order_id', 'account', 'symbol', 'action', 'price', 'quantity',
+                 'price_type', 'order_type', 'order_condition', 'filled_quantity',
+                 'filled_amount', 'status', 'message', 'created_at', 'updated_at', 'seq')
+
+    def __init__(self, order_id: str, account: 'SimulatedAccount', symbol: str, action: Action,
+                 price: Optional[float], quantity: int, price_type: PriceType,
+                 order_type: OrderType, order_condition: str):
+        self.order_id = order_id
+        self.account = account
+        self.symbol = symbol
+        self.action = action
+        self.price = price
+        self.quantity = quantity
+        self.price_type = price_type
+        self.order_type = order_type
+        self.order_condition = order_condition
+        self.filled_quantity = 0
+        self.filled_amount = 0.0
+        self.status = OrderStatus.PENDING
+        self.message: Optional[str] = None
+        self.created_at = self.updated_at = datetime.now().isoformat()
+        self.seq = 0  # 時間優先序號，改價或加量時重新排隊
+
+    @property
+    def remaining(self) -> int:
+        return self.quantity - self.filled_quantity
+
+    @property
+    def is_open(self) -> bool:
+        return self.status not in _FINAL_STATUSES
+
+    @property
+    def limit(self) -> float:
+        """可成交的最差價格 (市價單為無限制)"""
+        if self.price is not None:
+            return self.price
+        return float('inf') if self.action == Action.BUY else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'order_id': self.order_id,
+            'stock_code': self.symbol,
+            'action': self.action.value,
+            'price': self.price,
+            'quantity': self.quantity,
+            'filled_quantity': self.filled_quantity,
+            'avg_fill_price': (
+                round(self.filled_amount / self.filled_quantity, 4) if self.filled_quantity else None
+            ),
+            'price_type': self.price_type.value,
+            'order_type': self.order_type.value,
+            'order_condition': self.order_condition,
+            'status': self.status.value,
+            'message': self.message,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class OrderBook:
+    """單一股票的委託簿 (價格優先、時間優先)"""
+
+    def __init__(self):
+        self.levels: Dict[Action, Dict[float, Deque[SimOrder]]] = {Action.BUY: {}, Action.SELL: {}}
+        # 各方向價格由低到高排序
+        self.prices: Dict[Action, List[float]] = {Action.BUY: [], Action.SELL: []}
+
+    def add(self, order: SimOrder) -> None:
+        levels = self.levels[order.action]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = deque()
+            insort(self.prices[order.action], order.price)
+        level.append(order)
+
+    def restore(self, order: SimOrder) -> None:
+        """依 seq 放回原本的排隊位置 (保留時間優先)"""
+        levels = self.levels[order.action]
+        level = levels.get(order.price)
+        if level is None:
+            level = levels[order.price] = deque()
+            insort(self.prices[order.action], order.price)
+        index = next((i for i, o in enumerate(level) if o.seq > order.seq), len(level))
+        level.insert(index, order)
+
+    def remove(self, order: SimOrder) -> bool:
+        level = self.levels[order.action].get(order.price)
+        if level is None or order not in level:
+            return False
+        level.remove(order)
+        if not level:
+            self._drop_level(order.action, order.price)
+        return True
+
+    def _drop_level(self, action: Action, price: float) -> None:
+        del self.levels[action][price]
+        self.prices[action].remove(price)
+
+    def best(self, action: Action) -> Optional[float]:
+        """最佳買價 (action=BUY) 或最佳賣價 (action=SELL)"""
+        prices = self.prices[action]
+        if not prices:
+            return None
+        return prices[-1] if action == Action.BUY else prices[0]
+
+    def opposite(self, taker: SimOrder) -> Iterator[Tuple[float, Deque[SimOrder]]]:
+        """依優先順序列出對手方的價位 (買單由低價賣單開始，賣單由高價買單開始)"""
+        side = Action.SELL if taker.action == Action.BUY else Action.BUY
+        prices = self.prices[side] if side == Action.SELL else reversed(self.prices[side])
+        for price in list(prices):
+            level = self.levels[side].get(price)
+            if level:
+                yield price, level
+
+    def depth(self, action: Action) -> List[Dict[str, float]]:
+        prices = reversed(self.prices[action]) if action == Action.BUY else self.prices[action]
+        return [
+            {'price': p, 'quantity': sum(o.remaining for o in self.levels[action][p])}
+            for p in prices
+        ]
+
+
+class SimulatedAccount:
+    """模擬帳戶 (現金、持股、委託與損益)"""
+
+    def __init__(
+        self,
+        account_id: str,
+        cash: float = 1_000_000.0,
+        positions: Optional[Dict[str, Tuple[int, float]]] = None
+    ):
+        """
+        初始化帳戶
+
+        Args:
+            account_id: 帳號
+            cash: 初始現金
+            positions: 初始持股 {股票代號: (張數, 平均成本)}
+        """
+        self.account_id = account_id
+        self.initial_cash = cash
+        self.cash = cash
+        self.positions: Dict[str, Dict[str, float]] = {
+            symbol: {'quantity': qty, 'average_cost': cost}
+            for symbol, (qty, cost) in (positions or {}).items()
+        }
+        self.orders: Dict[str, SimOrder] = {}
+        self.realized_profit_loss = 0.0
+        self.fees = 0.0
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """新增委託事件監聽者"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """移除委託事件監聽者"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify(self, event: Dict[str, Any]) -> None:
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error("Simulated order listener error: %s", e)
+
+    def committed_cash(self, reference: Callable[[str], float]) -> float:
+        """未成交買單預估占用的資金"""
+        total = 0.0
+        for order in self.orders.values():
+            if order.is_open and order.action == Action.BUY:
+                price = order.price if order.price is not None else reference(order.symbol) * (1 + PRICE_LIMIT)
+                total += price * order.remaining * SHARES_PER_LOT * (1 + COMMISSION_RATE)
+        return total
+
+    def committed_shares(self, symbol: str) -> int:
+        """未成交賣單占用的張數"""
+        return sum(
+            o.remaining for o in self.orders.values()
+            if o.is_open and o.action == Action.SELL and o.symbol == symbol
+        )
+
+    def apply_fill(self, order: SimOrder, price: float, quantity: int) -> None:
+        """依成交更新現金、持股與已實現損益"""
+        amount = price * quantity * SHARES_PER_LOT
+        commission = amount * COMMISSION_RATE
+        position = self.positions.setdefault(order.symbol, {'quantity': 0, 'average_cost': 0.0})
+        if order.action == Action.BUY:
+            self.cash -= amount + commission
+            total = position['quantity'] + quantity
+            position['average_cost'] = (
+                position['average_cost'] * position['quantity'] + price * quantity
+            ) / total
+            position['quantity'] = total
+            self.fees += commission
+        else:
+            tax = amount * TAX_RATE
+            self.cash += amount - commission - tax
+            self.realized_profit_loss += (
+                (price - position['average_cost']) * quantity * SHARES_PER_LOT - commission - tax
+            )
+            position['quantity'] -= quantity
+            if position['quantity'] <= 0:
+                del self.positions[order.symbol]
+            self.fees += commission + tax
+
+
+class SimulatedExchange:
+    """
+    模擬交易所 (執行緒安全)
+
+    多個帳戶可共用同一個交易所，彼此的委託會互相撮合。
+    委託事件在釋放鎖之後才通知，回調中可再呼叫交易所。
+    """
+
+    def __init__(
+        self,
+        initial_prices: Optional[Dict[str, float]] = None,
+        depth: int = DEFAULT_DEPTH,
+        level_quantity: int = DEFAULT_LEVEL_QUANTITY
+    ):
+        """
+        初始化交易所
+
+        Args:
+            initial_prices: 各股票初始參考價
+            depth: 參考價上下各提供的模擬流動性檔數 (0 表示只撮合委託簿)
+            level_quantity: 每檔模擬流動性數量 (張)
+        """
+        self.depth = depth
+        self.level_quantity = level_quantity
+        self.books: Dict[str, OrderBook] = {}
+        self.accounts: Dict[str, SimulatedAccount] = {}
+        self._reference: Dict[str, float] = dict(initial_prices or {})
+        self._last_trade: Dict[str, Tuple[float, int]] = {}
+        self._traded_volume: Dict[str, int] = {}
+        # 模擬流動性 {股票: {Action: [[價格, 剩餘數量], ...]}}，依優先順序排列
+        self._synthetic: Dict[str, Dict[Action, List[List[float]]]] = {}
+        self._orders: Dict[str, SimOrder] = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._prefix = datetime.now().strftime('%Y%m%d')
+        self._lock = threading.RLock()
+        self.stats_counters = {'orders': 0, 'fills': 0, 'rejected': 0, 'cancelled': 0}
+
+    # ===== 帳戶與行情 =====
+
+    def open_account(self, account_id: str, cash: float = 1_000_000.0,
+                     positions: Optional[Dict[str, Tuple[int, float]]] = None) -> SimulatedAccount:
+        """
+        取得帳戶 (不存在時建立)
+
+        Args:
+            account_id: 帳號
+            cash: 初始現金 (僅建立時使用)
+            positions: 初始持股 (僅建立時使用)
+
+        Returns:
+            SimulatedAccount: 帳戶
+        """
+        with self._lock:
+            account = self.accounts.get(account_id)
+            if account is None:
+                account = self.accounts[account_id] = SimulatedAccount(account_id, cash, positions)
+            return account
+
+    def reference_price(self, symbol: str) -> float:
+        """股票參考價"""
+        return self._reference.get(symbol, DEFAULT_PRICE)
+
+    def update_price(self, symbol: str, price: float) -> None:
+        """
+        更新參考價，補充模擬流動性並撮合變成可成交的掛單
+
+        Args:
+            symbol: 股票代號
+            price: 新參考價
+        """
+        events: List[Tuple[SimulatedAccount, Dict[str, Any]]] = []
+        with self._lock:
+            self._reference[symbol] = price
+            self._synthetic.pop(symbol, None)
+            book = self.books.get(symbol)
+            if book is not None:
+                resting = [o for side in book.levels.values() for level in side.values() for o in level]
+                resting.sort(key=lambda o: o.seq)
+                for order in resting:
+                    if order.is_open:
+                        self._match(order, book, events, synthetic_only=True)
+                        if order.remaining == 0:
+                            book.remove(order)
+        self._notify(events)
+
+    def _synthetic_levels(self, symbol: str, side: Action) -> List[List[float]]:
+        levels = self._synthetic.get(symbol)
+        if levels is None:
+            reference = self.reference_price(symbol)
+            asks, bids = [], []
+            ask = bid = reference
+            for _ in range(self.depth):
+                ask = round(ask + tick_size(ask), 2)
+                bid = round(bid - tick_size(bid - 1e-9), 2)
+                asks.append([ask, self.level_quantity])
+                if bid > 0:
+                    bids.append([bid, self.level_quantity])
+            levels = self._synthetic[symbol] = {Action.SELL: asks, Action.BUY: bids}
+        return levels[side]
+
+    def quote(self, symbol: str) -> Dict[str, Any]:
+        """
+        取得報價 (最佳買賣價為委託簿與模擬流動性中較佳者)
+
+        Args:
+            symbol: 股票代號
+
+        Returns:
+            Dict: 報價
+        """
+        with self._lock:
+            book = self.books.get(symbol)
+            bids = [level[0] for level in self._synthetic_levels(symbol, Action.BUY) if level[1] > 0]
+            asks = [level[0] for level in self._synthetic_levels(symbol, Action.SELL) if level[1] > 0]
+            if book is not None:
+                if book.best(Action.BUY) is not None:
+                    bids.append(book.best(Action.BUY))
+                if book.best(Action.SELL) is not None:
+                    asks.append(book.best(Action.SELL))
+            last_price, last_size = self._last_trade.get(symbol, (self.reference_price(symbol), 0))
+            return {
+                'stock_code': symbol,
+                'price': last_price,
+                'reference_price': self.reference_price(symbol),
+                'bid': max(bids) if bids else None,
+                'ask': min(asks) if asks else None,
+                'size': last_size,
+                'volume': self._traded_volume.get(symbol, 0),
+                'timestamp': datetime.now().isoformat()
+            }
+
+    def depth_snapshot(self, symbol: str) -> Dict[str, List[Dict[str, float]]]:
+        """委託簿五檔 (不含模擬流動性)"""
+        with self._lock:
+            book = self.books.get(symbol)
+            if book is None:
+                return {'bids': [], 'asks': []}
+            return {'bids': book.depth(Action.BUY), 'asks': book.depth(Action.SELL)}
+
+    # ===== 委託 =====
+
+    def place_order(
+        self,
+        account: SimulatedAccount,
+        symbol: str,
+        action: Any,
+        quantity: int,
+        price: Optional[float] = None,
+        price_type: Any = PriceType.LIMIT,
+        order_type: Any = OrderType.ROD,
+        order_condition: Any = 'Cash'
+    ) -> Dict[str, Any]:
+        """
+        送出委託並立即撮合
+
+        Args:
+            account: 下單帳戶
+            symbol: 股票代號
+            action: 買賣動作 (Buy/Sell)
+            quantity: 數量 (張)
+            price: 價格 (限價單必填)
+            price_type: 價格類型 (LMT/MKT/MKP 或 PriceType)
+            order_type: 委託類型 (ROD/IOC/FOK)
+            order_condition: 委託條件
+
+        Returns:
+            Dict: 委託當下狀態 (被拒絕時 status 為 Rejected 並附 message)
+
+        Raises:
+            ValueError: 參數無法辨識
+        """
+        action = parse_action(action)
+        price_type = parse_price_type(price_type)
+        order_type = parse_order_type(order_type)
+        events: List[Tuple[SimulatedAccount, Dict[str, Any]]] = []
+        with self._lock:
+            order_id = f"SIM{self._prefix}{next(self._ids):08d}"
+            reference = self.reference_price(symbol)
+            if price_type == PriceType.MARKET:
+                price = None
+            elif price_type == PriceType.MARKET_RANGE:
+                step = tick_size(reference) * MARKET_RANGE_TICKS
+                price = round(reference + step if action == Action.BUY else max(reference - step, 0.01), 2)
+            order = SimOrder(order_id, account, symbol, action, price, quantity,
+                             price_type, order_type, _enum_value(order_condition))
+            order.seq = next(self._seq)
+            account.orders[order_id] = order
+            self._orders[order_id] = order
+            self.stats_counters['orders'] += 1
+
+            reason = self._check(account, order)
+            if reason:
+                order.message = reason
+                self._set_status(order, OrderStatus.REJECTED, events)
+                self.stats_counters['rejected'] += 1
+            else:
+                self._set_status(order, OrderStatus.SUBMITTED, events)
+                self._execute(order, events)
+            result = order.to_dict()
+        self._notify(events)
+        return result
+
+    def cancel_order(self, order_id: str) -> Dict[str, Any]:
+        """
+        刪除委託的未成交部分
+
+        Args:
+            order_id: 委託編號
+
+        Returns:
+            Dict: {success, message, order}
+        """
+        events: List[Tuple[SimulatedAccount, Dict[str, Any]]] = []
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                return {'success': False, 'message': f'Order not found: {order_id}'}
+            if not order.is_open:
+                return {'success': False, 'message': f'Order is {order.status.value}', 'order': order.to_dict()}
+            self.books[order.symbol].remove(order)
+            self._set_status(order, OrderStatus.CANCELLED, events)
+            self.stats_counters['cancelled'] += 1
+            result = {'success': True, 'message': 'Order cancelled', 'order': order.to_dict()}
+        self._notify(events)
+        return result
+
+    def modify_order(
+        self,
+        order_id: str,
+        price: Optional[float] = None,
+        quantity: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        修改委託價格或數量
+
+        改價或加量會重新排隊 (失去時間優先)；減量保留原順序。
+        數量為修改後的委託總量，不得小於已成交數量。
+
+        Args:
+            order_id: 委託編號
+            price: 新價格
+            quantity: 新委託總量 (張)
+
+        Returns:
+            Dict: {success, message, order}
+        """
+        events: List[Tuple[SimulatedAccount, Dict[str, Any]]] = []
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                return {'success': False, 'message': f'Order not found: {order_id}'}
+            if not order.is_open:
+                return {'success': False, 'message': f'Order is {order.status.value}', 'order': order.to_dict()}
+            if quantity is not None and quantity < order.filled_quantity:
+                return {'success': False, 'message': 'Quantity is below filled quantity', 'order': order.to_dict()}
+            if price is not None and order.price_type != PriceType.LIMIT:
+                return {'success': False, 'message': 'Only limit orders can change price', 'order': order.to_dict()}
+
+            book = self.books[order.symbol]
+            book.remove(order)
+            requeue = (price is not None and price != order.price) or (
+                quantity is not None and quantity > order.quantity
+            )
+            old = (order.price, order.quantity)
+            if price is not None:
+                order.price = price
+            if quantity is not None:
+                order.quantity = quantity
+            reason = self._check(order.account, order)
+            if reason:
+                # 改單被拒時委託簿維持原狀
+                order.price, order.quantity = old
+                book.restore(order)
+                return {'success': False, 'message': reason, 'order': order.to_dict()}
+            if requeue:
+                order.seq = next(self._seq)
+
+            if order.remaining == 0:
+                self._set_status(order, OrderStatus.FILLED, events)
+            elif requeue:
+                self._set_status(order, order.status, events)
+                self._execute(order, events)
+            else:
+                # 減量保留原本的時間優先
+                book.restore(order)
+                self._set_status(order, order.status, events)
+            result = {'success': True, 'message': 'Order modified', 'order': order.to_dict()}
+        self._notify(events)
+        return result
+
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+        """取得單筆委託"""
+        with self._lock:
+            order = self._orders.get(order_id)
+            return order.to_dict() if order is not None else None
+
+    # ===== 撮合 =====
+
+    def _check(self, account: SimulatedAccount, order: SimOrder) -> Optional[str]:
+        """下單與改單前的檢查，回傳拒絕原因"""
+        if order.quantity <= 0:
+            return 'Quantity must be positive'
+        if order.price_type == PriceType.LIMIT and (order.price is None or order.price <= 0):
+            return 'Price is required for limit orders'
+        if order.action == Action.BUY:
+            if account.committed_cash(self.reference_price) > account.cash:
+                return 'Insufficient buying power'
+        else:
+            held = account.positions.get(order.symbol, {}).get('quantity', 0)
+            if account.committed_shares(order.symbol) > held:
+                return 'Insufficient position'
+        return None
+
+    def _liquidity(self, order: SimOrder, book: OrderBook, synthetic_only: bool = False):
+        """
+        依價格優先順序列出可與 order 成交的對手
+
+        同價位時委託簿的委託優先於模擬流動性。產生 (價格, 委託簿價位 deque 或
+        模擬流動性 [價格, 剩餘數量])。
+        """
+        side = Action.SELL if order.action == Action.BUY else Action.BUY
+        synthetic = [level for level in self._synthetic_levels(order.symbol, side) if level[1] > 0]
+        resting = [] if synthetic_only else list(book.opposite(order))
+        buying = order.action == Action.BUY
+        limit = order.limit
+        i = j = 0
+        while i < len(resting) or j < len(synthetic):
+            take_book = j >= len(synthetic) or (
+                i < len(resting) and (
+                    resting[i][0] <= synthetic[j][0] if buying else resting[i][0] >= synthetic[j][0]
+                )
+            )
+            price, source = resting[i] if take_book else (synthetic[j][0], synthetic[j])
+            if (buying and price > limit) or (not buying and price < limit):
+                return
+            yield price, source
+            if take_book:
+                i += 1
+            else:
+                j += 1
+
+    def _available(self, order: SimOrder, book: OrderBook) -> int:
+        """可立即成交的數量 (FOK 檢查用，不異動委託簿)"""
+        total = 0
+        for _, source in self._liquidity(order, book):
+            if isinstance(source, deque):
+                total += sum(o.remaining for o in source if o.account is not order.account)
+            else:
+                total += int(source[1])
+            if total >= order.remaining:
+                break
+        return total
+
+    def _execute(self, order: SimOrder, events: List) -> None:
+        """撮合新進或重新排隊的委託，並依委託類型處理剩餘數量"""
+        book = self.books.setdefault(order.symbol, OrderBook())
+        if order.order_type == OrderType.FOK and self._available(order, book) < order.remaining:
+            order.message = 'FOK order could not be fully filled'
+            self._set_status(order, OrderStatus.CANCELLED, events)
+            self.stats_counters['cancelled'] += 1
+            return
+
+        self._match(order, book, events)
+        if order.remaining == 0:
+            return
+        # 市價單與 IOC / FOK 的剩餘數量不留在委託簿
+        if order.order_type != OrderType.ROD or order.price is None:
+            order.message = 'Unfilled quantity cancelled'
+            self._set_status(order, OrderStatus.CANCELLED, events)
+            self.stats_counters['cancelled'] += 1
+        else:
+            book.add(order)
+
+    def _match(self, order: SimOrder, book: OrderBook, events: List, synthetic_only: bool = False) -> None:
+        for price, source in self._liquidity(order, book, synthetic_only):
+            if isinstance(source, deque):
+                for resting in list(source):
+                    if order.remaining == 0:
+                        break
+                    # 同一帳戶的委託不互相成交
+                    if resting.account is order.account:
+                        continue
+                    quantity = min(order.remaining, resting.remaining)
+                    self._fill(resting, price, quantity, events)
+                    self._fill(order, price, quantity, events)
+                    if resting.remaining == 0:
+                        book.remove(resting)
+            else:
+                quantity = int(min(order.remaining, source[1]))
+                source[1] -= quantity
+                self._fill(order, price, quantity, events)
+            if order.remaining == 0:
+                return
+
+    def _fill(self, order: SimOrder, price: float, quantity: int, events: List) -> None:
+        order.filled_quantity += quantity
+        order.filled_amount += price * quantity
+        order.account.apply_fill(order, price, quantity)
+        self._last_trade[order.symbol] = (price, quantity)
+        self._traded_volume[order.symbol] = self._traded_volume.get(order.symbol, 0) + quantity
+        self.stats_counters['fills'] += 1
+        status = OrderStatus.FILLED if order.remaining == 0 else OrderStatus.PARTIALLY_FILLED
+        self._set_status(order, status, events, fill=(price, quantity))
+
+    def _set_status(self, order: SimOrder, status: OrderStatus, events: List,
+                    fill: Optional[Tuple[float, int]] = None) -> None:
+        order.status = status
+        order.updated_at = datetime.now().isoformat()
+        event = order.to_dict()
+        if fill is not None:
+            event['fill_price'], event['fill_quantity'] = fill
+        events.append((order.account, event))
+
+    def _notify(self, events: List[Tuple[SimulatedAccount, Dict[str, Any]]]) -> None:
+        for account, event in events:
+            account.notify(event)
+
+    # ===== 帳戶查詢 =====
+
+    def get_orders(self, account: SimulatedAccount, status: Optional[str] = None,
+                   symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        查詢帳戶委託
+
+        Args:
+            account: 帳戶
+            status: 委託狀態 (選填)
+            symbol: 股票代號 (選填)
+
+        Returns:
+            List[Dict]: 委託列表 (依下單順序)
+        """
+        with self._lock:
+            orders = [
+                o.to_dict() for o in account.orders.values()
+                if (symbol is None or o.symbol == symbol)
+            ]
+        if status:
+            wanted = normalize_status(status)
+            orders = [o for o in orders if normalize_status(o['status']) == wanted]
+        return orders
+
+    def positions(self, account: SimulatedAccount) -> List[Dict[str, Any]]:
+        """帳戶持股 (以參考價計算市值與未實現損益)"""
+        with self._lock:
+            result = []
+            for symbol, position in account.positions.items():
+                quantity = position['quantity']
+                cost = position['average_cost']
+                current = self._last_trade.get(symbol, (self.reference_price(symbol), 0))[0]
+                profit_loss = (current - cost) * quantity * SHARES_PER_LOT
+                result.append({
+                    'stock_code': symbol,
+                    'quantity': quantity,
+                    'average_cost': round(cost, 4),
+                    'current_price': current,
+                    'market_value': current * quantity * SHARES_PER_LOT,
+                    'profit_loss': round(profit_loss, 2),
+                    'profit_loss_pct': round((current / cost - 1) * 100, 2) if cost else 0.0
+                })
+            return result
+
+    def balance(self, account: SimulatedAccount) -> Dict[str, float]:
+        """帳戶餘額與購買力"""
+        with self._lock:
+            available = account.cash - account.committed_cash(self.reference_price)
+            return {
+                'balance': round(account.cash, 2),
+                'buying_power': round(available, 2),
+                'available_balance': round(available, 2)
+            }
+
+    def profit_loss(self, account: SimulatedAccount) -> Dict[str, float]:
+        """帳戶已實現與未實現損益"""
+        unrealized = sum(p['profit_loss'] for p in self.positions(account))
+        total = account.realized_profit_loss + unrealized
+        return {
+            'realized_profit_loss': round(account.realized_profit_loss, 2),
+            'unrealized_profit_loss': round(unrealized, 2),
+            'total_profit_loss': round(total, 2),
+            'fees': round(account.fees, 2),
+            'return_rate': round(total / account.initial_cash * 100, 2) if account.initial_cash else 0.0
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """取得撮合統計資訊"""
+        with self._lock:
+            result = dict(self.stats_counters)
+            result['symbols'] = len(self.books)
+            result['resting_orders'] = sum(
+                len(level) for book in self.books.values()
+                for side in book.levels.values() for level in side.values()
+            )
+            result['accounts'] = len(self.accounts)
+            return result
@@ -0,0 +1,142 @@
+"""
+單元測試 - 帳戶查詢快取
+Unit Tests for Account Cache
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from fubon.account_cache import AccountCache
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAccountCache(unittest.TestCase):
+    """AccountCache 類別測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.broker = MagicMock()
+        self.broker.get_balance.return_value = {'balance': 100}
+        self.clock = FakeClock()
+        self.cache = AccountCache(
+            self.broker,
+            ttls={'balance': 2.0},
+            stale_window=10.0,
+            clock=self.clock
+        )
+
+    def test_hit_within_ttl(self):
+        """測試 TTL 內只查詢一次"""
+        self.assertEqual(self.cache.get('balance'), {'balance': 100})
+        self.assertEqual(self.cache.get('balance'), {'balance': 100})
+
+        self.broker.get_balance.assert_called_once()
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_unknown_resource(self):
+        """測試未知資源"""
+        with self.assertRaises(KeyError):
+            self.cache.get('orders')
+
+    def test_stale_while_revalidate(self):
+        """測試過期後先回傳舊資料並於背景更新"""
+        self.cache.get('balance')
+        self.broker.get_balance.return_value = {'balance': 200}
+        self.clock.now += 5
+
+        self.assertEqual(self.cache.get('balance'), {'balance': 100})
+
+        # 等待背景更新完成
+        for _ in range(100):
+            if self.broker.get_balance.call_count == 2 and not self.cache._flights:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.cache.get('balance'), {'balance': 200})
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_expired_beyond_stale_window(self):
+        """測試超過容忍期間時同步重新查詢"""
+        self.cache.get('balance')
+        self.broker.get_balance.return_value = {'balance': 300}
+        self.clock.now += 20
+
+        self.assertEqual(self.cache.get('balance'), {'balance': 300})
+        self.assertEqual(self.broker.get_balance.call_count, 2)
+
+    def test_single_flight(self):
+        """測試並行未命中只發出一次查詢"""
+        release = threading.Event()
+
+        def slow_balance():
+            release.wait(1)
+            return {'balance': 100}
+
+        self.broker.get_balance.side_effect = slow_balance
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get('balance')))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.05)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 5)
+        self.broker.get_balance.assert_called_once()
+
+    def test_error_shared_and_not_cached(self):
+        """測試查詢錯誤不會寫入快取"""
+        self.broker.get_balance.side_effect = RuntimeError('rate limited')
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get('balance')
+
+        self.broker.get_balance.side_effect = None
+        self.assertEqual(self.cache.get('balance'), {'balance': 100})
+        self.assertEqual(self.cache.stats()['errors'], 1)
+
+    def test_invalidate(self):
+        """測試失效後重新查詢"""
+        self.cache.get('balance')
+        self.cache.invalidate()
+        self.cache.get('balance')
+
+        self.assertEqual(self.broker.get_balance.call_count, 2)
+
+    def test_invalidate_during_load(self):
+        """測試載入期間失效時結果不寫入快取"""
+        def balance_then_invalidate():
+            self.cache.invalidate()
+            return {'balance': 100}
+
+        self.broker.get_balance.side_effect = balance_then_invalidate
+        self.assertEqual(self.cache.get('balance'), {'balance': 100})
+
+        usable, _ = self.cache.lookup('balance')
+        self.assertFalse(usable)
+
+    def test_zero_ttl_disables_caching(self):
+        """測試 TTL 為 0 時不快取"""
+        cache = AccountCache(self.broker, ttls={'balance': 0}, clock=self.clock)
+        cache.get('balance')
+        cache.get('balance')
+
+        self.assertEqual(self.broker.get_balance.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
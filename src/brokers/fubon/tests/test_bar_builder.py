@@ -0,0 +1,125 @@
+"""
+單元測試 - 盤中 K 線聚合
+Unit Tests for Bar Builder
+"""
+
+import unittest
+
+from fubon.bar_builder import BarBuilder
+from fubon.ticks import parse_tick
+
+BASE = 1704067200  # 2024-01-01 00:00:00 UTC，可被 3600 整除
+
+
+def _quote(offset, price, volume=1, **extra):
+    quote = {'symbol': '2330', 'price': price, 'volume': volume, 'timestamp': BASE + offset}
+    quote.update(extra)
+    return quote
+
+
+class TestParseTick(unittest.TestCase):
+    """parse_tick 函式測試"""
+
+    def test_field_aliases(self):
+        """測試不同欄位名稱"""
+        tick = parse_tick({'close': '600.5', 'size': 3, 'time': BASE * 1000, 'bid': 600})
+        self.assertEqual(tick.price, 600.5)
+        self.assertEqual(tick.volume, 3)
+        self.assertEqual(tick.ts, BASE)
+        self.assertEqual(tick.bid, 600)
+
+    def test_iso_time(self):
+        """測試 ISO 時間字串"""
+        tick = parse_tick({'price': 1, 'timestamp': '2024-01-01T00:00:00+00:00'})
+        self.assertEqual(tick.ts, BASE)
+
+    def test_no_price(self):
+        """測試沒有成交價"""
+        self.assertIsNone(parse_tick({'volume': 1}))
+        self.assertIsNone(parse_tick(None))
+
+
+class TestBarBuilder(unittest.TestCase):
+    """BarBuilder 類別測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.builder = BarBuilder(capacity=5)
+
+    def test_ohlcv(self):
+        """測試 K 線聚合"""
+        for offset, price in ((0, 100), (10, 105), (20, 98), (59, 101), (60, 102)):
+            self.builder.on_quote('2330', _quote(offset, price, volume=2))
+
+        bars, _ = self.builder.bars('2330', '1m')
+        self.assertEqual(len(bars), 2)
+        first = bars[0]
+        self.assertEqual(
+            (first['open'], first['high'], first['low'], first['close'], first['volume']),
+            (100, 105, 98, 101, 8)
+        )
+        self.assertEqual(first['timestamp'], BASE)
+
+        five, _ = self.builder.bars('2330', '5')
+        self.assertEqual(len(five), 1)
+        self.assertEqual(five[0]['volume'], 10)
+
+    def test_since_cursor(self):
+        """測試游標只回傳新增或更新的 K 線"""
+        self.builder.on_quote('2330', _quote(0, 100))
+        self.builder.on_quote('2330', _quote(60, 101))
+        _, cursor = self.builder.bars('2330', '1m')
+
+        self.builder.on_quote('2330', _quote(70, 103))
+        bars, new_cursor = self.builder.bars('2330', '1m', since=cursor)
+
+        self.assertEqual(len(bars), 1)
+        self.assertEqual(bars[0]['close'], 103)
+        self.assertGreater(new_cursor, cursor)
+        self.assertEqual(self.builder.bars('2330', '1m', since=new_cursor)[0], [])
+
+    def test_ring_capacity(self):
+        """測試環狀緩衝只保留最近的 K 線"""
+        for minute in range(8):
+            self.builder.on_quote('2330', _quote(minute * 60, 100 + minute))
+
+        bars, _ = self.builder.bars('2330', '1m')
+        self.assertEqual(len(bars), 5)
+        self.assertEqual(bars[0]['open'], 103)
+        self.assertEqual(bars[-1]['open'], 107)
+
+    def test_late_ticks(self):
+        """測試延遲送達的成交"""
+        self.builder.on_quote('2330', _quote(60, 100))
+        self.builder.on_quote('2330', _quote(0, 90))
+
+        bars, _ = self.builder.bars('2330', '1m')
+        self.assertEqual(len(bars), 1)
+        self.assertEqual(bars[0]['volume'], 1)
+        self.assertEqual(self.builder.stats()['ticks'], 2)
+
+    def test_total_volume_delta(self):
+        """測試以累計成交量計算單筆量"""
+        self.builder.on_quote('2330', _quote(0, 100, volume=None, total_volume=1000))
+        self.builder.on_quote('2330', _quote(5, 100, volume=None, total_volume=1005))
+
+        bars, _ = self.builder.bars('2330', '1m')
+        self.assertEqual(bars[0]['volume'], 5)
+
+    def test_unknown_interval(self):
+        """測試不支援的週期"""
+        with self.assertRaises(ValueError):
+            self.builder.bars('2330', '2m')
+
+    def test_max_symbols(self):
+        """測試股票數量上限"""
+        builder = BarBuilder(max_symbols=1)
+        builder.on_quote('2330', _quote(0, 100))
+        builder.on_quote('2317', _quote(0, 100))
+
+        self.assertTrue(builder.has_symbol('2330'))
+        self.assertFalse(builder.has_symbol('2317'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+單元測試 - 歷史 K 線本地儲存
+Unit Tests for Bar Store
+"""
+
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import MagicMock
+
+from fubon.bar_store import BarStore, merge_ranges, subtract_ranges
+
+
+def _bars(*days):
+    return [
+        {'date': f'2024-01-{d:02d}', 'open': d, 'high': d + 1, 'low': d - 1, 'close': d, 'volume': 100 * d}
+        for d in days
+    ]
+
+
+class TestRanges(unittest.TestCase):
+    """區間計算測試"""
+
+    def test_subtract_ranges(self):
+        """測試計算缺少的區間"""
+        self.assertEqual(subtract_ranges(0, 10, []), [(0, 10)])
+        self.assertEqual(subtract_ranges(0, 10, [(3, 5)]), [(0, 2), (6, 10)])
+        self.assertEqual(subtract_ranges(0, 10, [(0, 10)]), [])
+        self.assertEqual(subtract_ranges(4, 6, [(0, 4), (6, 9)]), [(5, 5)])
+
+    def test_merge_ranges(self):
+        """測試合併區間"""
+        self.assertEqual(merge_ranges([(5, 9), (0, 3), (4, 4), (20, 21)]), [(0, 9), (20, 21)])
+
+
+class TestBarStore(unittest.TestCase):
+    """BarStore 類別測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.root = tempfile.mkdtemp()
+        self.store = BarStore(self.root, today=lambda: date(2024, 2, 1))
+        self.fetch = MagicMock(side_effect=lambda start, end: _bars(
+            *[d for d in range(1, 32) if start <= f'2024-01-{d:02d}' <= end]
+        ))
+
+    def tearDown(self):
+        """測試後清理"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_fetch_then_local(self):
+        """測試第二次查詢由本地讀取"""
+        bars, info = self.store.get_range('2330', 'D', '2024-01-01', '2024-01-10', self.fetch)
+        self.assertEqual(len(bars), 10)
+        self.assertFalse(info['local'])
+
+        bars, info = self.store.get_range('2330', 'D', '2024-01-03', '2024-01-05', self.fetch)
+        self.assertTrue(info['local'])
+        self.assertEqual([b['date'] for b in bars], ['2024-01-03', '2024-01-04', '2024-01-05'])
+        self.assertEqual(bars[0]['volume'], 300)
+        self.fetch.assert_called_once()
+
+    def test_fetch_only_gaps(self):
+        """測試只查詢缺少的區間並合併"""
+        self.store.get_range('2330', 'D', '2024-01-05', '2024-01-10', self.fetch)
+        bars, info = self.store.get_range('2330', 'D', '2024-01-01', '2024-01-15', self.fetch)
+
+        self.assertEqual(
+            info['fetched_ranges'],
+            [['2024-01-01', '2024-01-04'], ['2024-01-11', '2024-01-15']]
+        )
+        self.assertEqual(len(bars), 15)
+        self.assertEqual(bars, sorted(bars, key=lambda b: b['date']))
+
+    def test_persisted(self):
+        """測試重新開啟後仍可由磁碟讀取"""
+        self.store.get_range('2330', 'D', '2024-01-01', '2024-01-10', self.fetch)
+
+        reopened = BarStore(self.root, today=lambda: date(2024, 2, 1))
+        bars, info = reopened.get_range('2330', 'D', '2024-01-01', '2024-01-10', self.fetch)
+
+        self.assertTrue(info['local'])
+        self.assertEqual(len(bars), 10)
+
+    def test_today_not_covered(self):
+        """測試當日資料每次都重新查詢"""
+        store = BarStore(self.root, today=lambda: date(2024, 1, 10))
+        store.get_range('2330', 'D', '2024-01-01', '2024-01-10', self.fetch)
+        bars, info = store.get_range('2330', 'D', '2024-01-01', '2024-01-10', self.fetch)
+
+        self.assertEqual(info['fetched_ranges'], [['2024-01-10', '2024-01-10']])
+        self.assertEqual(len(bars), 10)
+
+    def test_empty_result(self):
+        """測試券商無資料 (例如假日) 仍記錄為已查詢"""
+        fetch = MagicMock(return_value=[])
+        bars, _ = self.store.get_range('2330', 'D', '2024-01-06', '2024-01-07', fetch)
+        bars, info = self.store.get_range('2330', 'D', '2024-01-06', '2024-01-07', fetch)
+
+        self.assertEqual(bars, [])
+        self.assertTrue(info['local'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -144,6 +144,45 @@ class TestFubonBrokerMarketData(unittest.TestCase):
         self.assertTrue(result)
         self.broker.sdk.quote.unsubscribe.assert_called_once_with('2330')
         self.assertNotIn('2330', self.broker.quote_callbacks)
+
+    def test_unsubscribe_quote_single_callback(self):
+        """測試只移除指定回調，仍有其他回調時不向 SDK 取消訂閱"""
+        first = Mock()
+        second = Mock()
+        self.broker.subscribe_quote('2330', first)
+        self.broker.subscribe_quote('2330', second)
+
+        self.assertTrue(self.broker.unsubscribe_quote('2330', first))
+        self.broker.sdk.quote.unsubscribe.assert_not_called()
+        self.assertEqual(self.broker.quote_callbacks['2330'], [second])
+
+        self.broker.unsubscribe_quote('2330', second)
+        self.broker.sdk.quote.unsubscribe.assert_called_once_with('2330')
+        self.assertNotIn('2330', self.broker.quote_callbacks)
+
+    def test_dispatch_quote(self):
+        """測試報價推送分派給對應股票的回調"""
+        callback_2330 = Mock()
+        callback_2317 = Mock()
+        self.broker.subscribe_quote('2330', callback_2330)
+        self.broker.subscribe_quote('2317', callback_2317)
+        
+        quote = {'symbol': '2330', 'price': 600}
+        self.broker._dispatch_quote(quote)
+        
+        callback_2330.assert_called_once_with(quote)
+        callback_2317.assert_not_called()
+    
+    def test_dispatch_quote_callback_error(self):
+        """測試單一回調錯誤不影響其他回調"""
+        failing = Mock(side_effect=RuntimeError('boom'))
+        healthy = Mock()
+        self.broker.subscribe_quote('2330', failing)
+        self.broker.subscribe_quote('2330', healthy)
+        
+        self.broker._dispatch_quote({'stock_code': '2330', 'price': 600})
+        
+        healthy.assert_called_once()
     
     def test_get_quote(self):
         """測試取得報價"""
@@ -239,6 +278,47 @@ class TestFubonBrokerOrder(unittest.TestCase):
         self.broker.sdk.order.get_orders.assert_called_once()
 
 
+class TestFubonBrokerOrderCallback(unittest.TestCase):
+    """委託回調功能測試"""
+    
+    def setUp(self):
+        """測試前準備"""
+        self.broker = FubonBroker()
+        self.broker.sdk = MagicMock()
+        self.broker.is_logged_in = True
+    
+    def test_set_order_callback_registers_dispatcher(self):
+        """測試 SDK 只註冊分派函數"""
+        self.broker.set_order_callback(Mock())
+        self.broker.set_order_callback(Mock())
+        
+        self.broker.sdk.order.set_callback.assert_called_with(self.broker._dispatch_order)
+        self.assertEqual(len(self.broker.order_callbacks), 2)
+    
+    def test_dispatch_order(self):
+        """測試委託事件分派給所有回調"""
+        first = Mock(side_effect=RuntimeError('boom'))
+        second = Mock()
+        self.broker.set_order_callback(first)
+        self.broker.set_order_callback(second)
+        
+        event = {'order_id': '12345', 'status': 'Filled'}
+        self.broker._dispatch_order(event)
+        
+        first.assert_called_once_with(event)
+        second.assert_called_once_with(event)
+    
+    def test_remove_order_callback(self):
+        """測試移除委託回調"""
+        callback = Mock()
+        self.broker.set_order_callback(callback)
+        self.broker.remove_order_callback(callback)
+        
+        self.broker._dispatch_order({'order_id': '12345'})
+        
+        callback.assert_not_called()
+
+
 class TestFubonBrokerAccount(unittest.TestCase):
     """帳戶管理功能測試"""
     
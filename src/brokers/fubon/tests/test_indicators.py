@@ -0,0 +1,168 @@
+"""
+單元測試 - 技術指標
+Unit Tests for Technical Indicators
+"""
+
+import math
+import unittest
+
+from fubon import indicators
+from fubon.indicators import (
+    ATR, EMA, RSI, SMA, atr, bollinger, columns_from_records, compute,
+    ema, macd, rolling, rsi, sma, vwap
+)
+
+
+CLOSES = [10.0, 11.0, 12.0, 11.0, 10.0, 12.0, 14.0, 13.0, 15.0, 16.0]
+
+
+class TestMovingAverages(unittest.TestCase):
+    """移動平均測試"""
+
+    def test_sma(self):
+        """測試簡單移動平均與暖機期間"""
+        result = sma(CLOSES, 3)
+        self.assertEqual(result[:2], [None, None])
+        self.assertAlmostEqual(result[2], 11.0)
+        self.assertAlmostEqual(result[-1], sum(CLOSES[-3:]) / 3)
+        self.assertEqual(len(result), len(CLOSES))
+
+    def test_ema_seeded_with_sma(self):
+        """測試 EMA 以 SMA 為起始值"""
+        result = ema(CLOSES, 3)
+        self.assertEqual(result[:2], [None, None])
+        self.assertAlmostEqual(result[2], 11.0)
+        self.assertAlmostEqual(result[3], 11.0 + 0.5 * (11.0 - 11.0))
+        self.assertAlmostEqual(result[4], 11.0 + 0.5 * (10.0 - 11.0))
+
+    def test_incremental_matches_batch(self):
+        """測試增量計算與批次結果一致"""
+        incremental = SMA(4), EMA(4), RSI(4)
+        outputs = [[], [], []]
+        for x in CLOSES:
+            for indicator, output in zip(incremental, outputs):
+                output.append(indicator.update(x))
+        self.assertEqual(outputs[0], sma(CLOSES, 4))
+        self.assertEqual(outputs[1], ema(CLOSES, 4))
+        self.assertEqual(outputs[2], rsi(CLOSES, 4))
+
+    def test_invalid_period(self):
+        """測試週期錯誤"""
+        with self.assertRaises(ValueError):
+            SMA(0)
+
+
+class TestOscillators(unittest.TestCase):
+    """RSI / MACD 測試"""
+
+    def test_rsi_wilder(self):
+        """測試 RSI (Wilder 平滑)"""
+        result = rsi(CLOSES, 3)
+        self.assertEqual(result[:3], [None, None, None])
+        # 前三次變動: +1 +1 -1
+        gain, loss = 2 / 3, 1 / 3
+        self.assertAlmostEqual(result[3], 100 - 100 / (1 + gain / loss))
+        # 下一次變動: -1
+        gain, loss = gain * 2 / 3, (loss * 2 + 1) / 3
+        self.assertAlmostEqual(result[4], 100 - 100 / (1 + gain / loss))
+
+    def test_rsi_all_gains(self):
+        """測試只有上漲時 RSI 為 100"""
+        self.assertEqual(rsi([1, 2, 3, 4], 2)[-1], 100.0)
+
+    def test_macd(self):
+        """測試 MACD 線等於快慢 EMA 差"""
+        result = macd(CLOSES, 2, 4, 3)
+        fast, slow = ema(CLOSES, 2), ema(CLOSES, 4)
+        self.assertIsNone(result['macd'][2])
+        for i in range(3, len(CLOSES)):
+            self.assertAlmostEqual(result['macd'][i], fast[i] - slow[i])
+        self.assertIsNone(result['signal'][4])
+        self.assertIsNotNone(result['signal'][5])
+        self.assertAlmostEqual(result['histogram'][-1], result['macd'][-1] - result['signal'][-1])
+
+    def test_macd_invalid_periods(self):
+        """測試快線週期需短於慢線"""
+        with self.assertRaises(ValueError):
+            macd(CLOSES, 5, 5, 3)
+
+
+class TestVolatility(unittest.TestCase):
+    """布林通道 / ATR / 滾動統計測試"""
+
+    def test_rolling(self):
+        """測試滾動平均、標準差、最高與最低"""
+        result = rolling(CLOSES, 4)
+        for i in range(3, len(CLOSES)):
+            window = CLOSES[i - 3:i + 1]
+            mean = sum(window) / 4
+            self.assertAlmostEqual(result['mean'][i], mean)
+            self.assertAlmostEqual(result['std'][i], math.sqrt(sum((x - mean) ** 2 for x in window) / 4))
+            self.assertEqual(result['max'][i], max(window))
+            self.assertEqual(result['min'][i], min(window))
+        self.assertIsNone(result['max'][2])
+
+    def test_bollinger(self):
+        """測試布林通道"""
+        result = bollinger(CLOSES, 4, 2)
+        stats = rolling(CLOSES, 4)
+        self.assertAlmostEqual(result['upper'][-1], stats['mean'][-1] + 2 * stats['std'][-1])
+        self.assertAlmostEqual(result['lower'][-1], stats['mean'][-1] - 2 * stats['std'][-1])
+        self.assertIsNone(result['mid'][0])
+
+    def test_atr(self):
+        """測試 ATR (含跳空的真實區間)"""
+        high = [11, 12, 15, 14]
+        low = [9, 10, 13, 12]
+        close = [10, 11, 14, 13]
+        result = atr(high, low, close, 2)
+        self.assertIsNone(result[0])
+        # TR: 2, 2, 4 (15 - 前收 11), 2
+        self.assertAlmostEqual(result[1], 2.0)
+        self.assertAlmostEqual(result[2], (2.0 + 4) / 2)
+        self.assertAlmostEqual(result[3], (3.0 + 2) / 2)
+
+        incremental = ATR(2)
+        self.assertEqual([incremental.update(*bar) for bar in zip(high, low, close)], result)
+
+    def test_vwap(self):
+        """測試 VWAP"""
+        result = vwap([11, 13], [9, 11], [10, 12], [100, 300])
+        self.assertAlmostEqual(result[0], 10.0)
+        self.assertAlmostEqual(result[1], (10 * 100 + 12 * 300) / 400)
+        self.assertIsNone(vwap([1], [1], [1], [0])[0])
+
+
+class TestCompute(unittest.TestCase):
+    """指標規格測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.columns = columns_from_records(
+            {'open': c, 'high': c + 1, 'low': c - 1, 'close': c, 'volume': 100} for c in CLOSES
+        )
+
+    def test_columns_from_records(self):
+        """測試欄式轉換"""
+        self.assertEqual(list(self.columns['close']), CLOSES)
+        self.assertEqual(list(columns_from_records([{'close': None}])['close']), [0.0])
+
+    def test_compute_specs(self):
+        """測試規格字串與預設參數"""
+        self.assertEqual(compute('sma:3', self.columns), sma(CLOSES, 3))
+        self.assertEqual(compute('RSI:4', self.columns), rsi(CLOSES, 4))
+        self.assertEqual(compute('bbands:4', self.columns), bollinger(CLOSES, 4, 2.0))
+        self.assertEqual(compute('macd:2:4:3', self.columns), macd(CLOSES, 2, 4, 3))
+        self.assertEqual(len(compute('vwap', self.columns)), len(CLOSES))
+        for name in indicators.SUPPORTED_INDICATORS:
+            compute(name, self.columns)
+
+    def test_compute_invalid_specs(self):
+        """測試錯誤的規格"""
+        for spec in ('foo', 'sma:x', 'sma:3:4', 'vwap:3', 'ema:0'):
+            with self.assertRaises(ValueError):
+                compute(spec, self.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
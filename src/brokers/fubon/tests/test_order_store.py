@@ -0,0 +1,146 @@
+"""
+單元測試 - 委託狀態本地索引
+Unit Tests for Order Store
+"""
+
+import unittest
+
+from fubon.constants import OrderStatus
+from fubon.order_store import OrderStore, normalize_status
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _order(order_id, symbol='2330', status='Submitted', **extra):
+    order = {'order_id': order_id, 'symbol': symbol, 'status': status}
+    order.update(extra)
+    return order
+
+
+class TestNormalizeStatus(unittest.TestCase):
+    """normalize_status 函式測試"""
+
+    def test_aliases(self):
+        """測試各種狀態寫法"""
+        self.assertEqual(normalize_status('filled'), OrderStatus.FILLED)
+        self.assertEqual(normalize_status('Filled'), OrderStatus.FILLED)
+        self.assertEqual(normalize_status('partially_filled'), OrderStatus.PARTIALLY_FILLED)
+        self.assertEqual(normalize_status('PartiallyFilled'), OrderStatus.PARTIALLY_FILLED)
+        self.assertEqual(normalize_status('canceled'), OrderStatus.CANCELLED)
+        self.assertEqual(normalize_status(OrderStatus.REJECTED), OrderStatus.REJECTED)
+
+    def test_unknown(self):
+        """測試無法辨識的狀態"""
+        self.assertIsNone(normalize_status('unknown'))
+        self.assertIsNone(normalize_status(None))
+
+
+class TestOrderStore(unittest.TestCase):
+    """OrderStore 類別測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.clock = FakeClock()
+        self.store = OrderStore(clock=self.clock)
+        self.store.reconcile([
+            _order('A1', '2330', 'Filled'),
+            _order('A2', '2317', 'Submitted'),
+            _order('A3', '2330', 'submitted', stock_code='2330'),
+        ])
+
+    def test_seed(self):
+        """測試初始載入"""
+        self.assertTrue(self.store.seeded)
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get('A2')['symbol'], '2317')
+        self.assertIsNone(self.store.get('missing'))
+
+    def test_query_indexes(self):
+        """測試依狀態與股票代號篩選"""
+        submitted = self.store.query(status='submitted')
+        self.assertEqual([o['order_id'] for o in submitted], ['A2', 'A3'])
+
+        by_symbol = self.store.query(symbol='2330')
+        self.assertEqual([o['order_id'] for o in by_symbol], ['A1', 'A3'])
+
+        both = self.store.query(status=OrderStatus.SUBMITTED, symbol='2330')
+        self.assertEqual([o['order_id'] for o in both], ['A3'])
+
+        self.assertEqual(self.store.query(status='bogus'), [])
+        self.assertEqual(len(self.store.query()), 3)
+
+    def test_event_updates_indexes(self):
+        """測試回調事件更新索引"""
+        self.store.apply_event({'order_id': 'A2', 'status': 'Filled', 'filled_qty': 1})
+
+        order = self.store.get('A2')
+        self.assertEqual(order['status'], 'Filled')
+        self.assertEqual(order['symbol'], '2317')
+        self.assertEqual(order['filled_qty'], 1)
+        self.assertEqual(
+            [o['order_id'] for o in self.store.query(status='filled')],
+            ['A1', 'A2']
+        )
+        self.assertEqual(
+            [o['order_id'] for o in self.store.query(status='submitted')],
+            ['A3']
+        )
+
+    def test_event_new_order(self):
+        """測試回調事件新增委託"""
+        self.store.apply_event(_order('B1', '2454', 'Submitted'))
+        self.assertEqual(self.store.query(symbol='2454')[0]['order_id'], 'B1')
+
+    def test_returns_copies(self):
+        """測試查詢結果不影響內部狀態"""
+        self.store.get('A1')['status'] = 'Cancelled'
+        self.assertEqual(self.store.get('A1')['status'], 'Filled')
+
+    def test_reconcile_drift(self):
+        """測試對帳偵測差異"""
+        drift = self.store.reconcile([
+            _order('A1', '2330', 'Filled'),
+            _order('A2', '2317', 'Cancelled'),
+            _order('A4', '2603', 'Submitted'),
+        ])
+
+        self.assertEqual(drift, {'added': 1, 'removed': 1, 'changed': 1})
+        self.assertIsNone(self.store.get('A3'))
+        self.assertEqual(self.store.query(status='cancelled')[0]['order_id'], 'A2')
+        self.assertEqual(self.store.stats()['drift_changed'], 1)
+
+    def test_sync_keeps_newer_events(self):
+        """測試對帳期間收到的事件不被快照覆蓋"""
+        def fetch():
+            # 查詢進行中收到新事件
+            self.store.apply_event({'order_id': 'A2', 'status': 'Filled'})
+            self.store.apply_event(_order('B1', '2454', 'Submitted'))
+            return [
+                _order('A1', '2330', 'Filled'),
+                _order('A2', '2317', 'Submitted'),
+                _order('A3', '2330', 'submitted', stock_code='2330'),
+            ]
+
+        self.store.sync(fetch)
+
+        self.assertEqual(self.store.get('A2')['status'], 'Filled')
+        self.assertIsNotNone(self.store.get('B1'))
+
+    def test_needs_sync(self):
+        """測試對帳間隔"""
+        self.assertFalse(self.store.needs_sync(30))
+        self.clock.now += 31
+        self.assertTrue(self.store.needs_sync(30))
+        self.assertTrue(OrderStore().needs_sync(30))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+單元測試 - SDK 呼叫排程器
+Unit Tests for Request Scheduler
+"""
+
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from fubon.broker import FubonBroker
+from fubon.rate_limiter import RequestScheduler
+
+
+class TestRequestScheduler(unittest.TestCase):
+    """RequestScheduler 類別測試"""
+
+    def test_burst_without_wait(self):
+        """測試額度內不需等待"""
+        scheduler = RequestScheduler(limits={'query': (1.0, 3)}, global_limit=None)
+
+        waits = [scheduler.acquire('query') for _ in range(3)]
+
+        self.assertTrue(all(w < 0.01 for w in waits))
+        self.assertEqual(scheduler.stats()['categories']['query']['acquired'], 3)
+
+    def test_wait_when_exhausted(self):
+        """測試額度用完時等待補充"""
+        scheduler = RequestScheduler(limits={'query': (20.0, 1)}, global_limit=None)
+
+        scheduler.acquire('query')
+        waited = scheduler.acquire('query')
+
+        self.assertGreaterEqual(waited, 0.03)
+        self.assertEqual(scheduler.stats()['categories']['query']['waited'], 1)
+
+    def test_categories_independent(self):
+        """測試各類別額度互不影響"""
+        scheduler = RequestScheduler(
+            limits={'query': (1.0, 1), 'order': (1.0, 1)},
+            global_limit=None
+        )
+
+        scheduler.acquire('query')
+        self.assertLess(scheduler.acquire('order'), 0.01)
+
+    def test_unknown_category(self):
+        """測試未知類別"""
+        scheduler = RequestScheduler()
+        with self.assertRaises(ValueError):
+            scheduler.acquire('unknown')
+
+    def test_timeout(self):
+        """測試等待逾時"""
+        scheduler = RequestScheduler(limits={'query': (1.0, 1)}, global_limit=None)
+
+        scheduler.acquire('query')
+        with self.assertRaises(TimeoutError):
+            scheduler.acquire('query', timeout=0.05)
+
+        self.assertEqual(scheduler.stats()['categories']['query']['timeouts'], 1)
+
+    def test_priority_preempts_queries(self):
+        """測試總額度不足時下單優先於查詢"""
+        scheduler = RequestScheduler(
+            limits={'query': (100.0, 10), 'order': (100.0, 10)},
+            global_limit=(5.0, 1)
+        )
+        scheduler.acquire('query')
+        granted = []
+
+        def call(category):
+            scheduler.acquire(category)
+            granted.append(category)
+
+        query_thread = threading.Thread(target=call, args=('query',))
+        query_thread.start()
+        time.sleep(0.05)
+        order_thread = threading.Thread(target=call, args=('order',))
+        order_thread.start()
+        query_thread.join(2)
+        order_thread.join(2)
+
+        self.assertEqual(granted, ['order', 'query'])
+
+
+class TestFubonBrokerThrottle(unittest.TestCase):
+    """FubonBroker SDK 呼叫排程測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.scheduler = MagicMock()
+        self.broker = FubonBroker(scheduler=self.scheduler)
+        self.broker.sdk = MagicMock()
+        self.broker.is_logged_in = True
+
+    def test_order_category(self):
+        """測試下單使用 order 額度"""
+        self.broker.sdk.order.cancel_order.return_value = True
+
+        self.broker.cancel_order('ORDER_1')
+
+        self.scheduler.acquire.assert_called_once_with('order')
+
+    def test_query_category(self):
+        """測試帳戶查詢使用 query 額度"""
+        self.broker.get_balance()
+
+        self.scheduler.acquire.assert_called_once_with('query')
+
+    def test_market_category(self):
+        """測試行情查詢使用 market 額度"""
+        self.broker.get_quote('2330')
+
+        self.scheduler.acquire.assert_called_once_with('market')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+單元測試 - 事件錄製
+Unit Tests for Event Recorder
+"""
+
+import os
+import tempfile
+import unittest
+
+from fubon.broker_mock import FubonBroker as MockBroker
+from fubon.recorder import KIND_ORDER, KIND_QUOTE, EventRecorder, RecordingReader
+from fubon.replay import merge_ticks, open_source
+
+
+class TestEventRecorder(unittest.TestCase):
+    """EventRecorder / RecordingReader 測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        """測試後清理"""
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """測試寫入後依序讀回"""
+        recorder = EventRecorder(self.directory)
+        quote = {'symbol': '2330', 'price': 600.0, 'timestamp': 1000}
+        recorder.record_quote(quote)
+        quote['price'] = 0  # 錄製的是放入當下的內容
+        recorder.record_order({'order_id': 'A', 'status': 'Filled'})
+        recorder.close()
+
+        records = list(RecordingReader(self.directory).read())
+        self.assertEqual([r.kind for r in records], [KIND_QUOTE, KIND_ORDER])
+        self.assertEqual(records[0].payload['price'], 600.0)
+        self.assertEqual(list(RecordingReader(self.directory).orders()), [{'order_id': 'A', 'status': 'Filled'}])
+        self.assertEqual(recorder.stats()['written'], 2)
+
+    def test_segment_rotation_and_time_seek(self):
+        """測試區段輪替與依時間定位"""
+        recorder = EventRecorder(self.directory, segment_bytes=512, index_interval=4)
+        for i in range(100):
+            recorder.record_quote({'symbol': '2330', 'price': 600 + i, 'seq': i})
+        recorder.close()
+
+        reader = RecordingReader(self.directory)
+        segments = reader.segments()
+        self.assertGreater(len(segments), 1)
+        records = list(reader.read())
+        self.assertEqual([r.payload['seq'] for r in records], list(range(100)))
+
+        middle = records[60].ts
+        after = list(reader.read(start=middle))
+        self.assertEqual(after[0].ts, middle)
+        self.assertTrue(all(r.ts >= middle for r in after))
+        self.assertEqual(len(list(reader.read(end=records[9].ts))), len([r for r in records if r.ts <= records[9].ts]))
+
+    def test_truncated_tail_is_ignored(self):
+        """測試寫到一半的記錄不影響先前的資料"""
+        recorder = EventRecorder(self.directory)
+        for i in range(3):
+            recorder.record_quote({'seq': i})
+        recorder.close()
+        path = RecordingReader(self.directory).segments()[0]['path']
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 3)
+
+        self.assertEqual([r.payload['seq'] for r in RecordingReader(self.directory).read()], [0, 1])
+
+    def test_new_segment_on_restart_and_retention(self):
+        """測試重新啟動時開新區段，並只保留最近的區段"""
+        for _ in range(3):
+            recorder = EventRecorder(self.directory, max_segments=2)
+            recorder.record_quote({'price': 1})
+            recorder.close()
+        self.assertEqual([s['segment'] for s in RecordingReader(self.directory).segments()], [2, 3])
+
+    def test_drop_when_queue_full(self):
+        """測試佇列滿時捨棄而不阻塞"""
+        recorder = EventRecorder(self.directory, queue_size=1)
+        recorder.close()
+        self.assertFalse(recorder.record_quote({'price': 1}))
+
+    def test_broker_dispatch_is_recorded_and_replayable(self):
+        """測試 broker 分派的事件被錄製並可作為重播來源"""
+        recorder = EventRecorder(self.directory)
+        broker = MockBroker(recorder=recorder)
+        broker.login('user', 'pw', '/cert')
+        broker._dispatch_quote({'symbol': '2330', 'price': 610.0, 'timestamp': 1000})
+        broker.place_order('2330', 'Buy', 620, 1)
+        recorder.close()
+
+        reader = RecordingReader(self.directory)
+        self.assertEqual(len(list(reader.quotes())), 1)
+        self.assertTrue(any(e['status'] == 'Filled' for e in reader.orders()))
+        self.assertEqual([q['price'] for _, q in merge_ticks([open_source(self.directory)])], [610.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
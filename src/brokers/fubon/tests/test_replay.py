@@ -0,0 +1,129 @@
+"""
+單元測試 - tick 重播
+Unit Tests for Tick Replay
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from fubon.replay import LatencyRecorder, TickReplayer, merge_ticks, read_tick_file
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTickFiles(unittest.TestCase):
+    """tick 檔讀取與合併測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmp.name, '2330.csv')
+        with open(self.csv_path, 'w', encoding='utf-8') as f:
+            f.write('timestamp,price,volume\n1000,600,1\n1002,601.5,2\n')
+        self.jsonl_path = os.path.join(self.tmp.name, 'mixed.jsonl')
+        with open(self.jsonl_path, 'w', encoding='utf-8') as f:
+            for ts, symbol in ((1001, '2317'), (1002, '2317'), (1003, '2454')):
+                f.write(json.dumps({'symbol': symbol, 'timestamp': ts, 'price': 100}) + '\n')
+
+    def tearDown(self):
+        """測試後清理"""
+        self.tmp.cleanup()
+
+    def test_read_csv_uses_file_name_as_symbol(self):
+        """測試 CSV 讀取與數值轉換"""
+        rows = list(read_tick_file(self.csv_path))
+        self.assertEqual(rows[0], {'timestamp': 1000, 'price': 600, 'volume': 1, 'symbol': '2330'})
+        self.assertEqual(rows[1]['price'], 601.5)
+
+    def test_merge_is_time_ordered_and_deterministic(self):
+        """測試依時間合併，同時間依來源順序"""
+        merged = list(merge_ticks([read_tick_file(self.csv_path), read_tick_file(self.jsonl_path)]))
+        self.assertEqual([ts for ts, _ in merged], [1000, 1001, 1002, 1002, 1003])
+        self.assertEqual([q['symbol'] for _, q in merged], ['2330', '2317', '2330', '2317', '2454'])
+
+    def test_merge_skips_rows_without_price(self):
+        """測試略過沒有成交價的資料"""
+        merged = list(merge_ticks([[{'symbol': 'x', 'timestamp': 1}, {'symbol': 'x', 'timestamp': 2, 'price': 1}]]))
+        self.assertEqual(len(merged), 1)
+
+
+class TestTickReplayer(unittest.TestCase):
+    """TickReplayer 類別測試"""
+
+    def _source(self):
+        return [{'symbol': '2330', 'timestamp': 1000 + i * 2, 'price': 600 + i} for i in range(3)]
+
+    def test_realtime_pacing(self):
+        """測試依原始時間間隔送出"""
+        clock = FakeClock()
+        received = []
+        replayer = TickReplayer(received.append, [self._source()], speed=1, clock=clock, sleep=clock.sleep)
+        stats = replayer.run()
+
+        self.assertEqual([q['price'] for q in received], [600, 601, 602])
+        self.assertAlmostEqual(sum(clock.sleeps), 4.0)
+        self.assertIn('replay_ts', received[0])
+        self.assertEqual(stats['ticks'], 3)
+        self.assertEqual(stats['market_seconds'], 4.0)
+
+    def test_accelerated_and_max_speed(self):
+        """測試倍速與最快速度"""
+        clock = FakeClock()
+        TickReplayer(lambda q: None, [self._source()], speed=4, clock=clock, sleep=clock.sleep).run()
+        self.assertAlmostEqual(sum(clock.sleeps), 1.0)
+
+        clock = FakeClock()
+        TickReplayer(lambda q: None, [self._source()], speed=0, clock=clock, sleep=clock.sleep).run()
+        self.assertEqual(clock.sleeps, [])
+
+    def test_dispatch_errors_are_counted(self):
+        """測試分派錯誤不中斷重播"""
+        def dispatch(quote):
+            raise RuntimeError('boom')
+
+        stats = TickReplayer(dispatch, [self._source()], speed=None).run()
+        self.assertEqual(stats['ticks'], 3)
+        self.assertEqual(stats['errors'], 3)
+
+    def test_background_stop(self):
+        """測試背景執行與停止"""
+        source = ({'symbol': '2330', 'timestamp': 1000 + i * 60, 'price': 600} for i in range(100))
+        replayer = TickReplayer(lambda q: None, [source], speed=1)
+        replayer.start()
+        replayer.stop(timeout=2)
+        self.assertFalse(replayer.running)
+        self.assertLess(replayer.ticks, 100)
+
+
+class TestLatencyRecorder(unittest.TestCase):
+    """LatencyRecorder 類別測試"""
+
+    def test_summary(self):
+        """測試百分位數與樣本上限"""
+        recorder = LatencyRecorder(max_samples=100)
+        self.assertEqual(recorder.summary(), {'count': 0})
+        for i in range(200):
+            recorder.record(i / 1000)
+        summary = recorder.summary()
+        self.assertEqual(summary['count'], 200)
+        self.assertEqual(summary['max_ms'], 199.0)
+        self.assertEqual(summary['p50_ms'], 150.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+單元測試 - SDK 日誌解碼與查詢
+Unit Tests for SDK Log Reader
+"""
+
+import base64
+import os
+import re
+import tempfile
+import threading
+import unittest
+
+from fubon.sdk_log import SdkLogFile, SdkLogReader, decode_line, parse_time
+
+
+def _b64(text: str) -> bytes:
+    return base64.b64encode(text.encode('utf-8')) + b'\n'
+
+
+PROGRAM_LINES = [
+    '[2025-11-06 10:29:57.624705083 +08:00 DEBUG tungstenite::client] Trying to contact wss://example',
+    '[2025-11-06 10:29:57.692980954 +08:00 INFO sdk_core::transport::websocket_connection] Successfully connected',
+    # 多執行緒寫入時相鄰行的時間可能倒序
+    '[2025-11-06 10:29:57.692900000 +08:00 WARN sdk_core::fubon::ws_connector] reconnecting websocket',
+    '[2025-11-06 11:48:20.418839602 +08:00 INFO fubon_neo::callback] 登入成功',
+]
+CLIENT_LINES = [
+    '[2025-11-06 10:29:58.202132115 +08:00 INFO] [login] personal_id="A123456789"',
+]
+
+
+class TestSdkLog(unittest.TestCase):
+    """SdkLogFile / SdkLogReader 測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.log_dir = os.path.join(self.tmp.name, 'log')
+        self.index_dir = os.path.join(self.tmp.name, 'index')
+        os.makedirs(self.log_dir)
+        self.program = os.path.join(self.log_dir, 'program.log.20251106')
+        with open(self.program, 'wb') as f:
+            for line in PROGRAM_LINES:
+                f.write(_b64(line))
+        with open(os.path.join(self.log_dir, 'client.log.20251106'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(CLIENT_LINES) + '\n')
+
+    def tearDown(self):
+        """測試後清理"""
+        self.tmp.cleanup()
+
+    def test_decode_line(self):
+        """測試 base64 與明文行的解碼"""
+        self.assertEqual(decode_line(_b64(PROGRAM_LINES[0])), PROGRAM_LINES[0])
+        self.assertEqual(decode_line(CLIENT_LINES[0].encode('utf-8')), CLIENT_LINES[0])
+        self.assertEqual(decode_line(b'not base64!'), 'not base64!')
+
+    def test_query_merges_files_in_time_order(self):
+        """測試跨檔依時間合併，倒序的行也依時間輸出"""
+        reader = SdkLogReader([self.log_dir])
+        entries = list(reader.query())
+        self.assertEqual(len(entries), 5)
+        self.assertEqual([e.ts for e in entries], sorted(e.ts for e in entries))
+        self.assertEqual(entries[1].component, 'sdk_core::fubon::ws_connector')
+        self.assertEqual(entries[3].component, 'login')
+        self.assertEqual(entries[4].text, PROGRAM_LINES[3])
+
+    def test_filters(self):
+        """測試時間、等級、元件與內容過濾"""
+        reader = SdkLogReader([self.log_dir])
+        start = parse_time('2025-11-06 10:29:57.692')
+        end = parse_time('2025-11-06 10:30')
+        self.assertEqual(len(list(reader.query(start, end))), 3)
+        self.assertEqual([e.level for e in reader.query(min_level=3)], ['WARN'])
+        self.assertEqual(len(list(reader.query(component='WS_CONNECTOR'))), 1)
+        self.assertEqual(len(list(reader.query(pattern=re.compile('personal_id')))), 1)
+        self.assertEqual(len(list(reader.query(kinds=['client']))), 1)
+        self.assertEqual(len(list(reader.query(limit=2))), 2)
+        # 檔名日期在範圍外的檔案不會讀取
+        self.assertEqual(list(reader.query(start=parse_time('2025-11-07'))), [])
+
+    def test_persisted_index_is_extended_on_append(self):
+        """測試索引檔保存後只索引新增的完整行"""
+        log_file = SdkLogFile(self.program, self.index_dir)
+        self.assertEqual(log_file.refresh(), 4)
+        self.assertTrue(os.path.exists(log_file.index_path))
+
+        with open(self.program, 'ab') as f:
+            f.write(_b64('[2025-11-06 12:00:00.000000000 +08:00 ERROR client] login failed'))
+            f.write(base64.b64encode(b'[2025-11-06 12:00:01'))  # 尚未寫完的行
+
+        reloaded = SdkLogFile(self.program, self.index_dir)
+        self.assertEqual(reloaded.refresh(), 1)
+        self.assertEqual(len(reloaded), 5)
+        self.assertEqual([e.component for e in reloaded.read(min_level=4)], ['client'])
+
+    def test_replaced_file_is_reindexed(self):
+        """測試日誌檔被替換時重建索引"""
+        log_file = SdkLogFile(self.program, self.index_dir)
+        log_file.refresh()
+        with open(self.program, 'wb') as f:
+            f.write(_b64(PROGRAM_LINES[3]))
+        self.assertEqual(log_file.refresh(), 1)
+        self.assertEqual(len(log_file), 1)
+
+    def test_continuation_lines_belong_to_previous_entry(self):
+        """測試無法解析的行歸入前一筆"""
+        path = os.path.join(self.log_dir, 'notify.log.20251106')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('[2025-11-06 10:00:00.000000000 +08:00 INFO] [notify] body=\n{"a": 1}\n')
+        entries = list(SdkLogFile(path).read())
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].text.splitlines()[1], '{"a": 1}')
+
+    def test_follow(self):
+        """測試 tail 只輸出啟動後新增的日誌"""
+        reader = SdkLogReader([self.log_dir])
+        follower = reader.follow(kinds=['program'], poll_interval=0.01)
+
+        def append():
+            with open(self.program, 'ab') as f:
+                f.write(_b64('[2025-11-06 12:00:00.000000000 +08:00 WARN sdk_core::fubon::ws_connector] reconnect'))
+
+        timer = threading.Timer(0.1, append)
+        timer.start()
+        self.assertTrue(next(follower).text.endswith('reconnect'))
+        timer.join()
+
+    def test_parse_time(self):
+        """測試查詢時間解析"""
+        self.assertEqual(parse_time('15m', now=1000.0), 100.0)
+        self.assertEqual(parse_time('2025-11-06 08:00'), parse_time('2025-11-06T00:00:00+00:00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
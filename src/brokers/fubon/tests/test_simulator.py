@@ -0,0 +1,202 @@
+"""
+單元測試 - 模擬交易所
+Unit Tests for Exchange Simulator
+"""
+
+import unittest
+
+from fubon.broker_mock import FubonBroker as MockBroker
+from fubon.rate_limiter import RequestScheduler
+from fubon.simulator import SHARES_PER_LOT, SimulatedExchange, tick_size
+
+
+class TestSimulatedExchange(unittest.TestCase):
+    """SimulatedExchange 類別測試"""
+
+    def setUp(self):
+        """測試前準備 (不提供模擬流動性，只撮合委託簿)"""
+        self.exchange = SimulatedExchange(initial_prices={'2330': 600.0}, depth=0)
+        self.buyer = self.exchange.open_account('buyer', cash=1e9)
+        self.seller = self.exchange.open_account('seller', cash=1e9, positions={'2330': (100, 500.0)})
+        self.events = []
+        self.buyer.add_listener(self.events.append)
+
+    def _sell(self, price, quantity, order_type='ROD'):
+        return self.exchange.place_order(self.seller, '2330', 'Sell', quantity, price=price,
+                                         order_type=order_type)
+
+    def _buy(self, price, quantity, order_type='ROD', price_type='LMT'):
+        return self.exchange.place_order(self.buyer, '2330', 'Buy', quantity, price=price,
+                                         price_type=price_type, order_type=order_type)
+
+    def test_unique_order_ids(self):
+        """測試委託編號不重複"""
+        ids = {self._sell(700, 1)['order_id'] for _ in range(50)}
+        self.assertEqual(len(ids), 50)
+
+    def test_price_time_priority(self):
+        """測試價格優先、時間優先與部分成交"""
+        first = self._sell(601, 2)
+        second = self._sell(601, 2)
+        cheaper = self._sell(602, 1)
+        cheapest = self._sell(600, 1)
+
+        result = self._buy(601, 2)
+        self.assertEqual(result['status'], 'Filled')
+        self.assertEqual(result['avg_fill_price'], 600.5)
+        self.assertEqual(self.exchange.get_order(cheapest['order_id'])['status'], 'Filled')
+        self.assertEqual(self.exchange.get_order(first['order_id'])['status'], 'PartiallyFilled')
+        self.assertEqual(self.exchange.get_order(second['order_id'])['filled_quantity'], 0)
+        self.assertEqual(self.exchange.get_order(cheaper['order_id'])['filled_quantity'], 0)
+
+    def test_rod_rests_and_ioc_cancels(self):
+        """測試 ROD 剩餘掛單、IOC 剩餘取消"""
+        self._sell(600, 1)
+        rod = self._buy(600, 3)
+        self.assertEqual(rod['status'], 'PartiallyFilled')
+        self.assertEqual(self.exchange.depth_snapshot('2330')['bids'], [{'price': 600, 'quantity': 2}])
+
+        self._sell(605, 1)
+        ioc = self._buy(605, 3, order_type='IOC')
+        self.assertEqual(ioc['status'], 'Cancelled')
+        self.assertEqual(ioc['filled_quantity'], 1)
+
+    def test_fok_all_or_nothing(self):
+        """測試 FOK 無法全部成交時不成交"""
+        ask = self._sell(600, 2)
+        fok = self._buy(600, 3, order_type='FOK')
+        self.assertEqual(fok['status'], 'Cancelled')
+        self.assertEqual(fok['filled_quantity'], 0)
+        self.assertEqual(self.exchange.get_order(ask['order_id'])['filled_quantity'], 0)
+
+        fok = self._buy(600, 2, order_type='FOK')
+        self.assertEqual(fok['status'], 'Filled')
+
+    def test_market_order(self):
+        """測試市價單成交後剩餘取消"""
+        self._sell(650, 1)
+        result = self._buy(None, 2, price_type='MKT')
+        self.assertEqual(result['filled_quantity'], 1)
+        self.assertEqual(result['status'], 'Cancelled')
+
+    def test_cancel_and_modify(self):
+        """測試刪單與改單"""
+        order = self._buy(590, 2)
+        self.assertTrue(self.exchange.modify_order(order['order_id'], quantity=1)['success'])
+        self.assertEqual(self.exchange.depth_snapshot('2330')['bids'], [{'price': 590, 'quantity': 1}])
+
+        self._sell(595, 1)
+        self.assertTrue(self.exchange.modify_order(order['order_id'], price=595)['success'])
+        self.assertEqual(self.exchange.get_order(order['order_id'])['status'], 'Filled')
+
+        self.assertFalse(self.exchange.cancel_order(order['order_id'])['success'])
+        resting = self._buy(580, 1)
+        self.assertTrue(self.exchange.cancel_order(resting['order_id'])['success'])
+        self.assertEqual(self.exchange.depth_snapshot('2330')['bids'], [])
+        self.assertFalse(self.exchange.cancel_order('unknown')['success'])
+
+    def test_rejected_modify_keeps_queue_position(self):
+        """測試改單被拒時不影響排隊順序"""
+        first = self._buy(590, 1)
+        second = self._buy(590, 1)
+        result = self.exchange.modify_order(first['order_id'], quantity=10 ** 9)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['message'], 'Insufficient buying power')
+
+        self._sell(590, 1)
+        self.assertEqual(self.exchange.get_order(first['order_id'])['status'], 'Filled')
+        self.assertEqual(self.exchange.get_order(second['order_id'])['filled_quantity'], 0)
+
+    def test_account_updates(self):
+        """測試成交後的現金、持股與損益"""
+        self._sell(600, 2)
+        self._buy(600, 2)
+
+        positions = {p['stock_code']: p for p in self.exchange.positions(self.buyer)}
+        self.assertEqual(positions['2330']['quantity'], 2)
+        self.assertLess(self.buyer.cash, 1e9 - 600 * 2 * SHARES_PER_LOT)
+        self.assertEqual(self.seller.positions['2330']['quantity'], 98)
+        self.assertGreater(self.exchange.profit_loss(self.seller)['realized_profit_loss'], 0)
+
+    def test_rejections(self):
+        """測試資金與持股不足時拒絕"""
+        poor = self.exchange.open_account('poor', cash=1000)
+        result = self.exchange.place_order(poor, '2330', 'Buy', 1, price=600)
+        self.assertEqual(result['status'], 'Rejected')
+        result = self.exchange.place_order(poor, '2330', 'Sell', 1, price=600)
+        self.assertEqual(result['status'], 'Rejected')
+
+    def test_events(self):
+        """測試委託事件"""
+        self._sell(600, 1)
+        self._buy(600, 2)
+        statuses = [e['status'] for e in self.events]
+        self.assertEqual(statuses, ['Submitted', 'PartiallyFilled'])
+        self.assertEqual(self.events[-1]['fill_quantity'], 1)
+
+    def test_synthetic_liquidity_and_price_update(self):
+        """測試模擬流動性與參考價移動時撮合掛單"""
+        exchange = SimulatedExchange(initial_prices={'2330': 600.0}, depth=2, level_quantity=5)
+        account = exchange.open_account('a', cash=1e9)
+        result = exchange.place_order(account, '2330', 'Buy', 7, price=605)
+        self.assertEqual(result['filled_quantity'], 7)
+        self.assertAlmostEqual(result['avg_fill_price'], (601 * 5 + 602 * 2) / 7, places=3)
+
+        resting = exchange.place_order(account, '2330', 'Buy', 3, price=590)
+        self.assertEqual(resting['status'], 'Submitted')
+        exchange.update_price('2330', 589)
+        self.assertEqual(exchange.get_order(resting['order_id'])['status'], 'Filled')
+
+    def test_tick_size(self):
+        """測試升降單位"""
+        self.assertEqual(tick_size(9.5), 0.01)
+        self.assertEqual(tick_size(600), 1.0)
+        self.assertEqual(tick_size(1200), 5.0)
+
+
+class TestMockBroker(unittest.TestCase):
+    """Mock broker 以模擬交易所運作的測試"""
+
+    def test_order_flow(self):
+        """測試下單、回調與查詢"""
+        broker = MockBroker()
+        broker.login('user', 'pw', '/cert')
+        events = []
+        broker.set_order_callback(events.append)
+
+        result = broker.place_order('2330', 'Buy', 601, 1)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['status'], 'Filled')
+        self.assertTrue(events)
+        self.assertEqual(broker.get_order(result['order_id'])['status'], 'Filled')
+        self.assertEqual(len(broker.get_orders(status='filled')), 1)
+        self.assertEqual(broker.get_position('2330')['quantity'], 11)
+
+        resting = broker.place_order('2330', 'Buy', 500, 1)
+        self.assertEqual(broker.get_orders(status='Submitted')[0]['order_id'], resting['order_id'])
+        self.assertTrue(broker.cancel_order(resting['order_id'])['success'])
+
+    def test_quote_updates_reference(self):
+        """測試推送報價更新參考價"""
+        broker = MockBroker()
+        broker.login('user', 'pw', '/cert')
+        broker._dispatch_quote({'symbol': '2330', 'price': 620.0})
+        self.assertEqual(broker.get_quote('2330')['reference_price'], 620.0)
+
+    def test_scheduler_throttles_calls(self):
+        """測試設定排程器時依類別取得 SDK 呼叫額度"""
+        scheduler = RequestScheduler(global_limit=None)
+        broker = MockBroker(scheduler=scheduler)
+        broker.login('user', 'pw', '/cert')
+        broker.place_order('2330', 'Buy', 590, 1)
+        broker.get_orders()
+        broker.get_orders()
+
+        categories = scheduler.stats()['categories']
+        self.assertEqual(categories['order']['acquired'], 1)
+        self.assertEqual(categories['query']['acquired'], 2)
+        self.assertEqual(categories['market']['acquired'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+單元測試 - tick 儲存
+Unit Tests for Tick Store
+"""
+
+import unittest
+
+from fubon.tick_store import TickStore
+
+
+def _quote(ts, price, volume=1):
+    return {'price': price, 'volume': volume, 'timestamp': ts, 'bid': price - 1, 'ask': price + 1}
+
+
+class TestTickStore(unittest.TestCase):
+    """TickStore 類別測試"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.store = TickStore(capacity=4, max_symbols=2)
+
+    def test_append_and_column(self):
+        """測試寫入與讀取"""
+        for i in range(3):
+            self.store.on_quote('2330', _quote(1000 + i, 100 + i))
+
+        self.assertEqual(list(self.store.column('2330', 'price')), [100, 101, 102])
+        self.assertEqual(list(self.store.column('2330', 'ask', 2)), [102, 103])
+        self.assertEqual(len(self.store.column('9999', 'price')), 0)
+
+    def test_ring_wraparound_segments(self):
+        """測試緩衝繞回時的片段"""
+        for i in range(6):
+            self.store.on_quote('2330', _quote(1000 + i, 100 + i))
+
+        segments = self.store.segments('2330', 'price')
+        self.assertEqual(len(segments), 2)
+        self.assertEqual([v for s in segments for v in s.tolist()], [102, 103, 104, 105])
+        self.assertEqual(list(self.store.column('2330', 'price', 3)), [103, 104, 105])
+
+    def test_segments_zero_copy(self):
+        """測試片段直接指向緩衝"""
+        self.store.on_quote('2330', _quote(1000, 100))
+        segment = self.store.segments('2330', 'price')[0]
+
+        self.store.on_quote('2330', _quote(1001, 101))
+        self.store.on_quote('2330', _quote(1002, 102))
+        self.store.on_quote('2330', _quote(1003, 103))
+        self.store.on_quote('2330', _quote(1004, 104))
+
+        # 第五筆覆蓋了第一筆的位置
+        self.assertEqual(segment[0], 104)
+
+    def test_evicts_least_recently_updated(self):
+        """測試超過股票上限時淘汰最久未更新者"""
+        self.store.on_quote('2330', _quote(1000, 100))
+        self.store.on_quote('2317', _quote(1000, 50))
+        self.store.on_quote('2330', _quote(1001, 101))
+        self.store.on_quote('2454', _quote(1001, 900))
+
+        self.assertIn('2330', self.store)
+        self.assertNotIn('2317', self.store)
+        self.assertEqual(self.store.stats()['evicted'], 1)
+
+    def test_window(self):
+        """測試多欄位快照"""
+        self.store.on_quote('2330', _quote(1000, 100, volume=5))
+        window = self.store.window('2330')
+
+        self.assertEqual(list(window['volume']), [5])
+        self.assertEqual(list(window['bid']), [99])
+
+    def test_unknown_column(self):
+        """測試未知欄位"""
+        with self.assertRaises(ValueError):
+            self.store.column('2330', 'open')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Tick Store
+即時成交 tick 儲存
+
+為每檔訂閱中的股票保留最近 N 筆成交，以預先配置的 typed array
+(時間、價格、成交量、買價、賣價) 環狀緩衝存放，而非每筆一個 dict。
+每檔股票的記憶體用量固定為 N x 欄位數 x 8 bytes，追蹤的股票數量
+也有上限 (超過時淘汰最久未更新者)，整體記憶體用量可預期。
+
+讀取時可取得 memoryview 片段 (不複製)，供指標計算與圖表使用。
+"""
+
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .ticks import Tick, parse_tick
+
+# 欄位名稱 (皆為 float64)
+COLUMNS = ('ts', 'price', 'volume', 'bid', 'ask')
+
+# 每檔股票保留的 tick 數量
+DEFAULT_CAPACITY = 1024
+
+# 最多追蹤的股票數量
+DEFAULT_MAX_SYMBOLS = 500
+
+
+class TickRing:
+    """單一股票的 tick 環狀緩衝"""
+
+    __slots__ = ('capacity', 'count', 'end', 'columns')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.count = 0
+        self.end = 0  # 下一筆寫入位置
+        self.columns: Dict[str, array] = {
+            name: array('d', bytes(8 * capacity)) for name in COLUMNS
+        }
+
+    def append(self, tick: Tick, volume: float) -> None:
+        i = self.end
+        columns = self.columns
+        columns['ts'][i] = tick.ts
+        columns['price'][i] = tick.price
+        columns['volume'][i] = volume
+        columns['bid'][i] = tick.bid
+        columns['ask'][i] = tick.ask
+        self.end = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def segments(self, name: str, n: Optional[int] = None) -> List[memoryview]:
+        """
+        取得最近 n 筆的 memoryview 片段 (由舊到新，不複製)
+
+        緩衝繞回時資料分為兩段，否則只有一段。
+        """
+        n = self.count if n is None else max(0, min(n, self.count))
+        if n == 0:
+            return []
+        view = memoryview(self.columns[name])
+        start = (self.end - n) % self.capacity
+        if start < self.end:
+            return [view[start:self.end]]
+        if self.end == 0:
+            return [view[start:]]
+        return [view[start:], view[:self.end]]
+
+    def column(self, name: str, n: Optional[int] = None) -> array:
+        """取得最近 n 筆的連續副本 (由舊到新)"""
+        result = array('d')
+        for segment in self.segments(name, n):
+            result.frombytes(segment.tobytes())
+        return result
+
+
+class TickStore:
+    """
+    各股票 tick 環狀緩衝的集合 (執行緒安全)
+
+    on_quote 可直接作為 broker 的報價回調 (於 SDK 執行緒呼叫)。
+    回傳的 memoryview 直接指向緩衝，後續寫入會覆蓋其內容，
+    需要保存時請使用 column() 取得副本。
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, max_symbols: int = DEFAULT_MAX_SYMBOLS):
+        """
+        初始化儲存
+
+        Args:
+            capacity: 每檔股票保留的 tick 數量
+            max_symbols: 最多追蹤的股票數量
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self._rings: "OrderedDict[str, TickRing]" = OrderedDict()
+        self._last_total: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.ticks = 0
+        self.evicted = 0
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._rings
+
+    def on_quote(self, symbol: str, quote: Any) -> None:
+        """
+        寫入一筆報價
+
+        Args:
+            symbol: 股票代號
+            quote: 報價 dict
+        """
+        tick = parse_tick(quote)
+        if tick is not None:
+            self.append(symbol, tick)
+
+    def append(self, symbol: str, tick: Tick) -> None:
+        """
+        寫入一筆已解析的 tick
+
+        Args:
+            symbol: 股票代號
+            tick: 成交資料
+        """
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                if len(self._rings) >= self.max_symbols:
+                    oldest, _ = self._rings.popitem(last=False)
+                    self._last_total.pop(oldest, None)
+                    self.evicted += 1
+                ring = TickRing(self.capacity)
+                self._rings[symbol] = ring
+            else:
+                self._rings.move_to_end(symbol)
+
+            volume = tick.volume
+            if tick.total_volume is not None:
+                previous = self._last_total.get(symbol)
+                if previous is not None and tick.total_volume >= previous:
+                    volume = tick.total_volume - previous
+                self._last_total[symbol] = tick.total_volume
+
+            ring.append(tick, volume)
+            self.ticks += 1
+
+    def segments(self, symbol: str, name: str, n: Optional[int] = None) -> List[memoryview]:
+        """
+        取得欄位最近 n 筆的 memoryview 片段 (不複製)
+
+        Args:
+            symbol: 股票代號
+            name: 欄位 (ts / price / volume / bid / ask)
+            n: 筆數，None 表示全部
+
+        Returns:
+            List[memoryview]: 由舊到新的一或兩段片段，無資料時為空列表
+        """
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column: {name}")
+        with self._lock:
+            ring = self._rings.get(symbol)
+            return ring.segments(name, n) if ring is not None else []
+
+    def column(self, symbol: str, name: str, n: Optional[int] = None) -> array:
+        """
+        取得欄位最近 n 筆的連續副本
+
+        Args:
+            symbol: 股票代號
+            name: 欄位 (ts / price / volume / bid / ask)
+            n: 筆數，None 表示全部
+
+        Returns:
+            array: 由舊到新的 float64 陣列
+        """
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown column: {name}")
+        with self._lock:
+            ring = self._rings.get(symbol)
+            return ring.column(name, n) if ring is not None else array('d')
+
+    def window(self, symbol: str, n: Optional[int] = None) -> Dict[str, array]:
+        """
+        取得所有欄位最近 n 筆的副本 (同一時間點的一致快照)
+
+        Args:
+            symbol: 股票代號
+            n: 筆數，None 表示全部
+
+        Returns:
+            Dict[str, array]: 欄位名稱對應的陣列
+        """
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                return {name: array('d') for name in COLUMNS}
+            return {name: ring.column(name, n) for name in COLUMNS}
+
+    def symbols(self) -> List[str]:
+        """目前追蹤的股票"""
+        with self._lock:
+            return list(self._rings)
+
+    def stats(self) -> Dict[str, Any]:
+        """取得儲存統計資訊"""
+        return {
+            'symbols': len(self._rings),
+            'max_symbols': self.max_symbols,
+            'capacity': self.capacity,
+            'ticks': self.ticks,
+            'evicted': self.evicted,
+            'memory_bytes': len(self._rings) * self.capacity * len(COLUMNS) * 8,
+            'memory_budget_bytes': self.max_symbols * self.capacity * len(COLUMNS) * 8
+        }
@@ -0,0 +1,82 @@
+"""
+Tick Parsing
+即時報價 (tick) 欄位解析
+
+SDK 與 Mock 推送的報價為 dict，欄位名稱不一致 (price / close /
+last_price、volume / size 等)。此模組統一轉為 Tick，供 K 線聚合與
+tick 儲存使用。
+"""
+
+import time
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+
+_PRICE_KEYS = ('price', 'last_price', 'close', 'trade_price')
+_VOLUME_KEYS = ('size', 'volume', 'trade_volume')
+_TOTAL_VOLUME_KEYS = ('total_volume', 'accumulated_volume')
+_TIME_KEYS = ('timestamp', 'time', 'datetime')
+_BID_KEYS = ('bid', 'bid_price')
+_ASK_KEYS = ('ask', 'ask_price')
+
+
+class Tick(NamedTuple):
+    """單筆成交"""
+    ts: float  # epoch 秒數
+    price: float
+    volume: float  # 單筆成交量 (無法取得時為 0)
+    bid: float  # 最佳買價 (無法取得時為 0)
+    ask: float  # 最佳賣價 (無法取得時為 0)
+    total_volume: Optional[float]  # 當日累計成交量 (選填)
+
+
+def _first(quote: Any, keys) -> Any:
+    for key in keys:
+        value = quote.get(key)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def _parse_timestamp(value: Any) -> float:
+    """將報價時間轉為 epoch 秒數 (無法解析時使用目前時間)"""
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        # 微秒 / 毫秒時間戳
+        if value > 1e14:
+            return value / 1e6
+        if value > 1e11:
+            return value / 1e3
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def parse_tick(quote: Any) -> Optional[Tick]:
+    """
+    解析報價為 Tick
+
+    Args:
+        quote: SDK 或 Mock 推送的報價 dict
+
+    Returns:
+        Tick: 解析結果，沒有成交價時回傳 None
+    """
+    if not isinstance(quote, dict):
+        return None
+    price = _first(quote, _PRICE_KEYS)
+    if price is None:
+        return None
+    total_volume = _first(quote, _TOTAL_VOLUME_KEYS)
+    return Tick(
+        ts=_parse_timestamp(_first(quote, _TIME_KEYS)),
+        price=float(price),
+        volume=float(_first(quote, _VOLUME_KEYS) or 0),
+        bid=float(_first(quote, _BID_KEYS) or 0),
+        ask=float(_first(quote, _ASK_KEYS) or 0),
+        total_volume=float(total_volume) if total_volume is not None else None
+    )